@@ -0,0 +1,62 @@
+"""pgvector column + HNSW index for text_chunks (optional)
+
+Revision ID: 002_pgvector_embeddings
+Revises: 8b72872370e4
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '002_pgvector_embeddings'
+down_revision: Union[str, None] = '8b72872370e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _pgvector_available() -> bool:
+    conn = op.get_bind()
+    result = conn.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+    )
+    return result.scalar() is not None
+
+
+def upgrade() -> None:
+    # Без расширения остаётся ARRAY + поиск в Python (VectorService fallback)
+    if not _pgvector_available():
+        return
+    
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute("ALTER TABLE text_chunks ADD COLUMN IF NOT EXISTS embedding_vec vector(768)")
+    
+    # Backfill из ARRAY-колонки (только корректной размерности)
+    op.execute("""
+        UPDATE text_chunks
+        SET embedding_vec = embedding::vector(768)
+        WHERE embedding IS NOT NULL
+          AND embedding_vec IS NULL
+          AND array_length(embedding, 1) = 768
+    """)
+    
+    # CONCURRENTLY: построение HNSW долгое, запись чанков на это время не блокируем
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_text_chunks_embedding_vec', 'text_chunks', ['embedding_vec'],
+            postgresql_using='hnsw',
+            postgresql_ops={'embedding_vec': 'vector_cosine_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_text_chunks_embedding_vec', table_name='text_chunks',
+            postgresql_concurrently=True, if_exists=True
+        )
+    op.execute("ALTER TABLE text_chunks DROP COLUMN IF EXISTS embedding_vec")
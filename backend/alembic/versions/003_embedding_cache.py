@@ -0,0 +1,34 @@
+"""embedding_cache table
+
+Revision ID: 003_embedding_cache
+Revises: 002_pgvector_embeddings
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '003_embedding_cache'
+down_revision: Union[str, None] = '002_pgvector_embeddings'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'embedding_cache',
+        sa.Column('model', sa.String(100), nullable=False),
+        sa.Column('task_type', sa.String(50), nullable=False),
+        sa.Column('text_hash', sa.String(64), nullable=False),
+        sa.Column('embedding', postgresql.ARRAY(sa.Float()), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('model', 'task_type', 'text_hash'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
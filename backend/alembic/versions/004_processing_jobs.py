@@ -0,0 +1,43 @@
+"""processing_jobs queue table
+
+Revision ID: 004_processing_jobs
+Revises: 003_embedding_cache
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision: str = '004_processing_jobs'
+down_revision: Union[str, None] = '003_embedding_cache'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'processing_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('kind', sa.String(50), nullable=False),
+        sa.Column('material_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('payload', postgresql.JSONB(), nullable=False, server_default='{}'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='3'),
+        sa.Column('run_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(100), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now()),
+    )
+    op.create_index('ix_processing_jobs_status_run_at', 'processing_jobs', ['status', 'run_at'])
+    op.create_index('ix_processing_jobs_material_id', 'processing_jobs', ['material_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('processing_jobs')
@@ -0,0 +1,89 @@
+"""denormalized group counters on folders
+
+Revision ID: 005_group_counters
+Revises: 004_processing_jobs
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '005_group_counters'
+down_revision: Union[str, None] = '004_processing_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('folders', sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('folders', sa.Column('materials_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Счётчики меняются в той же транзакции, что и строка-источник
+    op.execute("""
+        CREATE OR REPLACE FUNCTION group_members_count_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE folders SET member_count = member_count + 1 WHERE id = NEW.group_id;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE folders SET member_count = member_count - 1 WHERE id = OLD.group_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_group_members_count
+        AFTER INSERT OR DELETE ON group_members
+        FOR EACH ROW EXECUTE FUNCTION group_members_count_trg()
+    """)
+
+    # Материалы группы лежат в materials.folder_id (folders.is_group = true);
+    # обычные папки тоже попадают в folder_id — счётчик меняем только у групп
+    op.execute("""
+        CREATE OR REPLACE FUNCTION materials_group_count_trg() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.folder_id IS NOT NULL THEN
+                UPDATE folders SET materials_count = materials_count - 1
+                WHERE id = OLD.folder_id AND is_group = true;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.folder_id IS NOT NULL THEN
+                UPDATE folders SET materials_count = materials_count + 1
+                WHERE id = NEW.folder_id AND is_group = true;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_materials_group_count
+        AFTER INSERT OR DELETE ON materials
+        FOR EACH ROW EXECUTE FUNCTION materials_group_count_trg()
+    """)
+    # Перенос материала между папками/группами
+    op.execute("""
+        CREATE TRIGGER trg_materials_group_count_update
+        AFTER UPDATE OF folder_id ON materials
+        FOR EACH ROW WHEN (OLD.folder_id IS DISTINCT FROM NEW.folder_id)
+        EXECUTE FUNCTION materials_group_count_trg()
+    """)
+
+    # Начальное заполнение
+    op.execute("""
+        UPDATE folders f SET
+            member_count = (SELECT count(*) FROM group_members gm WHERE gm.group_id = f.id),
+            materials_count = (SELECT count(*) FROM materials m WHERE m.folder_id = f.id)
+        WHERE f.is_group = true
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_materials_group_count_update ON materials")
+    op.execute("DROP TRIGGER IF EXISTS trg_materials_group_count ON materials")
+    op.execute("DROP FUNCTION IF EXISTS materials_group_count_trg()")
+    op.execute("DROP TRIGGER IF EXISTS trg_group_members_count ON group_members")
+    op.execute("DROP FUNCTION IF EXISTS group_members_count_trg()")
+    op.drop_column('folders', 'materials_count')
+    op.drop_column('folders', 'member_count')
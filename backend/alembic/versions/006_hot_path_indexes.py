@@ -0,0 +1,63 @@
+"""composite indexes for hot queries
+
+Восстанавливает индексы, снятые в 8b72872370e4, в виде составных
+под реальные запросы (список материалов, RAG-чанки, членства, лидерборд).
+
+Revision ID: 006_hot_path_indexes
+Revises: 005_group_counters
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '006_hot_path_indexes'
+down_revision: Union[str, None] = '005_group_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, extra kwargs)
+INDEXES = [
+    # get_user_materials: user_id + folder_id (или IS NULL) ORDER BY created_at DESC
+    ('ix_materials_user_folder_created', 'materials',
+     ['user_id', 'folder_id', sa.text('created_at DESC')], {}),
+    # материалы группы / поиск по доступным папкам, триггер счётчиков и reconcile_counters
+    ('ix_materials_folder_created', 'materials',
+     ['folder_id', sa.text('created_at DESC')], {'postgresql_where': sa.text('folder_id IS NOT NULL')}),
+    # RAG: чанки материала по порядку, DELETE при переиндексации
+    ('ix_text_chunks_material_chunk', 'text_chunks', ['material_id', 'chunk_index'], {}),
+    # членства пользователя (group_id, user_id уже покрыт uq_group_member)
+    ('ix_group_members_user_group', 'group_members',
+     ['user_id', 'group_id'], {'postgresql_include': ['role']}),
+    # лидерборд / результаты группы
+    ('ix_quiz_results_group_user', 'quiz_results', ['group_id', 'user_id'], {}),
+    ('ix_quiz_results_user_id', 'quiz_results', ['user_id'], {}),
+    ('ix_quiz_results_material_id', 'quiz_results', ['material_id'], {}),
+    # выводы материала по формату
+    ('ix_ai_outputs_material_format', 'ai_outputs', ['material_id', 'format'], {}),
+    ('ix_folders_user_id', 'folders', ['user_id'], {}),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY: без блокировки записи на больших таблицах
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+                **kwargs
+            )
+
+    op.execute("ANALYZE materials, text_chunks, group_members, quiz_results, ai_outputs, folders")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,73 @@
+"""full-text search over materials
+
+Revision ID: 007_materials_fts
+Revises: 006_hot_path_indexes
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '007_materials_fts'
+down_revision: Union[str, None] = '006_hot_path_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Тело ограничено: tsvector не может превышать 1MB
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('russian'::regconfig, left(coalesce(extracted_text, ''), 100000)), 'B') ||
+    setweight(to_tsvector('english'::regconfig, left(coalesce(extracted_text, ''), 100000)), 'B') ||
+    setweight(to_tsvector('simple'::regconfig, left(coalesce(extracted_text, ''), 100000)), 'C')
+"""
+
+
+def _pg_trgm_available() -> bool:
+    conn = op.get_bind()
+    result = conn.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    )
+    return result.scalar() is not None
+
+
+def upgrade() -> None:
+    # STORED-колонка переписывает materials под ACCESS EXCLUSIVE — это неизбежно;
+    # индексы строим уже без блокировки записи
+    op.execute(f"""
+        ALTER TABLE materials
+        ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED
+    """)
+
+    # Без pg_trgm поиск работает только по tsvector (MaterialService проверяет расширение)
+    trgm = _pg_trgm_available()
+    if trgm:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_materials_search_vector', 'materials', ['search_vector'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        if trgm:
+            op.create_index(
+                'ix_materials_title_trgm', 'materials', [sa.text('lower(title) gin_trgm_ops')],
+                postgresql_using='gin',
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_materials_title_trgm', table_name='materials', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_materials_search_vector', table_name='materials', postgresql_concurrently=True, if_exists=True)
+    op.execute("ALTER TABLE materials DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,44 @@
+"""full-text index over text_chunks for hybrid retrieval
+
+Revision ID: 008_text_chunks_fts
+Revises: 007_materials_fts
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '008_text_chunks_fts'
+down_revision: Union[str, None] = '007_materials_fts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # russian стеммит и кириллицу, и латиницу (asciiword → english_stem);
+    # simple сохраняет точные токены: номера статей, формулы, коды
+    op.execute("""
+        ALTER TABLE text_chunks
+        ADD COLUMN IF NOT EXISTS content_tsv tsvector
+        GENERATED ALWAYS AS (
+            to_tsvector('russian'::regconfig, coalesce(content, '')) ||
+            to_tsvector('simple'::regconfig, coalesce(content, ''))
+        ) STORED
+    """)
+    # Самая большая таблица — индекс строим без блокировки записи чанков
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_text_chunks_content_tsv', 'text_chunks', ['content_tsv'],
+            postgresql_using='gin',
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_text_chunks_content_tsv', table_name='text_chunks', postgresql_concurrently=True, if_exists=True)
+    op.execute("ALTER TABLE text_chunks DROP COLUMN IF EXISTS content_tsv")
@@ -0,0 +1,36 @@
+"""keyset index for group quiz results listing
+
+Revision ID: 009_quiz_results_keyset
+Revises: 008_text_chunks_fts
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '009_quiz_results_keyset'
+down_revision: Union[str, None] = '008_text_chunks_fts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ORDER BY completed_at DESC, id DESC + (completed_at, id) < курсор
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_quiz_results_group_completed', 'quiz_results',
+            ['group_id', sa.text('completed_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_quiz_results_group_completed', table_name='quiz_results',
+            postgresql_concurrently=True, if_exists=True,
+        )
@@ -0,0 +1,39 @@
+"""content hash of uploaded material files
+
+Revision ID: 010_material_content_hash
+Revises: 009_quiz_results_keyset
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '010_material_content_hash'
+down_revision: Union[str, None] = '009_quiz_results_keyset'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('materials', sa.Column('content_hash', sa.String(64), nullable=True))
+
+    # Старые материалы без хэша в индекс не попадают
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_materials_content_hash', 'materials', ['content_hash'],
+            postgresql_where=sa.text('content_hash IS NOT NULL'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_materials_content_hash', table_name='materials',
+            postgresql_concurrently=True, if_exists=True,
+        )
+    op.drop_column('materials', 'content_hash')
@@ -0,0 +1,37 @@
+"""ai_output_cache table
+
+Revision ID: 011_ai_output_cache
+Revises: 010_material_content_hash
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = '011_ai_output_cache'
+down_revision: Union[str, None] = '010_material_content_hash'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ai_output_cache',
+        sa.Column('model', sa.String(100), nullable=False),
+        sa.Column('format', sa.String(50), nullable=False),
+        sa.Column('input_hash', sa.String(64), nullable=False),
+        sa.Column('prompt_version', sa.String(16), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('last_used_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('model', 'format', 'input_hash', 'prompt_version'),
+    )
+    op.create_index('ix_ai_output_cache_last_used', 'ai_output_cache', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ai_output_cache_last_used', table_name='ai_output_cache')
+    op.drop_table('ai_output_cache')
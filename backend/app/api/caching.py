@@ -0,0 +1,42 @@
+# backend/app/api/caching.py
+import hashlib
+from typing import Any, List, Optional
+
+from fastapi import Request, Response
+
+# Ответы персональные (за авторизацией): кэшировать только в клиенте и всегда ревалидировать
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Сильный ETag из версий данных (updated_at, id/created_at выводов, выбранные форматы)"""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match совпадает с текущим ETag (список через запятую, W/ игнорируем)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def parse_formats(formats: Optional[str]) -> Optional[List[str]]:
+    """'quiz,flashcards' → ['flashcards', 'quiz'] (None — все форматы)"""
+    if not formats:
+        return None
+    selected = sorted({f.strip() for f in formats.split(",") if f.strip()})
+    return selected or None
@@ -3,10 +3,10 @@ from fastapi import Depends, HTTPException, Header
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Optional
-import asyncio
 
 from app.models import get_db, User
 from app.services import UserService
+from app.services.auth_cache import auth_cache, verify_init_data, init_data_expired
 from app.core.config import settings
 
 
@@ -20,6 +20,8 @@ async def get_current_user(
     """
     
     telegram_id = None
+    username = None
+    first_name = None
     
     # Dev режим: используем X-User-ID
     if settings.DEBUG and x_user_id:
@@ -28,18 +30,38 @@ async def get_current_user(
         except ValueError:
             raise HTTPException(status_code=401, detail="Invalid X-User-ID")
     
-    # Production: парсим Telegram initData
+    # Production: проверяем Telegram initData (результат кэшируется по хэшу строки)
     elif x_telegram_init_data:
-        try:
-            from urllib.parse import parse_qsl
-            import json
+        identity = auth_cache.get_identity(x_telegram_init_data)
+        
+        if identity is None:
+            bot_token = settings.TELEGRAM_BOT_TOKEN if settings.TELEGRAM_VERIFY_INIT_DATA else ""
+            try:
+                user_data = verify_init_data(x_telegram_init_data, bot_token)
+            except Exception as e:
+                print(f"Error parsing Telegram data: {e}")
+                raise HTTPException(status_code=401, detail="Invalid Telegram init data")
+            
+            if not user_data:
+                raise HTTPException(status_code=401, detail="Invalid Telegram init data")
             
-            parsed_data = dict(parse_qsl(x_telegram_init_data, keep_blank_values=True))
-            user_data = json.loads(parsed_data.get('user', '{}'))
-            telegram_id = user_data.get('id')
-        except Exception as e:
-            print(f"Error parsing Telegram data: {e}")
-            raise HTTPException(status_code=401, detail="Invalid Telegram init data")
+            identity = {
+                "id": user_data.get('id'),
+                "username": user_data.get('username'),
+                "first_name": user_data.get('first_name'),
+                "auth_date": user_data.get('auth_date'),
+            }
+            auth_cache.put_identity(x_telegram_init_data, identity)
+        
+        # Кэш identity живёт дольше, чем initData может быть валиден — срок проверяем и здесь
+        elif settings.TELEGRAM_VERIFY_INIT_DATA and settings.TELEGRAM_BOT_TOKEN and init_data_expired(
+            identity["auth_date"], settings.AUTH_INIT_DATA_MAX_AGE
+        ):
+            raise HTTPException(status_code=401, detail="Telegram init data expired")
+        
+        telegram_id = identity["id"]
+        username = identity["username"]
+        first_name = identity["first_name"]
     
     # Fallback для dev
     if not telegram_id:
@@ -48,30 +70,32 @@ async def get_current_user(
         else:
             raise HTTPException(status_code=401, detail="Authentication required")
     
-    # Получаем или создаём пользователя с retry
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            user_service = UserService(db)
-            user, is_new = await user_service.get_or_create(telegram_id=telegram_id)
-            
-            if is_new:
-                print(f"✅ Created new user: {telegram_id}")
-            
+    try:
+        # Горячий путь: снапшот из кэша, сверенный с users.updated_at
+        user = await auth_cache.get_user(db, telegram_id)
+        if user is not None:
             return user
-            
-        except SQLAlchemyError as e:
-            print(f"⚠️ DB error (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                await asyncio.sleep(0.5)  # Ждём перед retry
-                continue
-            raise HTTPException(
-                status_code=503, 
-                detail="Сервис временно недоступен. Попробуйте снова."
-            )
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}")
-            raise HTTPException(status_code=500, detail="Внутренняя ошибка")
+        
+        # Холодный путь: INSERT … ON CONFLICT DO NOTHING, для существующего — SELECT
+        user_service = UserService(db)
+        user, is_new = await user_service.get_or_create(
+            telegram_id=telegram_id,
+            username=username,
+            first_name=first_name
+        )
+    except SQLAlchemyError as e:
+        print(f"⚠️ DB error: {e}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=503, 
+            detail="Сервис временно недоступен. Попробуйте снова."
+        )
+    except Exception as e:
+        print(f"❌ Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail="Внутренняя ошибка")
+    
+    auth_cache.put_user(user)
+    return user
 
 
 get_current_user_dev = get_current_user
\ No newline at end of file
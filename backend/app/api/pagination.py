@@ -0,0 +1,62 @@
+# backend/app/api/pagination.py
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, tuple_
+
+# Курсор следующей страницы отдаём заголовком — тело ответа остаётся списком
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: Optional[datetime], row_id: UUID) -> str:
+    """Keyset-курсор (created_at, id) → непрозрачная строка; NULL-время — пустая часть"""
+    raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[Optional[datetime], UUID]]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return (datetime.fromisoformat(created_at) if created_at else None), UUID(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_before(time_column, id_column, cursor: Tuple[Optional[datetime], UUID]):
+    """
+    Условие «после курсора» для ORDER BY time DESC, id DESC.
+    В Postgres DESC ставит NULL первыми: после NULL-курсора идут остальные NULL
+    с меньшим id и все строки со временем; после обычного — кортежное сравнение.
+    """
+    cursor_time, cursor_id = cursor
+    if cursor_time is None:
+        return or_(
+            and_(time_column.is_(None), id_column < cursor_id),
+            time_column.is_not(None)
+        )
+    return tuple_(time_column, id_column) < tuple_(cursor_time, cursor_id)
+
+
+def clamp_limit(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def set_next_cursor(response: Response, rows: list, limit: int, created_attr: str = "created_at") -> list:
+    """
+    rows выбраны с limit + 1: лишняя строка означает, что есть следующая страница.
+    Ставит заголовок X-Next-Cursor и возвращает ровно limit строк.
+    """
+    if len(rows) <= limit:
+        return rows
+
+    rows = rows[:limit]
+    last = rows[-1]
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, created_attr), last.id)
+    return rows
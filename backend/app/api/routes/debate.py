@@ -6,6 +6,9 @@ from typing import List, Optional, Literal
 from app.api.deps import get_current_user, get_db
 from app.models import User, Material
 from app.services.debate_service import debate_service
+from app.services.ai_service import gemini_service
+from app.api.streaming import stream_tokens, sse_response
+from app.api.routes.outputs import check_material_access
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
@@ -33,6 +36,21 @@ class JudgeDebateRequest(BaseModel):
     history: List[dict]
 
 
+async def _get_material_content(db: AsyncSession, material_id: Optional[str], current_user: User) -> str:
+    """Текст материала для контекста дебатов (или пустая строка); чужой материал — 403"""
+    if not material_id:
+        return ""
+    result = await db.execute(
+        select(Material).where(Material.id == material_id)
+    )
+    material = result.scalar_one_or_none()
+    if not material:
+        return ""
+    if not await check_material_access(material, current_user, db):
+        raise HTTPException(status_code=403, detail="Нет доступа к материалу")
+    return material.raw_content or ""
+
+
 @router.post("/start")
 async def start_debate(
     request: StartDebateRequest,
@@ -49,14 +67,7 @@ async def start_debate(
         )
     
     # Получаем контент материала если указан
-    material_content = ""
-    if request.material_id:
-        result = await db.execute(
-            select(Material).where(Material.id == request.material_id)
-        )
-        material = result.scalar_one_or_none()
-        if material and material.raw_content:
-            material_content = material.raw_content
+    material_content = await _get_material_content(db, request.material_id, current_user)
     
     result = await debate_service.start_debate(
         topic=request.topic,
@@ -80,14 +91,7 @@ async def continue_debate(
     """Продолжить дебаты"""
     
     # Получаем контент материала если указан
-    material_content = ""
-    if request.material_id:
-        result = await db.execute(
-            select(Material).where(Material.id == request.material_id)
-        )
-        material = result.scalar_one_or_none()
-        if material and material.raw_content:
-            material_content = material.raw_content
+    material_content = await _get_material_content(db, request.material_id, current_user)
     
     result = await debate_service.continue_debate(
         topic=request.topic,
@@ -104,6 +108,65 @@ async def continue_debate(
     return result
 
 
+@router.post("/start/stream")
+async def start_debate_stream(
+    request: StartDebateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Начать дебаты — первый ход AI потоком (SSE)"""
+    if request.difficulty == "hard" and not current_user.is_pro:
+        raise HTTPException(
+            status_code=403,
+            detail="Сложный режим доступен только для Pro"
+        )
+    
+    material_content = await _get_material_content(db, request.material_id, current_user)
+    ai_position, prompt = debate_service.build_opening_prompt(
+        request.topic, request.user_position, request.difficulty, material_content
+    )
+    
+    async def on_complete(text: str) -> dict:
+        return {
+            "success": True,
+            "topic": request.topic,
+            "user_position": request.user_position,
+            "ai_position": ai_position,
+            "difficulty": request.difficulty,
+            "ai_message": text.strip(),
+            "turn": 1
+        }
+    
+    return sse_response(stream_tokens(
+        gemini_service.generate_stream(prompt), on_complete, label="debate/start"
+    ))
+
+
+@router.post("/continue/stream")
+async def continue_debate_stream(
+    request: ContinueDebateRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Продолжить дебаты — ответ AI потоком (SSE)"""
+    material_content = await _get_material_content(db, request.material_id, current_user)
+    prompt = debate_service.build_continue_prompt(
+        request.topic, request.ai_position, request.difficulty,
+        request.history, request.user_message, material_content
+    )
+    
+    async def on_complete(text: str) -> dict:
+        return {
+            "success": True,
+            "ai_message": text.strip(),
+            "turn": len(request.history) // 2 + 1
+        }
+    
+    return sse_response(stream_tokens(
+        gemini_service.generate_stream(prompt), on_complete, label="debate/continue"
+    ))
+
+
 @router.post("/judge")
 async def judge_debate(
     request: JudgeDebateRequest,
@@ -1,15 +1,15 @@
 # backend/app/api/routes/groups.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 from pydantic import BaseModel
 from typing import Optional, List
 from uuid import UUID
 
-from app.models import get_db, User, QuizResult
-from app.services.group_service import GroupService
+from app.models import get_db, User, QuizResult, Material
+from app.services.group_service import GroupService, GroupRole
 from app.api.deps import get_current_user
+from app.api.pagination import decode_cursor, clamp_limit, set_next_cursor, keyset_before
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
@@ -80,9 +80,7 @@ async def create_group(
     if not success:
         raise HTTPException(status_code=400, detail=message)
     
-    # Получаем группы и возвращаем созданную
-    groups = await service.get_user_groups(current_user)
-    return next(g for g in groups if g["id"] == str(group.id))
+    return await service.get_user_group(current_user, group.id)
 
 
 @router.get("/", response_model=List[GroupResponse])
@@ -144,8 +142,7 @@ async def get_group(
     if not group:
         raise HTTPException(status_code=404, detail="Группа не найдена")
     
-    groups = await service.get_user_groups(current_user)
-    user_group = next((g for g in groups if g["id"] == str(group_id)), None)
+    user_group = await service.get_user_group(current_user, group_id)
     
     if not user_group:
         raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
@@ -194,8 +191,7 @@ async def get_group_members(
 ):
     service = GroupService(db)
     
-    groups = await service.get_user_groups(current_user)
-    if not any(g["id"] == str(group_id) for g in groups):
+    if not await service.is_member(current_user, group_id):
         raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
     
     return await service.get_group_members(group_id)
@@ -213,9 +209,8 @@ async def save_quiz_result(
     db: AsyncSession = Depends(get_db)
 ):
     service = GroupService(db)
-    groups = await service.get_user_groups(current_user)
     
-    if not any(g["id"] == str(group_id) for g in groups):
+    if not await service.is_member(current_user, group_id):
         raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
     
     percentage = round((score / max_score) * 100) if max_score > 0 else 0
@@ -237,41 +232,64 @@ async def save_quiz_result(
 @router.get("/{group_id}/quiz-results")
 async def get_group_quiz_results(
     group_id: UUID,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     service = GroupService(db)
-    groups = await service.get_user_groups(current_user)
+    role = await service.get_member_role(current_user, group_id)
     
-    user_group = next((g for g in groups if g["id"] == str(group_id)), None)
-    if not user_group:
+    if role is None:
         raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
     
-    if not user_group["is_owner"]:
+    if role != GroupRole.OWNER:
         raise HTTPException(status_code=403, detail="Только владелец может просматривать результаты")
     
-    result = await db.execute(
-        select(QuizResult)
-        .options(
-            selectinload(QuizResult.user),
-            selectinload(QuizResult.material)
+    # Только нужные колонки: без полного Material (extracted_text) и User
+    query = (
+        select(
+            QuizResult.id,
+            QuizResult.score,
+            QuizResult.max_score,
+            QuizResult.percentage,
+            QuizResult.completed_at,
+            User.id.label("user_id"),
+            User.first_name,
+            User.telegram_username,
+            Material.id.label("material_id"),
+            Material.title.label("material_title"),
         )
+        .join(User, User.id == QuizResult.user_id)
+        .join(Material, Material.id == QuizResult.material_id)
         .where(QuizResult.group_id == group_id)
-        .order_by(QuizResult.completed_at.desc())
     )
-    results = result.scalars().all()
+    
+    page_cursor = decode_cursor(cursor)
+    if page_cursor:
+        # completed_at может быть NULL — обычное кортежное сравнение такие строки потеряло бы
+        query = query.where(keyset_before(QuizResult.completed_at, QuizResult.id, page_cursor))
+    
+    limit = clamp_limit(limit)
+    result = await db.execute(
+        query
+        .order_by(QuizResult.completed_at.desc(), QuizResult.id.desc())
+        .limit(limit + 1)
+    )
+    results = set_next_cursor(response, result.all(), limit, created_attr="completed_at")
     
     return [
         {
             "id": str(r.id),
             "user": {
-                "id": str(r.user.id),
-                "first_name": r.user.first_name,
-                "username": r.user.telegram_username
+                "id": str(r.user_id),
+                "first_name": r.first_name,
+                "username": r.telegram_username
             },
             "material": {
-                "id": str(r.material.id),
-                "title": r.material.title
+                "id": str(r.material_id),
+                "title": r.material_title
             },
             "score": r.score,
             "max_score": r.max_score,
@@ -289,9 +307,8 @@ async def get_group_leaderboard(
     db: AsyncSession = Depends(get_db)
 ):
     service = GroupService(db)
-    groups = await service.get_user_groups(current_user)
     
-    if not any(g["id"] == str(group_id) for g in groups):
+    if not await service.is_member(current_user, group_id):
         raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
     
     result = await db.execute(
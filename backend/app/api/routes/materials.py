@@ -1,18 +1,22 @@
 # backend/app/api/routes/materials.py
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload, load_only
 from typing import Optional, List
 from uuid import UUID
 from pydantic import BaseModel
-import asyncio
+import os
 import traceback
 
-from app.models import get_db, User, Material, Folder, AIOutput, ProcessingStatus, MaterialType, AsyncSessionLocal
+from app.models import get_db, User, Material, Folder, AIOutput, ProcessingStatus, MaterialType, JobKind
 from app.services import UserService, MaterialService
+from app.services.job_queue import JobQueue
+from app.services.material_service import UploadTooLarge
 from app.api.schemas import MaterialResponse, MaterialDetailResponse, SuccessResponse
 from app.api.deps import get_current_user
+from app.api.pagination import decode_cursor, clamp_limit, set_next_cursor
+from app.api.caching import make_etag, is_not_modified, not_modified_response, set_etag, parse_formats
 from app.core.config import settings
 
 router = APIRouter(prefix="/materials", tags=["materials"])
@@ -30,158 +34,60 @@ class GenerateFromTopicRequest(BaseModel):
     group_id: Optional[str] = None
 
 
-# ==================== Background Tasks ====================
+# ==================== Upload ====================
 
-async def process_material_background(
-    material_id: UUID,
-    group_id: Optional[UUID] = None,
-    user_telegram_id: int = None,
-    user_first_name: Optional[str] = None
-):
-    """Фоновая обработка материала — НЕ блокирует основной поток!"""
-    # Создаём НОВУЮ сессию для background task
-    async with AsyncSessionLocal() as db:
-        try:
-            result = await db.execute(
-                select(Material).where(Material.id == material_id)
-            )
-            material = result.scalar_one_or_none()
-            
-            if not material:
-                print(f"❌ Material {material_id} not found")
-                return
-            
-            from app.services.processing_service import ProcessingService
-            processing_service = ProcessingService(db)
-            await processing_service.process_material(material)
-            await db.commit()
-            
-            print(f"✅ Background processing complete: {material_id}")
-            
-            # Уведомления группе
-            if group_id and material.status == ProcessingStatus.COMPLETED:
-                await send_group_notification(
-                    db, group_id, material.title, 
-                    user_first_name, user_telegram_id
-                )
-                
-        except Exception as e:
-            print(f"❌ Background processing error: {e}")
-            traceback.print_exc()
-            
-            # Помечаем как failed
-            try:
-                await db.rollback()
-                result = await db.execute(
-                    select(Material).where(Material.id == material_id)
-                )
-                material = result.scalar_one_or_none()
-                if material:
-                    material.status = ProcessingStatus.FAILED
-                    await db.commit()
-            except:
-                pass
-
-
-async def generate_topic_background(
-    material_id: UUID,
-    topic: str,
-    group_id: Optional[UUID] = None,
-    user_telegram_id: int = None,
-    user_first_name: Optional[str] = None
-):
-    """Фоновая генерация по теме"""
-    async with AsyncSessionLocal() as db:
-        try:
-            print(f"🎯 Background generating: {topic}")
-            
-            from app.services.ai_service import gemini_service
-            from app.services.text_extractor import clean_text_for_db
-            
-            # Генерируем контент
-            generated_content = await gemini_service.generate_content_from_topic(topic)
-            generated_content = clean_text_for_db(generated_content)
-            
-            # Обновляем материал
-            result = await db.execute(
-                select(Material).where(Material.id == material_id)
-            )
-            material = result.scalar_one_or_none()
-            
-            if not material:
-                print(f"❌ Material {material_id} not found")
-                return
-            
-            material.raw_content = generated_content
-            await db.commit()
-            
-            # Обрабатываем
-            from app.services.processing_service import ProcessingService
-            processing_service = ProcessingService(db)
-            await processing_service.process_material(material)
-            await db.commit()
-            
-            print(f"✅ Background generation complete: {material_id}")
-            
-            # Уведомления
-            if group_id and material.status == ProcessingStatus.COMPLETED:
-                await send_group_notification(
-                    db, group_id, material.title,
-                    user_first_name, user_telegram_id
-                )
-                
-        except Exception as e:
-            print(f"❌ Background generation error: {e}")
-            traceback.print_exc()
-            
-            try:
-                await db.rollback()
-                result = await db.execute(
-                    select(Material).where(Material.id == material_id)
-                )
-                material = result.scalar_one_or_none()
-                if material:
-                    material.status = ProcessingStatus.FAILED
-                    await db.commit()
-            except:
-                pass
-
-
-async def send_group_notification(
-    db: AsyncSession,
-    group_id: UUID,
-    material_title: str,
-    user_first_name: Optional[str],
-    user_telegram_id: int
-):
-    """Отправка уведомлений группе"""
+async def save_upload_or_413(material_service: MaterialService, file: UploadFile, current_user: User):
+    """Потоковая запись загрузки; превышение MAX_FILE_SIZE_MB → 413 без чтения остатка"""
     try:
-        from app.services.notification_service import NotificationService
-        from app.services.group_service import GroupService
-        from app.main import bot_app
-        
-        if not bot_app:
-            return
-        
-        group_service = GroupService(db)
-        members = await group_service.get_group_members(group_id)
-        member_ids = [m.get("telegram_id") for m in members if m.get("telegram_id")]
-        
-        group = await group_service.get_group_by_id(group_id)
-        group_name = group.name if group else "Группа"
-        
-        notification_service = NotificationService(db)
-        sent = await notification_service.send_group_material_notification(
-            group_name=group_name,
-            material_title=material_title,
-            uploader_name=user_first_name or "Участник",
-            member_telegram_ids=member_ids,
-            exclude_user_id=user_telegram_id,
-            bot=bot_app.bot
+        return await material_service.save_upload_stream(
+            file, current_user.id, settings.MAX_FILE_SIZE_MB * 1024 * 1024
         )
-        print(f"📨 Notified {sent} members")
-    except Exception as e:
-        print(f"⚠️ Notification error: {e}")
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Файл слишком большой. Макс: {settings.MAX_FILE_SIZE_MB}MB")
+
+
+async def reserve_group_slot(db: AsyncSession, current_user: User, group_id: UUID, file_path: Optional[str] = None) -> None:
+    """
+    Лимит материалов группы. Строка группы остаётся заблокированной до commit
+    в create_material — вызывать непосредственно перед вставкой материала.
+    """
+    from app.services.group_service import GroupService
+    
+    can_add, message = await GroupService(db).can_add_material_to_group(current_user, group_id)
+    if not can_add:
+        await db.rollback()
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        raise HTTPException(status_code=400, detail=message)
+
+
+# ==================== Background Tasks ====================
+
+async def enqueue_processing(
+    db: AsyncSession,
+    material: Material,
+    current_user: User,
+    group_id: Optional[UUID] = None,
+    topic: Optional[str] = None,
+    commit: bool = True
+) -> None:
+    """
+    Поставить обработку материала в durable-очередь (processing_jobs).
+    commit=False — задача коммитится вместе с материалом: рестарт между вставкой
+    материала и задачи не оставит материал без обработки.
+    """
+    payload = {
+        "material_id": str(material.id),
+        "group_id": str(group_id) if group_id else None,
+        "user_telegram_id": current_user.telegram_id,
+        "user_first_name": current_user.first_name,
+    }
+    kind = JobKind.PROCESS_MATERIAL
+    if topic is not None:
+        payload["topic"] = topic
+        kind = JobKind.GENERATE_TOPIC
+    
+    await JobQueue(db).enqueue(kind, material_id=material.id, payload=payload, commit=commit)
 
 
 # ==================== Upload Endpoints ====================
@@ -207,20 +113,16 @@ async def upload_material(
     if group_id:
         from app.services.group_service import GroupService
         group_service = GroupService(db)
-        groups = await group_service.get_user_groups(current_user)
-        if not any(g["id"] == str(group_id) for g in groups):
+        if not await group_service.is_member(current_user, group_id):
             raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
         target_folder_id = group_id
     
-    content = await file.read()
-    size_mb = len(content) / (1024 * 1024)
-    
-    if size_mb > settings.MAX_FILE_SIZE_MB:
-        raise HTTPException(status_code=413, detail=f"Файл слишком большой. Макс: {settings.MAX_FILE_SIZE_MB}MB")
-    
     material_service = MaterialService(db)
-    material_type = material_service.detect_material_type(file.filename)
-    file_path = await material_service.save_uploaded_file(content, file.filename, current_user.id)
+    file_path, content_hash, _, sniffed_type = await save_upload_or_413(material_service, file, current_user)
+    material_type = material_service.detect_material_type(file.filename, sniffed_type)
+    
+    if group_id:
+        await reserve_group_slot(db, current_user, group_id, file_path)
     
     material = await material_service.create_material(
         user=current_user,
@@ -228,22 +130,18 @@ async def upload_material(
         material_type=material_type,
         file_path=file_path,
         original_filename=file.filename,
-        folder_id=target_folder_id
+        folder_id=target_folder_id,
+        content_hash=content_hash,
+        commit=False
     )
     
+    # 🚀 Ставим обработку в очередь — в той же транзакции, что и материал
+    if auto_process:
+        await enqueue_processing(db, material, current_user, group_id=group_id, commit=False)
+    
     await user_service.increment_request_count(current_user)
     await db.commit()
-    
-    # 🚀 Запускаем обработку В ФОНЕ
-    if auto_process:
-        asyncio.create_task(
-            process_material_background(
-                material_id=material.id,
-                group_id=group_id,
-                user_telegram_id=current_user.telegram_id,
-                user_first_name=current_user.first_name
-            )
-        )
+    await db.refresh(material)
     
     return material
 
@@ -271,37 +169,33 @@ async def create_text_material(
     if group_id:
         from app.services.group_service import GroupService
         group_service = GroupService(db)
-        groups = await group_service.get_user_groups(current_user)
-        if not any(g["id"] == str(group_id) for g in groups):
+        if not await group_service.is_member(current_user, group_id):
             raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
         target_folder_id = group_id
     
     material_service = MaterialService(db)
     
+    if group_id:
+        await reserve_group_slot(db, current_user, group_id)
+    
     # Создаём материал со статусом PROCESSING
     material = await material_service.create_material(
         user=current_user,
         title=title,
         material_type=MaterialType.TXT,
         folder_id=target_folder_id,
-        raw_content=content
+        raw_content=content,
+        commit=False
     )
     material.status = ProcessingStatus.PROCESSING
     
+    # 🚀 Ставим обработку в очередь (НЕ блокируем!) — одним commit с материалом
+    await enqueue_processing(db, material, current_user, group_id=group_id, commit=False)
+    
     await user_service.increment_request_count(current_user)
     await db.commit()
     await db.refresh(material)
     
-    # 🚀 Запускаем обработку В ФОНЕ (НЕ блокируем!)
-    asyncio.create_task(
-        process_material_background(
-            material_id=material.id,
-            group_id=group_id,
-            user_telegram_id=current_user.telegram_id,
-            user_first_name=current_user.first_name
-        )
-    )
-    
     return material
 
 
@@ -329,19 +223,20 @@ async def scan_image(
     if group_id:
         from app.services.group_service import GroupService
         group_service = GroupService(db)
-        groups = await group_service.get_user_groups(current_user)
-        if not any(g["id"] == str(group_id) for g in groups):
+        if not await group_service.is_member(current_user, group_id):
             raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
         target_folder_id = group_id
     
-    content = await file.read()
-    size_mb = len(content) / (1024 * 1024)
+    material_service = MaterialService(db)
+    file_path, content_hash, _, sniffed_type = await save_upload_or_413(material_service, file, current_user)
     
-    if size_mb > settings.MAX_FILE_SIZE_MB:
-        raise HTTPException(status_code=413, detail=f"Файл слишком большой")
+    # content_type задаёт клиент — проверяем настоящую сигнатуру
+    if sniffed_type != MaterialType.IMAGE:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail="Только изображения: JPG, PNG, WebP")
     
-    material_service = MaterialService(db)
-    file_path = await material_service.save_uploaded_file(content, file.filename, current_user.id)
+    if group_id:
+        await reserve_group_slot(db, current_user, group_id, file_path)
     
     # Создаём материал со статусом PROCESSING
     material = await material_service.create_material(
@@ -350,24 +245,19 @@ async def scan_image(
         material_type=MaterialType.IMAGE,
         file_path=file_path,
         original_filename=file.filename,
-        folder_id=target_folder_id
+        folder_id=target_folder_id,
+        content_hash=content_hash,
+        commit=False
     )
     material.status = ProcessingStatus.PROCESSING
     
+    # 🚀 Ставим обработку в очередь — одним commit с материалом
+    await enqueue_processing(db, material, current_user, group_id=group_id, commit=False)
+    
     await user_service.increment_request_count(current_user)
     await db.commit()
     await db.refresh(material)
     
-    # 🚀 Запускаем обработку В ФОНЕ
-    asyncio.create_task(
-        process_material_background(
-            material_id=material.id,
-            group_id=group_id,
-            user_telegram_id=current_user.telegram_id,
-            user_first_name=current_user.first_name
-        )
-    )
-    
     return material
 
 
@@ -394,11 +284,13 @@ async def generate_from_topic(
     if request.group_id:
         from app.services.group_service import GroupService
         group_service = GroupService(db)
-        groups = await group_service.get_user_groups(current_user)
-        if not any(g["id"] == request.group_id for g in groups):
+        if not await group_service.is_member(current_user, UUID(request.group_id)):
             raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
         target_folder_id = UUID(request.group_id)
     
+    if request.group_id:
+        await reserve_group_slot(db, current_user, target_folder_id)
+    
     # Создаём материал со статусом PROCESSING
     material = Material(
         user_id=current_user.id,
@@ -409,22 +301,20 @@ async def generate_from_topic(
         raw_content=""
     )
     db.add(material)
+    await db.flush()
+    
+    # 🚀 Ставим генерацию в очередь — одним commit с материалом
+    await enqueue_processing(
+        db, material, current_user,
+        group_id=UUID(request.group_id) if request.group_id else None,
+        topic=request.topic,
+        commit=False
+    )
     
     await user_service.increment_request_count(current_user)
     await db.commit()
     await db.refresh(material)
     
-    # 🚀 Запускаем генерацию В ФОНЕ
-    asyncio.create_task(
-        generate_topic_background(
-            material_id=material.id,
-            topic=request.topic,
-            group_id=UUID(request.group_id) if request.group_id else None,
-            user_telegram_id=current_user.telegram_id,
-            user_first_name=current_user.first_name
-        )
-    )
-    
     return material
 
 
@@ -432,46 +322,49 @@ async def generate_from_topic(
 
 @router.get("/", response_model=List[MaterialResponse])
 async def list_materials(
+    response: Response,
     folder_id: Optional[UUID] = None,
     limit: int = 50,
-    offset: int = 0,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Получить материалы пользователя"""
+    """Получить материалы пользователя (следующая страница — по X-Next-Cursor)"""
+    limit = clamp_limit(limit)
     material_service = MaterialService(db)
     materials = await material_service.get_user_materials(
         user_id=current_user.id,
         folder_id=folder_id,
-        limit=limit,
-        offset=offset
+        limit=limit + 1,
+        cursor=decode_cursor(cursor)
     )
-    return materials
+    return set_next_cursor(response, materials, limit)
 
 
 @router.get("/group/{group_id}", response_model=List[MaterialResponse])
 async def get_group_materials(
     group_id: UUID,
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Получить материалы группы"""
+    """Получить материалы группы (следующая страница — по X-Next-Cursor)"""
     from app.services.group_service import GroupService
     
     group_service = GroupService(db)
-    groups = await group_service.get_user_groups(current_user)
     
-    if not any(g["id"] == str(group_id) for g in groups):
+    if not await group_service.is_member(current_user, group_id):
         raise HTTPException(status_code=403, detail="Вы не состоите в этой группе")
     
-    result = await db.execute(
-        select(Material)
-        .where(Material.folder_id == group_id)
-        .order_by(Material.created_at.desc())
+    limit = clamp_limit(limit)
+    material_service = MaterialService(db)
+    materials = await material_service.get_group_materials(
+        group_id, limit=limit + 1, cursor=decode_cursor(cursor)
     )
-    materials = result.scalars().all()
     
-    return materials
+    return set_next_cursor(response, materials, limit)
 
 
 @router.get("/search/all")
@@ -485,39 +378,26 @@ async def search_materials(
     if not q or len(q.strip()) < 2:
         return []
     
-    search_query = f"%{q.strip().lower()}%"
-    
     from app.services.group_service import GroupService
     group_service = GroupService(db)
-    user_groups = await group_service.get_user_groups(current_user)
-    group_ids = [UUID(g["id"]) for g in user_groups]
+    group_ids = await group_service.get_user_group_ids(current_user)
     
-    conditions = [Material.user_id == current_user.id]
-    
-    if group_ids:
-        conditions.append(Material.folder_id.in_(group_ids))
-    
-    result = await db.execute(
-        select(Material)
-        .where(
-            or_(*conditions),
-            func.lower(Material.title).like(search_query)
-        )
-        .order_by(Material.created_at.desc())
-        .limit(limit)
+    material_service = MaterialService(db)
+    materials = await material_service.search_materials(
+        current_user.id, group_ids, q, limit=min(limit, 100)
     )
     
-    materials = result.scalars().all()
-    
     return [
         {
-            "id": str(m.id),
-            "title": m.title,
-            "material_type": m.material_type.value,
-            "status": m.status.value,
-            "folder_id": str(m.folder_id) if m.folder_id else None,
-            "created_at": m.created_at.isoformat(),
-            "is_own": m.user_id == current_user.id
+            "id": str(m["id"]),
+            "title": m["title"],
+            "material_type": m["material_type"],
+            "status": m["status"],
+            "folder_id": str(m["folder_id"]) if m["folder_id"] else None,
+            "created_at": m["created_at"].isoformat() if m["created_at"] else None,
+            "is_own": m["user_id"] == current_user.id,
+            "rank": round(float(m["rank"]), 4) if m["rank"] is not None else None,
+            "snippet": m["snippet"]
         }
         for m in materials
     ]
@@ -528,14 +408,27 @@ async def search_materials(
 @router.get("/{material_id}")
 async def get_material(
     material_id: UUID,
+    request: Request,
+    response: Response,
+    formats: Optional[str] = None,
+    include_content: bool = True,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """Получить материал с AI-выводами"""
+    """
+    Получить материал с AI-выводами.
+    formats=quiz,flashcards — только эти форматы; include_content=false — без текста материала.
+    Поддерживает If-None-Match → 304 (ETag из версий материала и выводов).
+    """
+    # Сначала только метаданные: ETag считается без чтения текста и выводов
     result = await db.execute(
         select(Material)
         .options(
-            selectinload(Material.outputs),
+            load_only(
+                Material.id, Material.user_id, Material.title, Material.material_type,
+                Material.status, Material.folder_id, Material.original_filename,
+                Material.created_at, Material.updated_at
+            ),
             selectinload(Material.folder)
         )
         .where(Material.id == material_id)
@@ -555,15 +448,45 @@ async def get_material(
         if material.folder and material.folder.is_group:
             group_id = material.folder_id
         
-        from app.services.group_service import GroupService
-        group_service = GroupService(db)
-        groups = await group_service.get_user_groups(current_user)
-        if any(g["id"] == str(material.folder_id) for g in groups):
-            has_access = True
+        if not has_access:
+            from app.services.group_service import GroupService
+            group_service = GroupService(db)
+            has_access = await group_service.is_member(current_user, material.folder_id)
     
     if not has_access:
         raise HTTPException(status_code=403, detail="Нет доступа к материалу")
     
+    selected_formats = parse_formats(formats)
+    outputs_query = select(AIOutput.id, AIOutput.format, AIOutput.created_at).where(
+        AIOutput.material_id == material_id
+    )
+    if selected_formats:
+        outputs_query = outputs_query.where(AIOutput.format.in_(selected_formats))
+    outputs_meta = (await db.execute(outputs_query.order_by(AIOutput.created_at))).all()
+    
+    etag = make_etag(
+        material.id, material.updated_at, material.status, material.folder_id, group_id,
+        include_content, selected_formats,
+        *[(o.id, o.created_at) for o in outputs_meta]
+    )
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    raw_content = None
+    if include_content:
+        raw_content = await db.scalar(
+            select(Material.extracted_text).where(Material.id == material_id)
+        )
+    
+    contents = {}
+    if outputs_meta:
+        contents_result = await db.execute(
+            select(AIOutput.id, AIOutput.content)
+            .where(AIOutput.id.in_([o.id for o in outputs_meta]))
+        )
+        contents = dict(contents_result.all())
+    
     return {
         "id": str(material.id),
         "user_id": str(material.user_id),
@@ -572,7 +495,7 @@ async def get_material(
         "status": material.status,  # ← Убрали .value!
         "folder_id": str(material.folder_id) if material.folder_id else None,
         "group_id": str(group_id) if group_id else None,
-        "raw_content": material.extracted_text,  # ← Используем правильное имя поля
+        "raw_content": raw_content,
         "original_filename": material.original_filename,
         "created_at": material.created_at.isoformat() if material.created_at else None,
         "updated_at": material.updated_at.isoformat() if material.updated_at else None,
@@ -580,10 +503,10 @@ async def get_material(
             {
                 "id": str(o.id),
                 "format": o.format if isinstance(o.format, str) else o.format.value,  # ← Безопасно!
-                "content": o.content,
+                "content": contents.get(o.id),
                 "created_at": o.created_at.isoformat() if o.created_at else None
             }
-            for o in material.outputs
+            for o in outputs_meta
         ]
     }
 
@@ -1,13 +1,14 @@
 # backend/app/api/routes/outputs.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, load_only
 from uuid import UUID
 from typing import Optional
 
 from app.models import get_db, User, AIOutput, Material
 from app.api.deps import get_current_user
+from app.api.caching import make_etag, is_not_modified, not_modified_response, set_etag, parse_formats
 
 router = APIRouter(prefix="/outputs", tags=["outputs"])
 
@@ -28,8 +29,7 @@ async def check_material_access(
     if material.folder_id:
         from app.services.group_service import GroupService
         group_service = GroupService(db)
-        groups = await group_service.get_user_groups(current_user)
-        if any(g["id"] == str(material.folder_id) for g in groups):
+        if await group_service.is_member(current_user, material.folder_id):
             return True
     
     return False
@@ -38,12 +38,17 @@ async def check_material_access(
 @router.get("/material/{material_id}")
 async def get_material_outputs(
     material_id: UUID,
+    request: Request,
+    response: Response,
     format: Optional[str] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    """Выводы материала; format=quiz или format=quiz,flashcards. If-None-Match → 304"""
     material_result = await db.execute(
-        select(Material).where(Material.id == material_id)
+        select(Material)
+        .options(load_only(Material.id, Material.user_id, Material.folder_id, Material.title))
+        .where(Material.id == material_id)
     )
     material = material_result.scalar_one_or_none()
     
@@ -54,13 +59,31 @@ async def get_material_outputs(
     if not has_access:
         raise HTTPException(status_code=403, detail="Нет доступа к материалу")
     
-    query = select(AIOutput).where(AIOutput.material_id == material_id)
+    selected_formats = parse_formats(format)
+    condition = AIOutput.material_id == material_id
+    if selected_formats:
+        condition = condition & AIOutput.format.in_(selected_formats)
     
-    if format:
-        query = query.where(AIOutput.format == format)
+    def outputs_etag(rows) -> str:
+        return make_etag(material_id, material.title, selected_formats, *[(o.id, o.created_at) for o in rows])
     
-    result = await db.execute(query.order_by(AIOutput.created_at))
-    outputs = result.scalars().all()
+    # ETag держится на том, что перегенерация (processing_service / processing.py)
+    # удаляет строку формата и вставляет новую — новая версия всегда с новым id
+    versions = (await db.execute(
+        select(AIOutput.id, AIOutput.created_at).where(condition).order_by(AIOutput.created_at)
+    )).all()
+    etag = outputs_etag(versions)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    
+    # Содержимое — одним запросом по тем же material_id/форматам (индекс ix_ai_outputs_material_format)
+    outputs = (await db.execute(
+        select(AIOutput.id, AIOutput.format, AIOutput.content, AIOutput.created_at)
+        .where(condition)
+        .order_by(AIOutput.created_at)
+    )).all()
+    # ETag по тому, что реально отдаём (вывод мог перегенерироваться между запросами)
+    set_etag(response, outputs_etag(outputs))
     
     return {
         "material_id": str(material_id),
@@ -80,12 +103,17 @@ async def get_material_outputs(
 @router.get("/{output_id}")
 async def get_output(
     output_id: UUID,
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     result = await db.execute(
         select(AIOutput)
-        .options(selectinload(AIOutput.material))
+        .options(
+            load_only(AIOutput.id, AIOutput.material_id, AIOutput.format, AIOutput.created_at),
+            selectinload(AIOutput.material).load_only(Material.id, Material.user_id, Material.folder_id)
+        )
         .where(AIOutput.id == output_id)
     )
     output = result.scalar_one_or_none()
@@ -97,10 +125,17 @@ async def get_output(
     if not has_access:
         raise HTTPException(status_code=403, detail="Нет доступа")
     
+    etag = make_etag(output.id, output.created_at)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    content = await db.scalar(select(AIOutput.content).where(AIOutput.id == output_id))
+    
     return {
         "id": str(output.id),
         "material_id": str(output.material_id),
         "format": get_val(output.format),
-        "content": output.content,
+        "content": content,
         "created_at": output.created_at.isoformat() if output.created_at else None
-    }
\ No newline at end of file
+    }
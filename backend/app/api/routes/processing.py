@@ -3,10 +3,13 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 
-from app.models import get_db, User, ProcessingStatus, OutputFormat
+from app.models import get_db, User, ProcessingStatus, OutputFormat, AsyncSessionLocal
 from app.services import MaterialService
-from app.services.processing_service import ProcessingService
+from app.services.processing_service import ProcessingService, clean_text_for_db
+from app.services.ai_service import gemini_service
+from app.services.long_document import needs_map_reduce, condense_long_content
 from app.api.deps import get_current_user
+from app.api.streaming import stream_tokens, sse_response, sse_event
 from app.api.schemas import SuccessResponse
 
 router = APIRouter(prefix="/processing", tags=["processing"])
@@ -66,6 +69,65 @@ async def regenerate_output(
     }
 
 
+@router.post("/material/{material_id}/regenerate/{output_format}/stream")
+async def regenerate_output_stream(
+    material_id: UUID,
+    output_format: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Перегенерировать формат потоком (SSE); итог сохраняется после `done`"""
+    material_service = MaterialService(db)
+    material = await material_service.get_by_id(material_id, current_user.id)
+    
+    if not material:
+        raise HTTPException(status_code=404, detail="Material not found")
+    
+    if not material.raw_content:
+        raise HTTPException(status_code=400, detail="Material has no content")
+    
+    if output_format not in gemini_service.STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid format. Available: {list(gemini_service.STREAM_FORMATS)}"
+        )
+    
+    # Сессия запроса закроется раньше, чем генератор ответа — берём нужное заранее
+    raw_content = clean_text_for_db(material.raw_content)
+    title = material.title
+    
+    async def events():
+        content = raw_content
+        if needs_map_reduce(content):
+            # Map-шаг может идти долго (если выжимок ещё нет в кэше) — клиент видит прогресс сразу
+            yield sse_event({"stage": "condensing", "chars": len(content)}, "progress")
+            try:
+                content, _ = await condense_long_content(content, title)
+            except Exception as e:
+                print(f"❌ regenerate/{output_format} condense error: {e}")
+                yield sse_event({"error": str(e)}, "error")
+                return
+        
+        prompt = gemini_service.build_format_prompt(output_format, content, title)
+        
+        async def on_complete(text: str) -> dict:
+            # Как и обычная перегенерация — обновляем кэш ответов свежим вариантом
+            await gemini_service.cache_streamed_output(output_format, content, title, text)
+            # Сессия запроса к этому моменту может быть закрыта — пишем в своей, тем же save_output
+            async with AsyncSessionLocal() as session:
+                output = await ProcessingService(session).save_output(
+                    material_id, output_format, gemini_service.finalize_format_output(output_format, text)
+                )
+            return {"output_id": str(output.id), "format": output_format, "content": output.content}
+        
+        async for event in stream_tokens(
+            gemini_service.generate_stream(prompt), on_complete, label=f"regenerate/{output_format}"
+        ):
+            yield event
+    
+    return sse_response(events())
+
+
 @router.get("/material/{material_id}/status")
 async def get_processing_status(
     material_id: UUID,
@@ -2,12 +2,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 from uuid import UUID
 
 from app.models import get_db, User
-from app.services.vector_service import VectorService
+from app.services.vector_service import VectorService, NO_MATERIALS_ANSWER
+from app.services.ai_service import gemini_service
 from app.api.deps import get_current_user
+from app.api.streaming import stream_tokens, sse_response, sse_event
 
 router = APIRouter(prefix="/search", tags=["search"])
 
@@ -15,13 +17,16 @@ router = APIRouter(prefix="/search", tags=["search"])
 class AskLibraryRequest(BaseModel):
     question: str
     material_id: Optional[str] = None  # Если указан — ищем только в этом материале
+    mode: Optional[Literal["vector", "hybrid", "lexical"]] = None  # по умолчанию RAG_SEARCH_MODE
 
 
 class SearchResult(BaseModel):
     material_id: str
     material_title: str
     content: str
-    similarity: float
+    similarity: Optional[float] = None  # cosine; None у чисто лексических совпадений
+    score: Optional[float] = None  # по чему ранжировали: cosine / ts_rank_cd / RRF
+    match_type: Optional[Literal["vector", "lexical", "hybrid"]] = None
 
 
 class AskLibraryResponse(BaseModel):
@@ -48,16 +53,52 @@ async def ask_library(
         raise HTTPException(status_code=400, detail="Вопрос слишком короткий")
     
     vector_service = VectorService(db)
-    result = await vector_service.ask_library(current_user.id, request.question)
+    result = await vector_service.ask_library(current_user.id, request.question, mode=request.mode)
     
     return result
 
 
+@router.post("/ask/stream")
+async def ask_library_stream(
+    request: AskLibraryRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Спроси свою библиотеку — ответ потоком (SSE: token… → done с sources)"""
+    if not current_user.can_use_feature('vector_search'):
+        raise HTTPException(
+            status_code=403, 
+            detail="Vector Search доступен только в Pro подписке"
+        )
+    
+    if not request.question or len(request.question.strip()) < 3:
+        raise HTTPException(status_code=400, detail="Вопрос слишком короткий")
+    
+    vector_service = VectorService(db)
+    chunks = await vector_service.search(current_user.id, request.question, limit=5, mode=request.mode)
+    
+    if not chunks:
+        async def empty():
+            yield sse_event({"text": NO_MATERIALS_ANSWER, "answer": NO_MATERIALS_ANSWER, "sources": []}, "done")
+        return sse_response(empty())
+    
+    sources = vector_service.format_sources(chunks)
+    prompt = vector_service.build_rag_prompt(request.question, chunks)
+    
+    async def on_complete(text: str) -> dict:
+        return {"answer": text, "sources": sources}
+    
+    return sse_response(stream_tokens(
+        gemini_service.generate_stream(prompt), on_complete, label="search/ask"
+    ))
+
+
 @router.get("/semantic")
 async def semantic_search(
     q: str,
     limit: int = 10,
     material_id: Optional[str] = None,
+    mode: Optional[Literal["vector", "hybrid", "lexical"]] = None,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -80,7 +121,8 @@ async def semantic_search(
         user_id=current_user.id,
         query=q,
         limit=limit,
-        material_id=material_uuid
+        material_id=material_uuid,
+        mode=mode
     )
     
     return results
@@ -118,4 +160,8 @@ async def index_material(
         content=material.raw_content
     )
     
-    return {"success": True, "chunks_indexed": chunks_count}
\ No newline at end of file
+    return {
+        "success": True,
+        "chunks_indexed": chunks_count,
+        "timings": vector_service.last_index_timings
+    }
\ No newline at end of file
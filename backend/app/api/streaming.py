@@ -0,0 +1,59 @@
+# backend/app/api/streaming.py
+import json
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional, Dict, Any
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(data: Dict[str, Any], event: str = "message") -> str:
+    """Одно событие Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_tokens(
+    chunks: AsyncIterator[str],
+    on_complete: Optional[Callable[[str], Awaitable[Optional[Dict[str, Any]]]]] = None,
+    label: str = "stream"
+) -> AsyncIterator[str]:
+    """Проксирует куски LLM как SSE `token`, в конце — `done` с полным текстом.
+    
+    on_complete получает накопленный текст (например, чтобы сохранить его в БД)
+    и может вернуть доп. поля для события `done`.
+    """
+    started = time.perf_counter()
+    first_token_at = None
+    parts = []
+    
+    try:
+        async for chunk in chunks:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                print(f"⚡ {label} TTFT: {(first_token_at - started) * 1000:.0f}ms")
+            parts.append(chunk)
+            yield sse_event({"text": chunk}, "token")
+        
+        full_text = "".join(parts)
+        extra = await on_complete(full_text) if on_complete else None
+        
+        finished = time.perf_counter()
+        yield sse_event({
+            "text": full_text,
+            "ttft_ms": round(((first_token_at or finished) - started) * 1000),
+            "total_ms": round((finished - started) * 1000),
+            **(extra or {}),
+        }, "done")
+    except Exception as e:
+        print(f"❌ {label} stream error: {e}")
+        yield sse_event({"error": str(e)}, "error")
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # без буферизации на прокси
+        },
+    )
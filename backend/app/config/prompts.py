@@ -103,6 +103,24 @@ FLASHCARDS_PROMPT = """Создай {num_cards} флэш-карточек.
 
 Создай МИНИМУМ {num_cards} карточек! Верни ТОЛЬКО JSON."""
 
+OCR_PROMPT = "Извлеки весь текст. Сохрани структуру. Только текст, без комментариев."
+
+# Map-шаг для длинных материалов: сжатие раздела без потери учебного содержания
+SECTION_DIGEST_PROMPT = """Сожми фрагмент учебного материала в плотную выжимку для дальнейшей генерации конспекта, теста, глоссария и карточек.
+
+Материал: {title}
+
+Фрагмент:
+{content}
+
+Требования:
+- Сохрани все ключевые идеи, определения терминов, формулы, даты, числа и примеры
+- Не добавляй ничего, чего нет во фрагменте
+- Пиши кратко, списками, на языке фрагмента
+- Объём: не больше {max_words} слов
+
+Выжимка:"""
+
 
 # ===== Insight Service Prompts =====
 
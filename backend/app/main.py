@@ -1,6 +1,7 @@
 # backend/app/main.py
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
@@ -45,9 +46,23 @@ async def lifespan(app: FastAPI):
         print(f"⚠️ Scheduler failed to start: {e}")
         traceback.print_exc()
     
+    # ===== ВОРКЕРЫ ОЧЕРЕДИ ОБРАБОТКИ =====
+    if settings.EMBEDDED_WORKER:
+        try:
+            from app.services.job_queue import start_embedded_workers
+            start_embedded_workers()
+            print(f"👷 Embedded job workers: {settings.JOB_WORKER_CONCURRENCY}")
+        except Exception as e:
+            print(f"⚠️ Job workers failed to start: {e}")
+            traceback.print_exc()
+    
     yield
     
     # Shutdown
+    if settings.EMBEDDED_WORKER:
+        from app.services.job_queue import stop_embedded_workers
+        await stop_embedded_workers()
+    
     # ===== ОСТАНОВКА ПЛАНИРОВЩИКА =====
     try:
         from app.services.scheduler import stop_scheduler
@@ -55,6 +70,12 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️ Scheduler failed to stop: {e}")
     
+    from app.services.llm_client import llm_client
+    await llm_client.aclose()
+    
+    from app.services.pdf_extractor import shutdown_pdf_pool
+    shutdown_pdf_pool()
+    
     if bot_app:
         await bot_app.shutdown()
     print("👋 Shutting down...")
@@ -76,6 +97,9 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Сжатие ответов (SSE text/event-stream Starlette не сжимает)
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=6)
+
 # Глобальный обработчик ошибок
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -111,10 +135,21 @@ async def telegram_webhook(request: Request):
 @app.get("/api/health")
 async def health_check():
     from app.services.scheduler import scheduler
+    from app.services.embedding_cache import embedding_cache, query_embedding_cache
+    from app.services.llm_client import llm_client
+    from app.models.base import pool_stats
+    from app.services.auth_cache import auth_cache
+    from app.services.ai_output_cache import ai_output_cache
     return {
         "status": "healthy", 
         "bot": bot_app is not None,
-        "scheduler": scheduler.running if scheduler else False
+        "scheduler": scheduler.running if scheduler else False,
+        "embedding_cache": embedding_cache.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "llm": llm_client.stats(),
+        "db_pool": pool_stats(),
+        "auth_cache": auth_cache.stats(),
+        "ai_output_cache": ai_output_cache.stats()
     }
 
 # Путь к статическим файлам frontend
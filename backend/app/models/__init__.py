@@ -8,6 +8,9 @@ from app.models.ai_output import AIOutput, OutputFormat
 from app.models.quiz_result import QuizResult
 from app.models.text_chunk import TextChunk
 from app.models.insight import Insight
+from app.models.embedding_cache import EmbeddingCacheEntry
+from app.models.ai_output_cache import AIOutputCacheEntry
+from app.models.processing_job import ProcessingJob, JobKind, JobStatus
 
 
 __all__ = [
@@ -29,4 +32,9 @@ __all__ = [
     "QuizResult",
     "TextChunk",
     "Insight",
+    "EmbeddingCacheEntry",
+    "AIOutputCacheEntry",
+    "ProcessingJob",
+    "JobKind",
+    "JobStatus",
 ]
\ No newline at end of file
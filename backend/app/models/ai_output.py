@@ -1,5 +1,5 @@
 # backend/app/models/ai_output.py
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -31,4 +31,9 @@ class AIOutput(Base):
     created_at = Column(DateTime, server_default=func.now())
     
     # Relationships
-    material = relationship("Material", back_populates="outputs")
\ No newline at end of file
+    material = relationship("Material", back_populates="outputs")
+    
+    # Индексы под горячие запросы (миграция 006_hot_path_indexes)
+    __table_args__ = (
+        Index('ix_ai_outputs_material_format', 'material_id', 'format'),
+    )
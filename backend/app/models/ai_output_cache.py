@@ -0,0 +1,25 @@
+# backend/app/models/ai_output_cache.py
+from sqlalchemy import Column, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class AIOutputCacheEntry(Base):
+    """Persistent-кэш ответов Gemini: (модель, формат, sha256 входа, версия шаблона промпта)"""
+    __tablename__ = "ai_output_cache"
+    
+    model = Column(String(100), primary_key=True)
+    format = Column(String(50), primary_key=True)
+    input_hash = Column(String(64), primary_key=True)
+    prompt_version = Column(String(16), primary_key=True)
+    
+    content = Column(Text, nullable=False)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    last_used_at = Column(DateTime, server_default=func.now())
+    
+    # Вытеснение самых давно использованных записей (AIOutputCache.prune)
+    __table_args__ = (
+        Index('ix_ai_output_cache_last_used', 'last_used_at'),
+    )
@@ -3,17 +3,35 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy.pool import NullPool
 import ssl
+from typing import Dict, Any
 
 from app.core.config import settings
 
 database_url = settings.get_database_url()
+pool_mode = settings.get_db_pool_mode()
 
-print(f"📦 Connecting to database...")
+print(f"📦 Connecting to database (pool mode: {pool_mode})...")
 
-# Настройки для asyncpg + Supabase PgBouncer
-connect_args = {
-    "statement_cache_size": 0,  # Обязательно для PgBouncer!
-}
+if pool_mode == "pgbouncer":
+    # Transaction mode PgBouncer: prepared statements не переживают транзакцию
+    connect_args = {
+        "statement_cache_size": 0,  # Обязательно для PgBouncer!
+    }
+    pool_args = {
+        "poolclass": NullPool,  # PgBouncer сам делает pooling
+    }
+else:
+    # Прямое подключение или session-пулер: держим соединения и кэшируем statements
+    connect_args = {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+    pool_args = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,  # пулер/БД могут закрыть простаивающее соединение
+    }
 
 # SSL для Supabase
 if "supabase" in database_url or "pooler.supabase" in database_url:
@@ -26,8 +44,8 @@ if "supabase" in database_url or "pooler.supabase" in database_url:
 engine = create_async_engine(
     database_url, 
     echo=False,
-    poolclass=NullPool,  # Обязательно! Supabase сам делает pooling
     connect_args=connect_args,
+    **pool_args,
 )
 
 AsyncSessionLocal = sessionmaker(
@@ -51,4 +69,18 @@ async def get_db():
             await session.close()
 
 
-__all__ = ["Base", "get_db", "engine", "AsyncSessionLocal"]
\ No newline at end of file
+def pool_stats() -> Dict[str, Any]:
+    """Состояние пула соединений для /api/health"""
+    pool = engine.pool
+    if isinstance(pool, NullPool):
+        return {"mode": pool_mode}
+    return {
+        "mode": pool_mode,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+
+
+__all__ = ["Base", "get_db", "engine", "AsyncSessionLocal", "pool_stats"]
\ No newline at end of file
@@ -0,0 +1,19 @@
+# backend/app/models/embedding_cache.py
+from sqlalchemy import Column, String, DateTime, Float
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+
+from app.models.base import Base
+
+
+class EmbeddingCacheEntry(Base):
+    """Persistent-кэш embeddings: (модель, task_type, sha256 нормализованного текста)"""
+    __tablename__ = "embedding_cache"
+    
+    model = Column(String(100), primary_key=True)
+    task_type = Column(String(50), primary_key=True)
+    text_hash = Column(String(64), primary_key=True)
+    
+    embedding = Column(ARRAY(Float), nullable=False)
+    
+    created_at = Column(DateTime, server_default=func.now())
@@ -12,7 +12,7 @@ class Folder(Base):
     __tablename__ = "folders"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
     parent_id = Column(UUID(as_uuid=True), ForeignKey("folders.id"), nullable=True)
     
     name = Column(String(255), nullable=False)
@@ -23,6 +23,10 @@ class Folder(Base):
     description = Column(String(500), nullable=True)
     max_members = Column(Integer, default=50)
     
+    # Денормализованные счётчики, ведутся триггерами (миграция 005_group_counters)
+    member_count = Column(Integer, default=0, server_default="0", nullable=False)
+    materials_count = Column(Integer, default=0, server_default="0", nullable=False)
+    
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     
@@ -57,8 +61,4 @@ class Folder(Base):
     def generate_invite_code(self) -> str:
         if not self.invite_code:
             self.invite_code = secrets.token_urlsafe(8)[:10].upper()
-        return self.invite_code
-    
-    @property
-    def member_count(self) -> int:
-        return len(self.members) if self.members else 0
\ No newline at end of file
+        return self.invite_code
\ No newline at end of file
@@ -1,5 +1,5 @@
 # backend/app/models/group_member.py
-from sqlalchemy import Column, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, String, DateTime, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -32,4 +32,6 @@ class GroupMember(Base):
     
     __table_args__ = (
         UniqueConstraint('group_id', 'user_id', name='uq_group_member'),
+        # Членства пользователя (миграция 006_hot_path_indexes)
+        Index('ix_group_members_user_group', 'user_id', 'group_id', postgresql_include=['role']),
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
 # backend/app/models/material.py
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -40,6 +40,10 @@ class Material(Base):
     status = Column(String(20), default=ProcessingStatus.PENDING)
     
     extracted_text = Column(Text, nullable=True)
+    # SHA-256 исходного файла, считается при потоковой загрузке
+    content_hash = Column(String(64), nullable=True)
+    # search_vector (generated tsvector) + GIN/trigram индексы создаются миграцией
+    # 007_materials_fts — в ORM не объявляем, MaterialService.search_materials работает через SQL
     
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, onupdate=func.now())
@@ -65,6 +69,16 @@ class Material(Base):
     quiz_results = relationship("QuizResult", back_populates="material", cascade="all, delete-orphan")
     chunks = relationship("TextChunk", back_populates="material", cascade="all, delete-orphan")
     
+    # Индексы под горячие запросы (миграция 006_hot_path_indexes)
+    __table_args__ = (
+        Index('ix_materials_user_folder_created', 'user_id', 'folder_id', text('created_at DESC')),
+        Index('ix_materials_folder_created', 'folder_id', text('created_at DESC'),
+              postgresql_where=text('folder_id IS NOT NULL')),
+        Index('ix_materials_content_hash', 'content_hash',
+              postgresql_where=text('content_hash IS NOT NULL')),
+    )
+
+    
     @property
     def raw_content(self):
         return self.extracted_text
@@ -0,0 +1,46 @@
+# backend/app/models/processing_job.py
+from sqlalchemy import Column, String, Text, DateTime, Integer, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.sql import func
+import uuid
+
+from app.models.base import Base
+
+
+class JobKind:
+    PROCESS_MATERIAL = "process_material"
+    GENERATE_TOPIC = "generate_topic"
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class ProcessingJob(Base):
+    """Задача фоновой обработки (очередь в Postgres, забирается через SKIP LOCKED)"""
+    __tablename__ = "processing_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    kind = Column(String(50), nullable=False)
+    material_id = Column(UUID(as_uuid=True), nullable=True, index=True)
+    payload = Column(JSONB, nullable=False, default=dict)
+    
+    # VARCHAR вместо ENUM!
+    status = Column(String(20), nullable=False, default=JobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    
+    run_at = Column(DateTime, nullable=False, server_default=func.now())
+    locked_until = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index('ix_processing_jobs_status_run_at', 'status', 'run_at'),
+    )
@@ -1,5 +1,5 @@
 # backend/app/models/quiz_result.py
-from sqlalchemy import Column, Integer, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, func, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 import uuid
@@ -24,4 +24,12 @@ class QuizResult(Base):
     # Relationships — используем back_populates
     user = relationship("User", back_populates="quiz_results")
     material = relationship("Material", back_populates="quiz_results")
-    group = relationship("Folder", back_populates="quiz_results")
\ No newline at end of file
+    group = relationship("Folder", back_populates="quiz_results")
+    
+    # Индексы под горячие запросы (миграция 006_hot_path_indexes)
+    __table_args__ = (
+        Index('ix_quiz_results_group_user', 'group_id', 'user_id'),
+        Index('ix_quiz_results_user_id', 'user_id'),
+        Index('ix_quiz_results_material_id', 'material_id'),
+        Index('ix_quiz_results_group_completed', 'group_id', text('completed_at DESC'), text('id DESC')),
+    )
@@ -1,5 +1,5 @@
 # backend/app/models/text_chunk.py
-from sqlalchemy import Column, Text, Integer, ForeignKey, Float
+from sqlalchemy import Column, Text, Integer, ForeignKey, Float, Index
 from sqlalchemy.dialects.postgresql import UUID, ARRAY
 from sqlalchemy.orm import relationship
 import uuid
@@ -20,8 +20,18 @@ class TextChunk(Base):
     # Embedding — массив float (768 dimensions для Gemini)
     embedding = Column(ARRAY(Float), nullable=True)
     
+    # embedding_vec vector(768) + HNSW-индекс создаются миграцией 002_pgvector_embeddings
+    # только если в БД есть расширение pgvector — в ORM колонку не объявляем,
+    # VectorService работает с ней через raw SQL
+    # content_tsv (generated tsvector + GIN) — миграция 008_text_chunks_fts, тоже только SQL
+    
     char_start = Column(Integer, nullable=True)
     char_end = Column(Integer, nullable=True)
     
     # Relationships
-    material = relationship("Material", back_populates="chunks")
\ No newline at end of file
+    material = relationship("Material", back_populates="chunks")
+    
+    # Индексы под горячие запросы (миграция 006_hot_path_indexes)
+    __table_args__ = (
+        Index('ix_text_chunks_material_chunk', 'material_id', 'chunk_index'),
+    )
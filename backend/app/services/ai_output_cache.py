@@ -0,0 +1,184 @@
+# backend/app/services/ai_output_cache.py
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import text
+
+from app.config import prompts
+from app.core.config import settings
+from app.services.embedding_cache import text_hash
+
+# Формат → шаблон промпта: изменился шаблон — меняется версия, старые ответы не находятся
+FORMAT_TEMPLATES = {
+    "topic": prompts.TOPIC_GENERATION_PROMPT,
+    "smart_notes": prompts.SMART_NOTES_PROMPT,
+    "tldr": prompts.TLDR_PROMPT,
+    "quiz": prompts.QUIZ_PROMPT,
+    "glossary": prompts.GLOSSARY_PROMPT,
+    "flashcards": prompts.FLASHCARDS_PROMPT,
+    # OCR страниц PDF: вход — sha256 содержимого страницы
+    "ocr": prompts.OCR_PROMPT,
+    # Map-шаг длинных материалов: повторная генерация формата не пересчитывает выжимки
+    "section_digest": prompts.SECTION_DIGEST_PROMPT,
+}
+
+PROMPT_VERSIONS = {
+    output_format: hashlib.sha256(template.encode('utf-8')).hexdigest()[:16]
+    for output_format, template in FORMAT_TEMPLATES.items()
+}
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def make_key(model: str, output_format: str, *inputs) -> CacheKey:
+    """(модель, формат, sha256 нормализованного входа промпта, версия шаблона)"""
+    input_hash = text_hash("\x1f".join(str(part) for part in inputs))
+    return (model, output_format, input_hash, PROMPT_VERSIONS[output_format])
+
+
+class AIOutputCache:
+    """Кэш ответов Gemini: LRU в процессе + таблица ai_output_cache, общая для всех материалов"""
+
+    def __init__(self, max_size: int, max_rows: int):
+        self.max_size = max_size
+        self.max_rows = max_rows
+        self._lru: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def enabled(self) -> bool:
+        # Ответы fake-бэкенда (нагрузочные прогоны) не кэшируем — иначе их отдаст и Gemini-режим
+        return self.max_rows > 0 and settings.LLM_BACKEND != "fake"
+
+    def _put_local(self, key: CacheKey, content: str) -> None:
+        if self.max_size <= 0:
+            return
+        self._lru[key] = content
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+
+    @staticmethod
+    def _params(key: CacheKey) -> Dict[str, str]:
+        model, output_format, input_hash, prompt_version = key
+        return {
+            "model": model,
+            "format": output_format,
+            "input_hash": input_hash,
+            "prompt_version": prompt_version,
+        }
+
+    async def get(self, key: CacheKey, force: bool = False) -> Optional[str]:
+        """Готовый ответ или None; force — явная перегенерация, кэш не читаем"""
+        if not self.enabled:
+            return None
+        if force:
+            self.bypassed += 1
+            return None
+
+        content = self._lru.get(key)
+        if content is not None:
+            self._lru.move_to_end(key)
+            self.memory_hits += 1
+            return content
+
+        from app.models import AsyncSessionLocal
+        try:
+            # Отдельная короткая сессия: генерация идёт параллельно с записью вызывающего
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    text("""
+                        UPDATE ai_output_cache SET last_used_at = now()
+                        WHERE model = :model AND format = :format
+                          AND input_hash = :input_hash AND prompt_version = :prompt_version
+                        RETURNING content
+                    """),
+                    self._params(key)
+                )
+                content = result.scalar_one_or_none()
+                await db.commit()
+        except Exception as e:
+            # Кэш не критичен — без него просто вызовем модель
+            print(f"⚠️ AI output cache lookup failed: {e}")
+            content = None
+
+        if content is None:
+            self.misses += 1
+            return None
+
+        self._put_local(key, content)
+        self.db_hits += 1
+        return content
+
+    async def put(self, key: CacheKey, content: str) -> None:
+        """Сохранить ответ (перезаписывает — после force-перегенерации отдаём свежий)"""
+        if not self.enabled or not content:
+            return
+
+        self._put_local(key, content)
+
+        from app.models import AsyncSessionLocal
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    text("""
+                        INSERT INTO ai_output_cache (model, format, input_hash, prompt_version, content)
+                        VALUES (:model, :format, :input_hash, :prompt_version, :content)
+                        ON CONFLICT (model, format, input_hash, prompt_version)
+                        DO UPDATE SET content = EXCLUDED.content, last_used_at = now()
+                    """),
+                    {**self._params(key), "content": content}
+                )
+                await db.commit()
+        except Exception as e:
+            print(f"⚠️ AI output cache write failed: {e}")
+
+    async def prune(self, db) -> int:
+        """Удалить ответы устаревших версий промптов и всё сверх max_rows (давно не использованные)"""
+        params: Dict[str, str] = {}
+        current = []
+        for i, (output_format, version) in enumerate(PROMPT_VERSIONS.items()):
+            params[f"format_{i}"] = output_format
+            params[f"version_{i}"] = version
+            current.append(f"(:format_{i}, :version_{i})")
+
+        stale = await db.execute(
+            text(f"""
+                DELETE FROM ai_output_cache
+                WHERE (format, prompt_version) NOT IN ({', '.join(current)})
+            """),
+            params
+        )
+        overflow = await db.execute(
+            text("""
+                DELETE FROM ai_output_cache c
+                USING (
+                    SELECT model, format, input_hash, prompt_version
+                    FROM ai_output_cache
+                    ORDER BY last_used_at DESC
+                    OFFSET :max_rows
+                ) old
+                WHERE c.model = old.model AND c.format = old.format
+                  AND c.input_hash = old.input_hash AND c.prompt_version = old.prompt_version
+            """),
+            {"max_rows": max(self.max_rows, 0)}
+        )
+        await db.commit()
+        return (stale.rowcount or 0) + (overflow.rowcount or 0)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "max_rows": self.max_rows,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+        }
+
+
+ai_output_cache = AIOutputCache(settings.AI_OUTPUT_CACHE_SIZE, settings.AI_OUTPUT_CACHE_MAX_ROWS)
@@ -1,10 +1,7 @@
 # backend/app/services/ai_service.py
-import google.generativeai as genai
-from typing import Optional
+from typing import Optional, AsyncIterator, Tuple
 import json
 import re
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
 
 from app.core.config import settings
 from app.config.prompts import (
@@ -13,11 +10,11 @@ from app.config.prompts import (
     TLDR_PROMPT,
     QUIZ_PROMPT,
     GLOSSARY_PROMPT,
-    FLASHCARDS_PROMPT
+    FLASHCARDS_PROMPT,
+    SECTION_DIGEST_PROMPT
 )
-
-# Thread pool для CPU-bound операций (Gemini SDK синхронный!)
-_executor = ThreadPoolExecutor(max_workers=4)
+from app.services.llm_client import llm_client
+from app.services.ai_output_cache import ai_output_cache, make_key, CacheKey
 
 
 class GeminiService:
@@ -27,72 +24,184 @@ class GeminiService:
         self.api_key = settings.GEMINI_API_KEY
         self.model_name = settings.GEMINI_MODEL
         
-        if self.api_key:
-            genai.configure(api_key=self.api_key)
+        if settings.LLM_BACKEND == "fake":
+            print("🧪 LLM backend: fake (offline)")
+        elif self.api_key:
             print(f"🤖 Gemini configured with model: {self.model_name}")
         else:
             print("⚠️ GEMINI_API_KEY not set!")
     
-    def _get_model(self):
-        """Получить модель Gemini"""
-        return genai.GenerativeModel(self.model_name)
+    async def _generate_async(self, prompt: str) -> str:
+        """Нативный async-вызов через общий llm_client (пул HTTP/2 + глобальный лимит)"""
+        return await llm_client.generate(prompt, model=self.model_name)
     
-    def _generate_sync(self, prompt: str) -> str:
-        """Синхронный вызов Gemini — выполняется в thread pool"""
-        model = self._get_model()
-        response = model.generate_content(prompt)
-        return response.text
+    async def _cached(self, output_format: str, *inputs, force: bool = False) -> Tuple[CacheKey, Optional[str]]:
+        """Ключ кэша и готовый ответ (если такой вход уже генерировался этим промптом)"""
+        key = make_key(self.model_name, output_format, *inputs)
+        return key, await ai_output_cache.get(key, force=force)
     
-    async def _generate_async(self, prompt: str) -> str:
-        """Асинхронная обёртка — НЕ блокирует event loop!"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(_executor, self._generate_sync, prompt)
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """Потоковая генерация — отдаёт куски текста по мере ответа модели"""
+        async for chunk in llm_client.stream_generate(prompt, model=self.model_name):
+            yield chunk
+    
+    @staticmethod
+    def _strip_code_fences(text: str) -> str:
+        """Убирает ```json ... ``` вокруг ответа"""
+        text = text.strip()
+        text = re.sub(r'^```json\s*', '', text)
+        text = re.sub(r'^```\s*', '', text)
+        text = re.sub(r'\s*```$', '', text)
+        return text
+    
+    # Форматы, которые можно перегенерировать потоком
+    STREAM_FORMATS = ("smart_notes", "tldr", "quiz", "glossary", "flashcards")
     
-    async def generate_content_from_topic(self, topic: str) -> str:
+    def build_format_prompt(self, output_format: str, content: str, title: str = "") -> str:
+        """Промпт формата с теми же лимитами, что и generate_* (для стриминга)"""
+        builders = {
+            "smart_notes": lambda: SMART_NOTES_PROMPT.format(title=title, content=content[:30000]),
+            "tldr": lambda: TLDR_PROMPT.format(content=content[:20000]),
+            "quiz": lambda: QUIZ_PROMPT.format(num_questions=15, content=content[:25000]),
+            "glossary": lambda: GLOSSARY_PROMPT.format(content=content[:25000]),
+            "flashcards": lambda: FLASHCARDS_PROMPT.format(num_cards=15, content=content[:25000]),
+        }
+        builder = builders.get(output_format)
+        if not builder:
+            raise ValueError(f"Неизвестный формат: {output_format}")
+        return builder()
+    
+    def format_cache_key(self, output_format: str, content: str, title: str = "") -> CacheKey:
+        """Ключ кэша для промпта build_format_prompt — тот же, что у generate_*"""
+        inputs = {
+            "smart_notes": (title, content[:30000]),
+            "tldr": (content[:20000],),
+            "quiz": (15, content[:25000]),
+            "glossary": (content[:25000],),
+            "flashcards": (15, content[:25000]),
+        }
+        if output_format not in inputs:
+            raise ValueError(f"Неизвестный формат: {output_format}")
+        return make_key(self.model_name, output_format, *inputs[output_format])
+    
+    def _parse_format_output(self, output_format: str, text: str) -> Optional[str]:
+        """Очищенный ответ или None, если JSON-формат не распарсился"""
+        if output_format not in ("quiz", "glossary", "flashcards"):
+            return text.strip()
+        
+        text = self._strip_code_fences(text)
+        try:
+            json.loads(text)
+            return text
+        except json.JSONDecodeError:
+            return None
+    
+    def finalize_format_output(self, output_format: str, text: str) -> str:
+        """Пост-обработка накопленного ответа: JSON-форматы чистим и валидируем"""
+        fallbacks = {
+            "quiz": {"questions": [{
+                "question": "Тест не удалось сгенерировать",
+                "options": ["Попробуйте снова"],
+                "correct": 0,
+                "explanation": "",
+                "difficulty": "easy"
+            }]},
+            "glossary": {"terms": []},
+            "flashcards": {"cards": [{"front": "Ошибка", "back": "Попробуйте снова"}]},
+        }
+        parsed = self._parse_format_output(output_format, text)
+        if parsed is None:
+            return json.dumps(fallbacks[output_format], ensure_ascii=False)
+        return parsed
+    
+    async def cache_streamed_output(self, output_format: str, content: str, title: str, text: str) -> None:
+        """Потоковый ответ — в кэш, как у generate_* (заглушки при битом JSON не кэшируем)"""
+        parsed = self._parse_format_output(output_format, text)
+        if parsed:
+            await ai_output_cache.put(self.format_cache_key(output_format, content, title), parsed)
+    
+    async def generate_content_from_topic(self, topic: str, force: bool = False) -> str:
         """Генерация учебного материала по теме"""
+        key, cached = await self._cached("topic", topic, force=force)
+        if cached is not None:
+            return cached
+        
         prompt = TOPIC_GENERATION_PROMPT.format(topic=topic)
 
         try:
-            return await self._generate_async(prompt)
+            text = await self._generate_async(prompt)
+            await ai_output_cache.put(key, text)
+            return text
         except Exception as e:
             print(f"❌ Generate from topic error: {e}")
             raise
     
-    async def generate_smart_notes(self, content: str, title: str = "") -> str:
+    async def generate_smart_notes(self, content: str, title: str = "", force: bool = False) -> str:
         """Генерация умного конспекта"""
+        key, cached = await self._cached("smart_notes", title, content[:30000], force=force)
+        if cached is not None:
+            return cached
+        
         prompt = SMART_NOTES_PROMPT.format(title=title, content=content[:30000])
 
         try:
-            return await self._generate_async(prompt)
+            text = await self._generate_async(prompt)
+            await ai_output_cache.put(key, text)
+            return text
         except Exception as e:
             print(f"❌ Smart notes error: {e}")
             raise
     
-    async def generate_tldr(self, content: str) -> str:
+    async def generate_tldr(self, content: str, force: bool = False) -> str:
         """Генерация краткого содержания"""
+        key, cached = await self._cached("tldr", content[:20000], force=force)
+        if cached is not None:
+            return cached
+        
         prompt = TLDR_PROMPT.format(content=content[:20000])
 
         try:
-            return await self._generate_async(prompt)
+            text = await self._generate_async(prompt)
+            await ai_output_cache.put(key, text)
+            return text
         except Exception as e:
             print(f"❌ TLDR error: {e}")
             raise
     
-    async def generate_quiz(self, content: str, num_questions: int = 15) -> str:
+    async def generate_section_digest(self, section: str, title: str = "", max_words: int = 400) -> str:
+        """Выжимка одного раздела длинного материала (map-шаг)"""
+        key, cached = await self._cached("section_digest", title, max_words, section, force=False)
+        if cached is not None:
+            return cached
+        
+        prompt = SECTION_DIGEST_PROMPT.format(title=title, content=section, max_words=max_words)
+
+        try:
+            text = await self._generate_async(prompt)
+            await ai_output_cache.put(key, text)
+            return text
+        except Exception as e:
+            print(f"❌ Section digest error: {e}")
+            raise
+    
+    async def generate_quiz(self, content: str, num_questions: int = 15, force: bool = False) -> str:
         """Генерация теста"""
+        key, cached = await self._cached("quiz", num_questions, content[:25000], force=force)
+        if cached is not None:
+            return cached
+        
         prompt = QUIZ_PROMPT.format(num_questions=num_questions, content=content[:25000])
 
         try:
             text = await self._generate_async(prompt)
-            text = text.strip()
-            text = re.sub(r'^```json\s*', '', text)
-            text = re.sub(r'^```\s*', '', text)
-            text = re.sub(r'\s*```$', '', text)
+            text = self._strip_code_fences(text)
             
             parsed = json.loads(text)
             if len(parsed.get("questions", [])) < num_questions:
                 print(f"⚠️ Only {len(parsed['questions'])} questions generated")
             
+            # Заглушки при битом JSON в кэш не попадают
+            await ai_output_cache.put(key, text)
             return text
         except json.JSONDecodeError:
             return json.dumps({
@@ -108,18 +217,20 @@ class GeminiService:
             print(f"❌ Quiz error: {e}")
             raise
     
-    async def generate_glossary(self, content: str) -> str:
+    async def generate_glossary(self, content: str, force: bool = False) -> str:
         """Генерация глоссария"""
+        key, cached = await self._cached("glossary", content[:25000], force=force)
+        if cached is not None:
+            return cached
+        
         prompt = GLOSSARY_PROMPT.format(content=content[:25000])
 
         try:
             text = await self._generate_async(prompt)
-            text = text.strip()
-            text = re.sub(r'^```json\s*', '', text)
-            text = re.sub(r'^```\s*', '', text)
-            text = re.sub(r'\s*```$', '', text)
+            text = self._strip_code_fences(text)
             
             json.loads(text)  # Проверка
+            await ai_output_cache.put(key, text)
             return text
         except json.JSONDecodeError:
             return json.dumps({"terms": []}, ensure_ascii=False)
@@ -127,21 +238,23 @@ class GeminiService:
             print(f"❌ Glossary error: {e}")
             raise
     
-    async def generate_flashcards(self, content: str, num_cards: int = 15) -> str:
+    async def generate_flashcards(self, content: str, num_cards: int = 15, force: bool = False) -> str:
         """Генерация флэш-карточек"""
+        key, cached = await self._cached("flashcards", num_cards, content[:25000], force=force)
+        if cached is not None:
+            return cached
+        
         prompt = FLASHCARDS_PROMPT.format(num_cards=num_cards, content=content[:25000])
 
         try:
             text = await self._generate_async(prompt)
-            text = text.strip()
-            text = re.sub(r'^```json\s*', '', text)
-            text = re.sub(r'^```\s*', '', text)
-            text = re.sub(r'\s*```$', '', text)
+            text = self._strip_code_fences(text)
             
             parsed = json.loads(text)
             if not parsed.get("cards"):
                 raise ValueError("No cards")
             
+            await ai_output_cache.put(key, text)
             return text
         except json.JSONDecodeError as e:
             print(f"❌ Flashcards JSON error: {e}")
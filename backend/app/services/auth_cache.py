@@ -0,0 +1,170 @@
+# backend/app/services/auth_cache.py
+import hashlib
+import hmac
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from urllib.parse import parse_qsl
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from app.core.config import settings
+from app.models import User
+
+
+def init_data_expired(auth_date: Optional[int], max_age: int) -> bool:
+    """initData старше max_age (или без auth_date) — перехваченную строку нельзя переиграть"""
+    if max_age <= 0:
+        return False
+    return auth_date is None or time.time() - auth_date > max_age
+
+
+def verify_init_data(init_data: str, bot_token: str) -> Optional[Dict[str, Any]]:
+    """
+    Проверка подписи Telegram WebApp initData. Возвращает user из initData
+    (с auth_date) или None — в том числе для просроченного initData.
+    """
+    parsed = dict(parse_qsl(init_data, keep_blank_values=True))
+    received_hash = parsed.pop('hash', None)
+    auth_date = int(parsed['auth_date']) if parsed.get('auth_date', '').isdigit() else None
+
+    if bot_token:
+        if not received_hash:
+            return None
+        data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(parsed.items()))
+        secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+        expected = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, received_hash):
+            return None
+        if init_data_expired(auth_date, settings.AUTH_INIT_DATA_MAX_AGE):
+            return None
+
+    user_data = json.loads(parsed.get('user', '{}'))
+    if not user_data.get('id'):
+        return None
+    user_data['auth_date'] = auth_date
+    return user_data
+
+
+class AuthCache:
+    """
+    Кэш аутентификации в процессе:
+    - sha256(initData) → проверенная identity (без повторного HMAC и парсинга)
+    - telegram_id → снапшот строки users с коротким TTL; перед использованием
+      сверяется users.updated_at (строку могли изменить воркер, бот или другой web-процесс)
+    """
+
+    def __init__(self, max_size: int, identity_ttl: int, user_ttl: int):
+        self.max_size = max_size
+        self.identity_ttl = identity_ttl
+        self.user_ttl = user_ttl
+        self._identities: "OrderedDict[str, tuple]" = OrderedDict()
+        self._users: "OrderedDict[int, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _get(entries: OrderedDict, key) -> Optional[Any]:
+        entry = entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del entries[key]
+            return None
+        entries.move_to_end(key)
+        return entry[1]
+
+    def _put(self, entries: OrderedDict, key, value, ttl: int) -> None:
+        if self.max_size <= 0:
+            return
+        entries[key] = (time.monotonic() + ttl, value)
+        entries.move_to_end(key)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def get_identity(self, init_data: str) -> Optional[Dict[str, Any]]:
+        return self._get(self._identities, hashlib.sha256(init_data.encode()).hexdigest())
+
+    def put_identity(self, init_data: str, identity: Dict[str, Any]) -> None:
+        key = hashlib.sha256(init_data.encode()).hexdigest()
+        self._put(self._identities, key, identity, self.identity_ttl)
+
+    async def get_user(self, db: AsyncSession, telegram_id: int) -> Optional[User]:
+        """
+        Пользователь из снапшота, если строка в БД не менялась с момента снапшота.
+        Вместо всей строки — SELECT updated_at по уникальному индексу; устаревший снапшот
+        (запись из другого процесса) отбрасывается, и вызывающий читает строку заново.
+        """
+        snapshot = self._get(self._users, telegram_id)
+        if snapshot is None:
+            self.misses += 1
+            return None
+
+        result = await db.execute(
+            select(User.updated_at).where(User.telegram_id == telegram_id)
+        )
+        row = result.one_or_none()
+        if row is None or row.updated_at != snapshot["updated_at"]:
+            self.stale += 1
+            self._users.pop(telegram_id, None)
+            return None
+
+        self.hits += 1
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        # load=False: состояние берётся из снапшота, совпадающего со строкой в БД,
+        # поэтому flush запишет только то, что изменит сам запрос
+        return await db.merge(user, load=False)
+
+    def put_user(self, user: User) -> None:
+        snapshot = {
+            attr.key: getattr(user, attr.key)
+            for attr in inspect(User).column_attrs
+        }
+        self._put(self._users, user.telegram_id, snapshot, self.user_ttl)
+
+    def invalidate(self, telegram_id: int) -> None:
+        if self._users.pop(telegram_id, None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "users": len(self._users),
+            "identities": len(self._identities),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "invalidations": self.invalidations,
+        }
+
+
+auth_cache = AuthCache(
+    settings.AUTH_CACHE_SIZE,
+    settings.AUTH_IDENTITY_TTL,
+    settings.AUTH_USER_TTL
+)
+
+
+# Любое изменение пользователя через ORM (подписка, очки, профиль, лимиты)
+# сбрасывает снапшот после коммита, чтобы следующий запрос прочитал строку заново
+@event.listens_for(User, "after_update")
+def _mark_user_dirty(mapper, connection, target: User) -> None:
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("dirty_telegram_ids", set()).add(target.telegram_id)
+    auth_cache.invalidate(target.telegram_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for telegram_id in session.info.pop("dirty_telegram_ids", ()):
+        auth_cache.invalidate(telegram_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_dirty_users(session: Session) -> None:
+    session.info.pop("dirty_telegram_ids", None)
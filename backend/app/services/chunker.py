@@ -0,0 +1,170 @@
+# backend/app/services/chunker.py
+"""
+Разбиение текста на chunks для vector search за один проход.
+
+Текст режется на единицы (предложение / строка / абзац) одним finditer,
+единицы набираются в chunk до бюджета токенов. Заголовок начинает новый
+chunk (короткие разделы склеиваются), конец абзаца — хорошее место закончить
+chunk, при переполнении соседние chunks перекрываются целыми предложениями.
+Каждый chunk знает свои char_start/char_end: content == text[char_start:char_end].
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Бюджет в токенах; токены оцениваются по длине (~4 символа на токен у Gemini)
+CHUNK_MAX_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 25
+CHARS_PER_TOKEN = 4
+# Абзац закончился, а chunk заполнен хотя бы на столько — закрываем его на границе абзаца
+PARAGRAPH_FLUSH_RATIO = 0.6
+# Заголовок закрывает chunk, только если в нём уже столько токенов — иначе разделы склеиваются
+SECTION_MIN_TOKENS = 40
+
+# Строка-заголовок: markdown, «Глава 3», «Chapter IV», «2.1 Термодинамика».
+# Нумерованная строка выглядит так же, как пункт списка, — chunker считает её
+# заголовком только после пустой строки или markdown-заголовка (см. _iter_units)
+HEADING_RE = re.compile(
+    r'^[ \t]*(?:'
+    r'#{1,6}[ \t]+\S.*'
+    r'|(?:Глава|ГЛАВА|Раздел|РАЗДЕЛ|Часть|ЧАСТЬ|Лекция|ЛЕКЦИЯ|Тема|ТЕМА|Chapter|CHAPTER|Part|PART|Section|SECTION)[ \t]+[\dIVXLCivxlc]+\b.*'
+    r'|(?P<numbered>\d{1,2}(?:\.\d{1,2}){0,3}\.?[ \t]+[A-ZА-ЯЁ][^\n]{0,120})'
+    r')[ \t]*$',
+    re.MULTILINE
+)
+
+# Конец единицы: пустая строка (абзац) | знак конца предложения перед пробелом | перевод строки
+BOUNDARY_RE = re.compile(r'(?P<para>\n[ \t]*\n\s*)|(?P<sent>[.!?…]+["»)\]]*(?=\s))|(?P<line>\n)')
+
+PARA, SENT, LINE, END = "para", "sent", "line", "end"
+
+Unit = Tuple[int, int, int]  # (start, end, tokens)
+
+
+def estimate_tokens(n_chars: int) -> int:
+    return max(1, -(-n_chars // CHARS_PER_TOKEN))
+
+
+def _iter_units(text: str):
+    """(start, end, kind, is_heading): end включает разделитель"""
+    start = 0
+    at_line_start = True
+    # Нумерованный заголовок: начало текста, после пустой строки или после markdown-заголовка
+    numbered_allowed = True
+
+    def is_heading() -> bool:
+        if not at_line_start:
+            return False
+        match = HEADING_RE.match(text, start)
+        return match is not None and (match.group("numbered") is None or numbered_allowed)
+
+    for match in BOUNDARY_RE.finditer(text):
+        end = match.end()
+        if end > start:
+            heading = is_heading()
+            yield start, end, match.lastgroup, heading
+            markdown = heading and text[start:end].lstrip().startswith("#")
+            numbered_allowed = match.lastgroup == PARA or markdown
+            start = end
+        at_line_start = match.lastgroup != SENT
+    if start < len(text):
+        yield start, len(text), END, is_heading()
+
+
+class _ChunkBuilder:
+    def __init__(self, text: str, max_tokens: int, overlap_tokens: int):
+        self.text = text
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.chunks: List[Dict[str, Any]] = []
+        self.units: List[Unit] = []
+        self.tokens = 0
+
+    def _emit(self, start: int, end: int) -> None:
+        text = self.text
+        # Границы без пробелов по краям — чтобы content совпадал с text[char_start:char_end]
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            self.chunks.append({
+                "content": text[start:end],
+                "chunk_index": len(self.chunks),
+                "char_start": start,
+                "char_end": end,
+            })
+
+    def flush(self, overlap: bool) -> None:
+        if not self.units:
+            return
+        self._emit(self.units[0][0], self.units[-1][1])
+
+        carried: List[Unit] = []
+        if overlap:
+            # Хвост из целых предложений в пределах overlap-бюджета (не весь chunk)
+            budget = 0
+            for unit in reversed(self.units[1:]):
+                if budget + unit[2] > self.overlap_tokens:
+                    break
+                carried.append(unit)
+                budget += unit[2]
+            carried.reverse()
+
+        self.units = carried
+        self.tokens = sum(unit[2] for unit in carried)
+
+    def add(self, start: int, end: int) -> None:
+        tokens = estimate_tokens(end - start)
+        if tokens > self.max_tokens:
+            self.flush(overlap=False)
+            self._add_oversized(start, end)
+            return
+
+        if self.tokens + tokens > self.max_tokens:
+            self.flush(overlap=True)
+            if self.tokens + tokens > self.max_tokens:
+                self.units, self.tokens = [], 0
+
+        self.units.append((start, end, tokens))
+        self.tokens += tokens
+
+    def _add_oversized(self, start: int, end: int) -> None:
+        """Единица без знаков препинания длиннее бюджета — режем по пробелам"""
+        max_chars = self.max_tokens * CHARS_PER_TOKEN
+        while end - start > max_chars:
+            cut = self.text.rfind(" ", start + max_chars // 2, start + max_chars)
+            if cut <= start:
+                cut = start + max_chars
+            self._emit(start, cut)
+            start = cut
+        self.units = [(start, end, estimate_tokens(end - start))]
+        self.tokens = self.units[0][2]
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+) -> List[Dict[str, Any]]:
+    """
+    Chunks {content, chunk_index, char_start, char_end} за один проход по тексту.
+    Заголовки начинают новый chunk (кроме совсем коротких разделов), абзацы и предложения не разрываются без нужды.
+    """
+    builder = _ChunkBuilder(text, max_tokens, overlap_tokens)
+    paragraph_flush = int(max_tokens * PARAGRAPH_FLUSH_RATIO)
+
+    for start, end, kind, is_heading in _iter_units(text):
+        if is_heading and builder.tokens >= SECTION_MIN_TOKENS:
+            builder.flush(overlap=False)
+        builder.add(start, end)
+        if kind == PARA and builder.tokens >= paragraph_flush:
+            builder.flush(overlap=False)
+
+    builder.flush(overlap=False)
+    return builder.chunks
+
+
+def heading_of(section: str) -> Optional[str]:
+    """Первая строка, если это заголовок"""
+    first_line = section.split("\n", 1)[0].strip()
+    return first_line.lstrip("#").strip()[:120] if HEADING_RE.match(first_line) else None
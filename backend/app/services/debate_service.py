@@ -1,5 +1,5 @@
 # backend/app/services/debate_service.py
-from typing import List, Dict, Any, Literal
+from typing import List, Dict, Any, Literal, Tuple
 from app.services.ai_service import gemini_service
 from sqlalchemy.ext.asyncio import AsyncSession  # ← ДОБАВЬ ЭТУ СТРОКУ
 
@@ -71,15 +71,14 @@ class DebateService:
 ФОРМАТ ОТВЕТА:
 Просто текст твоего аргумента, без лишних пояснений."""
     
-    async def start_debate(
+    def build_opening_prompt(
         self,
         topic: str,
         user_position: str,
-        difficulty: DifficultyLevel = "medium",
+        difficulty: DifficultyLevel,
         material_content: str = ""
-    ) -> Dict[str, Any]:
-        """Начинает дебаты — AI делает первый ход"""
-        
+    ) -> Tuple[str, str]:
+        """Позиция AI и промпт первого хода"""
         # AI занимает противоположную позицию
         ai_position = "ПРОТИВ" if user_position.upper() == "ЗА" else "ЗА"
         
@@ -94,6 +93,52 @@ class DebateService:
 
 Начни дебаты. Представь свою позицию и приведи первый аргумент {ai_position} темы "{topic}"."""
         
+        return ai_position, opening_prompt
+    
+    def build_continue_prompt(
+        self,
+        topic: str,
+        ai_position: str,
+        difficulty: DifficultyLevel,
+        history: List[Dict[str, str]],
+        user_message: str,
+        material_content: str = ""
+    ) -> str:
+        """Промпт ответа на ход пользователя"""
+        system_prompt = self._build_system_prompt(
+            topic=topic,
+            position=ai_position,
+            difficulty=difficulty,
+            material_context=material_content
+        )
+        
+        # Формируем историю диалога
+        history_text = ""
+        for msg in history[-10:]:  # Последние 10 сообщений
+            role = "Оппонент" if msg["role"] == "user" else "Ты"
+            history_text += f"{role}: {msg['content']}\n\n"
+        
+        return f"""{system_prompt}
+
+ИСТОРИЯ ДЕБАТОВ:
+{history_text}
+
+Оппонент сейчас сказал: "{user_message}"
+
+Ответь на этот аргумент и продолжи дебаты."""
+    
+    async def start_debate(
+        self,
+        topic: str,
+        user_position: str,
+        difficulty: DifficultyLevel = "medium",
+        material_content: str = ""
+    ) -> Dict[str, Any]:
+        """Начинает дебаты — AI делает первый ход"""
+        ai_position, opening_prompt = self.build_opening_prompt(
+            topic, user_position, difficulty, material_content
+        )
+        
         try:
             ai_response = await gemini_service._generate_async(opening_prompt)
             
@@ -123,29 +168,10 @@ class DebateService:
         material_content: str = ""
     ) -> Dict[str, Any]:
         """Продолжает дебаты — обрабатывает ход пользователя"""
-        
-        system_prompt = self._build_system_prompt(
-            topic=topic,
-            position=ai_position,
-            difficulty=difficulty,
-            material_context=material_content
+        prompt = self.build_continue_prompt(
+            topic, ai_position, difficulty, history, user_message, material_content
         )
         
-        # Формируем историю диалога
-        history_text = ""
-        for msg in history[-10:]:  # Последние 10 сообщений
-            role = "Оппонент" if msg["role"] == "user" else "Ты"
-            history_text += f"{role}: {msg['content']}\n\n"
-        
-        prompt = f"""{system_prompt}
-
-ИСТОРИЯ ДЕБАТОВ:
-{history_text}
-
-Оппонент сейчас сказал: "{user_message}"
-
-Ответь на этот аргумент и продолжи дебаты."""
-        
         try:
             ai_response = await gemini_service._generate_async(prompt)
             
@@ -0,0 +1,140 @@
+# backend/app/services/dedup_service.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from typing import List, Optional
+from uuid import UUID
+import time
+
+from app.models import Material, ProcessingStatus
+from app.services.embedding_cache import text_hash
+from app.core.config import settings
+
+# Глобального режима нет: копия текста, выводов и chunks чужого материала
+# раскрывала бы содержимое между аккаунтами
+DEDUP_SCOPES = ("off", "user", "group")
+
+# Где искать дубликат: свои материалы / свои + группы, где состоит загрузивший
+SCOPE_SQL = {
+    "user": "m.user_id = :user_id",
+    "group": """(
+        m.user_id = :user_id
+        OR m.folder_id IN (SELECT group_id FROM group_members WHERE user_id = :user_id)
+    )""",
+}
+
+
+class DedupService:
+    """Повторная загрузка того же файла/текста: копируем результат вместо обработки"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def content_key(material: Material) -> Optional[str]:
+        """Ключ дедупликации: sha256 файла (считается при загрузке) или нормализованного текста"""
+        if material.content_hash:
+            return material.content_hash
+        if not material.file_path and material.raw_content and not material.raw_content.startswith("[ОШИБКА]"):
+            return text_hash(material.raw_content)
+        return None
+
+    async def find_source(self, material: Material, content_hash: str) -> Optional[UUID]:
+        """Последний обработанный материал с тем же хэшем в разрешённой области"""
+        scope = settings.DEDUP_SCOPE if settings.DEDUP_SCOPE in DEDUP_SCOPES else "group"
+        if scope == "off":
+            return None
+
+        result = await self.db.execute(
+            text(f"""
+                SELECT m.id FROM materials m
+                WHERE m.content_hash = :content_hash
+                  AND m.id <> :material_id
+                  AND m.status = :completed
+                  AND m.extracted_text IS NOT NULL
+                  AND EXISTS (SELECT 1 FROM ai_outputs o WHERE o.material_id = m.id)
+                  AND {SCOPE_SQL[scope]}
+                ORDER BY m.created_at DESC
+                LIMIT 1
+            """),
+            {
+                "content_hash": content_hash,
+                "material_id": material.id,
+                "completed": ProcessingStatus.COMPLETED,
+                "user_id": material.user_id,
+            }
+        )
+        return result.scalar_one_or_none()
+
+    async def clone_from_duplicate(self, material: Material) -> Optional[List[str]]:
+        """
+        Если такой же контент уже обработан — копируем текст, AI-выводы и chunks
+        (с embeddings) одной транзакцией, без вызовов LLM.
+        Возвращает скопированные форматы или None, если дубликата нет.
+        """
+        content_hash = self.content_key(material)
+        if not content_hash:
+            return None
+
+        if material.content_hash != content_hash:
+            # Текстовые материалы: сохраняем хэш, чтобы следующие дубликаты нашли этот
+            material.content_hash = content_hash
+            await self.db.commit()
+
+        source_id = await self.find_source(material, content_hash)
+        if not source_id:
+            return None
+
+        started = time.perf_counter()
+        params = {"material_id": material.id, "source_id": source_id}
+
+        from app.services.vector_service import VectorService
+        use_pgvector = await VectorService(self.db).use_pgvector()
+        chunk_columns = "content, chunk_index, embedding, char_start, char_end"
+        if use_pgvector:
+            chunk_columns += ", embedding_vec"
+
+        try:
+            await self.db.execute(
+                text("""
+                    UPDATE materials SET extracted_text = src.extracted_text
+                    FROM materials src
+                    WHERE materials.id = :material_id AND src.id = :source_id
+                """),
+                params
+            )
+            # Повтор задачи после сбоя: начинаем с чистого листа
+            await self.db.execute(text("DELETE FROM ai_outputs WHERE material_id = :material_id"), params)
+            await self.db.execute(text("DELETE FROM text_chunks WHERE material_id = :material_id"), params)
+            result = await self.db.execute(
+                text("""
+                    INSERT INTO ai_outputs (id, material_id, format, content)
+                    SELECT gen_random_uuid(), :material_id, format, content
+                    FROM ai_outputs WHERE material_id = :source_id
+                    RETURNING format
+                """),
+                params
+            )
+            formats = list(result.scalars())
+            await self.db.execute(
+                text(f"""
+                    INSERT INTO text_chunks (id, material_id, {chunk_columns})
+                    SELECT gen_random_uuid(), :material_id, {chunk_columns}
+                    FROM text_chunks WHERE material_id = :source_id
+                """),
+                params
+            )
+            material.status = ProcessingStatus.COMPLETED
+            await self.db.commit()
+        except Exception as e:
+            # Не получилось скопировать — обрабатываем как обычно
+            print(f"⚠️ Dedup clone failed, processing from scratch: {e}")
+            await self.db.rollback()
+            await self.db.refresh(material)
+            return None
+
+        # extracted_text обновлён SQL'ом — перечитываем
+        await self.db.refresh(material)
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+        print(f"♻️ Material {material.id} cloned from duplicate {source_id} ⏱️ {elapsed_ms}ms")
+        return formats
@@ -0,0 +1,181 @@
+# backend/app/services/embedding_cache.py
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import List, Dict, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.core.config import settings
+
+WRITE_BATCH_ROWS = 500
+
+
+def normalize_text(text_content: str) -> str:
+    """Нормализация для ключа кэша: схлопываем пробелы, обрезаем края"""
+    return re.sub(r'\s+', ' ', text_content).strip()
+
+
+def text_hash(text_content: str) -> str:
+    """sha256 нормализованного текста"""
+    return hashlib.sha256(normalize_text(text_content).encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Двухуровневый кэш embeddings: LRU в процессе + таблица embedding_cache в Postgres"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._lru: "OrderedDict[tuple, List[float]]" = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+    
+    def _get_local(self, key: tuple) -> Optional[List[float]]:
+        embedding = self._lru.get(key)
+        if embedding is not None:
+            self._lru.move_to_end(key)
+        return embedding
+    
+    def _put_local(self, key: tuple, embedding: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        self._lru[key] = embedding
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_size:
+            self._lru.popitem(last=False)
+    
+    async def get_many(
+        self,
+        db: AsyncSession,
+        model: str,
+        task_type: str,
+        hashes: List[str]
+    ) -> Dict[str, List[float]]:
+        """Найти embeddings по хэшам: сначала LRU, затем одним SELECT в БД"""
+        found: Dict[str, List[float]] = {}
+        missing = []
+        
+        for h in dict.fromkeys(hashes):
+            embedding = self._get_local((model, task_type, h))
+            if embedding is not None:
+                found[h] = embedding
+                self.memory_hits += 1
+            else:
+                missing.append(h)
+        
+        if missing:
+            try:
+                result = await db.execute(
+                    text("""
+                        SELECT text_hash, embedding FROM embedding_cache
+                        WHERE model = :model
+                          AND task_type = :task_type
+                          AND text_hash = ANY(:hashes)
+                    """),
+                    {"model": model, "task_type": task_type, "hashes": missing}
+                )
+                for row in result.fetchall():
+                    found[row.text_hash] = row.embedding
+                    self._put_local((model, task_type, row.text_hash), row.embedding)
+                    self.db_hits += 1
+            except Exception as e:
+                # Кэш не критичен — без него просто посчитаем embeddings заново
+                print(f"⚠️ Embedding cache lookup failed: {e}")
+                await db.rollback()
+        
+        self.misses += sum(1 for h in missing if h not in found)
+        return found
+    
+    async def put_many(
+        self,
+        db: AsyncSession,
+        model: str,
+        task_type: str,
+        embeddings: Dict[str, List[float]]
+    ) -> None:
+        """Сохранить embeddings в LRU и в БД (без commit — коммитит вызывающий)"""
+        if not embeddings:
+            return
+        
+        items = list(embeddings.items())
+        for offset in range(0, len(items), WRITE_BATCH_ROWS):
+            params = {"model": model, "task_type": task_type}
+            values = []
+            for i, (h, embedding) in enumerate(items[offset:offset + WRITE_BATCH_ROWS]):
+                self._put_local((model, task_type, h), embedding)
+                params[f"hash_{i}"] = h
+                params[f"embedding_{i}"] = embedding
+                values.append(f"(:model, :task_type, :hash_{i}, :embedding_{i})")
+            
+            await db.execute(
+                text(f"""
+                    INSERT INTO embedding_cache (model, task_type, text_hash, embedding)
+                    VALUES {', '.join(values)}
+                    ON CONFLICT (model, task_type, text_hash) DO NOTHING
+                """),
+                params
+            )
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._lru),
+            "max_size": self.max_size,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+        }
+
+
+class QueryEmbeddingCache:
+    """LRU + TTL кэш embeddings поисковых запросов (только в процессе)"""
+    
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(query: str) -> str:
+        return normalize_text(query).lower()
+    
+    def get(self, query: str) -> Optional[List[float]]:
+        key = self.make_key(query)
+        entry = self._entries.get(key)
+        
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, query: str, embedding: List[float]) -> None:
+        if self.max_size <= 0:
+            return
+        key = self.make_key(query)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, embedding)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+embedding_cache = EmbeddingCache(settings.EMBEDDING_CACHE_SIZE)
+query_embedding_cache = QueryEmbeddingCache(
+    settings.QUERY_EMBEDDING_CACHE_SIZE,
+    settings.QUERY_EMBEDDING_CACHE_TTL
+)
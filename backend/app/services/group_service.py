@@ -1,12 +1,12 @@
 # backend/app/services/group_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, exists, text
 from sqlalchemy.orm import selectinload
 from typing import Optional, List, Tuple
 from uuid import UUID
 from datetime import datetime, timedelta
 
-from app.models import User, Folder, GroupMember, Material, SubscriptionTier
+from app.models import User, Folder, GroupMember, SubscriptionTier
 
 
 def get_val(v):
@@ -37,12 +37,18 @@ class GroupService:
         )
         return result.scalar() or 0
     
-    async def _count_group_materials(self, group_id: UUID) -> int:
-        """Подсчёт материалов в группе"""
+    async def _lock_group_counters(self, group_id: UUID):
+        """
+        Счётчики группы с блокировкой строки до конца транзакции.
+        Параллельные join / добавления материалов ждут друг друга,
+        поэтому проверка лимита не может быть превышена.
+        """
         result = await self.db.execute(
-            select(func.count(Material.id)).where(Material.group_id == group_id)
+            select(Folder.user_id, Folder.member_count, Folder.materials_count)
+            .where(Folder.id == group_id, Folder.is_group == True)
+            .with_for_update()
         )
-        return result.scalar() or 0
+        return result.one_or_none()
     
     async def create_group(
         self,
@@ -84,6 +90,7 @@ class GroupService:
         self.db.add(membership)
         
         await self.db.commit()
+        self._reset_memo()
         await self.db.refresh(group)
         
         return True, "Группа создана", group
@@ -126,11 +133,10 @@ class GroupService:
         )
         owner = owner_result.scalar_one_or_none()
         
-        # Проверка лимита участников (лимит владельца!)
-        member_count = await self.db.execute(
-            select(func.count(GroupMember.id)).where(GroupMember.group_id == group.id)
-        )
-        current_members = member_count.scalar() or 0
+        # Проверка лимита участников (лимит владельца!) — строка группы
+        # заблокирована до commit, триггер увеличит member_count при INSERT
+        counters = await self._lock_group_counters(group.id)
+        current_members = counters.member_count if counters else 0
         
         max_members = owner.max_members_per_group if owner else 5
         if current_members >= max_members:
@@ -145,23 +151,27 @@ class GroupService:
         )
         self.db.add(membership)
         await self.db.commit()
+        self._reset_memo()
         
         return True, "Вы успешно присоединились к группе", group
     
     async def can_add_material_to_group(self, user: User, group_id: UUID) -> Tuple[bool, str]:
-        """Проверка возможности добавить материал в группу"""
-        group = await self.get_group_by_id(group_id)
-        if not group:
+        """
+        Проверка возможности добавить материал в группу.
+        Блокирует строку группы до commit: материал нужно добавить в той же транзакции.
+        """
+        counters = await self._lock_group_counters(group_id)
+        if not counters:
             return False, "Группа не найдена"
         
         # Получаем владельца группы
         owner_result = await self.db.execute(
-            select(User).where(User.id == group.user_id)
+            select(User).where(User.id == counters.user_id)
         )
         owner = owner_result.scalar_one_or_none()
         
         # Проверка лимита материалов (лимит владельца!)
-        materials_count = await self._count_group_materials(group_id)
+        materials_count = counters.materials_count
         max_materials = owner.max_materials_per_group if owner else 10
         
         if materials_count >= max_materials:
@@ -171,6 +181,28 @@ class GroupService:
         
         return True, "OK"
     
+    async def reconcile_counters(self) -> int:
+        """Пересчёт member_count / materials_count там, где они разошлись с фактом"""
+        result = await self.db.execute(text("""
+            UPDATE folders f SET
+                member_count = c.members,
+                materials_count = c.materials
+            FROM (
+                SELECT
+                    g.id,
+                    (SELECT count(*) FROM group_members gm WHERE gm.group_id = g.id) AS members,
+                    (SELECT count(*) FROM materials m WHERE m.folder_id = g.id) AS materials
+                FROM folders g
+                WHERE g.is_group = true
+            ) c
+            WHERE f.id = c.id
+              AND (f.member_count <> c.members OR f.materials_count <> c.materials)
+            RETURNING f.id
+        """))
+        repaired = len(result.all())
+        await self.db.commit()
+        return repaired
+    
     async def leave_group(self, user: User, group_id: UUID) -> Tuple[bool, str]:
         result = await self.db.execute(
             select(GroupMember).where(
@@ -189,27 +221,83 @@ class GroupService:
         
         await self.db.delete(membership)
         await self.db.commit()
+        self._reset_memo()
         
         return True, "Вы покинули группу"
     
-    async def get_user_groups(self, user: User) -> List[dict]:
-        result = await self.db.execute(
-            select(GroupMember, Folder)
+    # ==================== Membership / Access ====================
+    
+    def _memo(self) -> dict:
+        """Мемо членств на время запроса (живёт в info сессии, общей для всех сервисов запроса)"""
+        return self.db.info.setdefault("group_memberships", {})
+    
+    def _reset_memo(self) -> None:
+        self.db.info.pop("group_memberships", None)
+    
+    async def get_member_role(self, user: User, group_id: UUID) -> Optional[str]:
+        """Роль пользователя в группе или None — один индексный запрос"""
+        memo = self._memo()
+        key = (user.id, group_id)
+        if memo.get(key, True) is True:
+            result = await self.db.execute(
+                select(GroupMember.role).where(
+                    GroupMember.group_id == group_id,
+                    GroupMember.user_id == user.id
+                )
+            )
+            role = result.scalar_one_or_none()
+            memo[key] = get_val(role) if role is not None else None
+        return memo[key]
+    
+    async def is_member(self, user: User, group_id: UUID) -> bool:
+        """EXISTS-проверка членства (используйте для проверок доступа)"""
+        memo = self._memo()
+        key = (user.id, group_id)
+        if key not in memo:
+            result = await self.db.execute(
+                select(exists().where(
+                    GroupMember.group_id == group_id,
+                    GroupMember.user_id == user.id
+                ))
+            )
+            # True = участник, роль ещё не читали
+            memo[key] = True if result.scalar() else None
+        return memo[key] is not None
+    
+    async def get_user_group_ids(self, user: User) -> List[UUID]:
+        """ID всех групп пользователя одним запросом"""
+        memo = self._memo()
+        key = (user.id, "all")
+        if key not in memo:
+            result = await self.db.execute(
+                select(GroupMember.group_id, GroupMember.role)
+                .where(GroupMember.user_id == user.id)
+            )
+            rows = result.all()
+            for group_id, role in rows:
+                memo[(user.id, group_id)] = get_val(role)
+            memo[key] = [group_id for group_id, _ in rows]
+        return memo[key]
+    
+    async def get_user_groups(self, user: User, group_id: Optional[UUID] = None) -> List[dict]:
+        """Группы пользователя со счётчиками — один запрос, счётчики денормализованы"""
+        # Счётчики выбираем колонками: объект Folder из identity map мог устареть после триггера
+        query = (
+            select(GroupMember, Folder, Folder.member_count, Folder.materials_count)
             .join(Folder, GroupMember.group_id == Folder.id)
             .where(GroupMember.user_id == user.id)
             .order_by(GroupMember.joined_at.desc())
         )
+        if group_id is not None:
+            query = query.where(GroupMember.group_id == group_id)
         
+        result = await self.db.execute(query)
+        
+        memo = self._memo()
         groups = []
-        for membership, folder in result.all():
-            count_result = await self.db.execute(
-                select(func.count(GroupMember.id)).where(GroupMember.group_id == folder.id)
-            )
-            member_count = count_result.scalar()
-            
-            materials_count = await self._count_group_materials(folder.id)
-            
+        for membership, folder, member_count, materials_count in result.all():
             role = get_val(membership.role)
+            memo[(user.id, folder.id)] = role
             
             groups.append({
                 "id": str(folder.id),
@@ -226,6 +314,11 @@ class GroupService:
         
         return groups
     
+    async def get_user_group(self, user: User, group_id: UUID) -> Optional[dict]:
+        """Одна группа пользователя (или None, если он не участник)"""
+        groups = await self.get_user_groups(user, group_id=group_id)
+        return groups[0] if groups else None
+    
     async def get_group_members(self, group_id: UUID) -> List[dict]:
         result = await self.db.execute(
             select(GroupMember, User)
@@ -258,6 +351,7 @@ class GroupService:
         
         await self.db.delete(group)
         await self.db.commit()
+        self._reset_memo()
         
         return True, "Группа удалена"
     
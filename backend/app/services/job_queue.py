@@ -0,0 +1,299 @@
+# backend/app/services/job_queue.py
+import asyncio
+import json
+import os
+import socket
+import traceback
+from typing import Optional, Dict, Any, List
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+
+from app.models import ProcessingJob, JobKind, JobStatus, AsyncSessionLocal
+from app.core.config import settings
+
+
+class JobQueue:
+    """Очередь фоновых задач в Postgres (FOR UPDATE SKIP LOCKED)"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def enqueue(
+        self,
+        kind: str,
+        material_id: Optional[UUID] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        commit: bool = True
+    ) -> ProcessingJob:
+        """
+        Поставить задачу в очередь (переживает рестарт/деплой web-процесса).
+        commit=False — задача уйдёт в БД одним commit с материалом вызывающего.
+        """
+        job = ProcessingJob(
+            kind=kind,
+            material_id=material_id,
+            payload=payload or {},
+            status=JobStatus.QUEUED,
+            max_attempts=settings.JOB_MAX_ATTEMPTS,
+        )
+        self.db.add(job)
+        if commit:
+            await self.db.commit()
+        print(f"📥 Job queued: {kind} {material_id or ''}")
+        return job
+    
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Забрать следующую задачу: queued с наступившим run_at или running с истёкшим locked_until"""
+        # Воркер падал на задаче max_attempts раз (OOM, kill) — больше не выдаём
+        exhausted = await self.db.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = :failed, locked_until = NULL, updated_at = now(),
+                    last_error = COALESCE(last_error, 'worker lost the job (visibility timeout expired)')
+                WHERE status = :running AND locked_until < now() AND attempts >= max_attempts
+                RETURNING id
+            """),
+            {"failed": JobStatus.FAILED, "running": JobStatus.RUNNING}
+        )
+        for row in exhausted.fetchall():
+            print(f"❌ Job {row.id} failed permanently: worker lost it on the last attempt")
+        
+        result = await self.db.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = :running,
+                    attempts = attempts + 1,
+                    locked_by = :worker_id,
+                    locked_until = now() + make_interval(secs => :visibility),
+                    updated_at = now()
+                WHERE id = (
+                    SELECT id FROM processing_jobs
+                    WHERE (status = :queued AND run_at <= now())
+                       OR (status = :running AND locked_until < now() AND attempts < max_attempts)
+                    ORDER BY run_at
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING id, kind, material_id, payload, attempts, max_attempts
+            """),
+            {
+                "running": JobStatus.RUNNING,
+                "queued": JobStatus.QUEUED,
+                "worker_id": worker_id,
+                "visibility": settings.JOB_VISIBILITY_TIMEOUT,
+            }
+        )
+        row = result.fetchone()
+        await self.db.commit()
+        return dict(row._mapping) if row else None
+    
+    async def heartbeat(self, job_id: UUID, worker_id: str) -> None:
+        """Продлить visibility timeout, пока задача выполняется"""
+        await self.db.execute(
+            text("""
+                UPDATE processing_jobs
+                SET locked_until = now() + make_interval(secs => :visibility)
+                WHERE id = :id AND locked_by = :worker_id AND status = :running
+            """),
+            {
+                "id": job_id,
+                "worker_id": worker_id,
+                "running": JobStatus.RUNNING,
+                "visibility": settings.JOB_VISIBILITY_TIMEOUT,
+            }
+        )
+        await self.db.commit()
+    
+    async def complete(self, job_id: UUID) -> None:
+        await self.db.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = :done, locked_until = NULL, updated_at = now()
+                WHERE id = :id
+            """),
+            {"id": job_id, "done": JobStatus.DONE}
+        )
+        await self.db.commit()
+    
+    async def fail(self, job: Dict[str, Any], error: str) -> None:
+        """Ошибка: повтор с экспоненциальным backoff или окончательный failed"""
+        if job["attempts"] >= job["max_attempts"]:
+            status = JobStatus.FAILED
+            delay = 0
+            print(f"❌ Job {job['id']} failed permanently after {job['attempts']} attempts")
+        else:
+            status = JobStatus.QUEUED
+            delay = settings.JOB_RETRY_BASE_DELAY * (2 ** (job["attempts"] - 1))
+            print(f"🔁 Job {job['id']} will retry in {delay}s")
+        
+        # run_at считаем часами БД — claim сравнивает его с now() там же
+        await self.db.execute(
+            text("""
+                UPDATE processing_jobs
+                SET status = :status, run_at = now() + make_interval(secs => :delay),
+                    locked_until = NULL, last_error = :error, updated_at = now()
+                WHERE id = :id
+            """),
+            {"id": job["id"], "status": status, "delay": delay, "error": error[:2000]}
+        )
+        await self.db.commit()
+    
+    async def recover_orphans(self, older_than_seconds: int) -> int:
+        """Материалы в processing без живой задачи (потеряны при рестарте) — ставим заново"""
+        result = await self.db.execute(
+            text("""
+                SELECT m.id, m.title, m.extracted_text IS NULL OR m.extracted_text = '' AS no_text,
+                       m.file_path IS NULL AS no_file
+                FROM materials m
+                WHERE m.status = 'processing'
+                  AND COALESCE(m.updated_at, m.created_at) < now() - make_interval(secs => :age)
+                  AND NOT EXISTS (
+                      SELECT 1 FROM processing_jobs j
+                      WHERE j.material_id = m.id
+                        AND (j.status IN (:queued, :running) OR j.updated_at > now() - make_interval(secs => :age))
+                  )
+                LIMIT 100
+            """),
+            {"age": older_than_seconds, "queued": JobStatus.QUEUED, "running": JobStatus.RUNNING}
+        )
+        orphans = result.fetchall()
+        
+        for row in orphans:
+            if row.no_text and row.no_file:
+                # Материал «по теме», текст ещё не сгенерирован
+                kind, payload = JobKind.GENERATE_TOPIC, {"material_id": str(row.id), "topic": row.title}
+            else:
+                kind, payload = JobKind.PROCESS_MATERIAL, {"material_id": str(row.id)}
+            self.db.add(ProcessingJob(
+                kind=kind,
+                material_id=row.id,
+                payload=payload,
+                status=JobStatus.QUEUED,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+            ))
+        
+        if orphans:
+            await self.db.commit()
+            print(f"🧹 Re-queued {len(orphans)} orphaned materials")
+        
+        return len(orphans)
+
+
+async def _run_job(job: Dict[str, Any]) -> None:
+    """Выполнить задачу по её kind"""
+    from app.services.material_tasks import process_material_background, generate_topic_background
+    
+    payload = job["payload"] or {}
+    if isinstance(payload, str):
+        payload = json.loads(payload)
+    payload = dict(payload)
+    for key in ("material_id", "group_id"):
+        if payload.get(key):
+            payload[key] = UUID(payload[key])
+    
+    if job["kind"] == JobKind.PROCESS_MATERIAL:
+        await process_material_background(**payload)
+    elif job["kind"] == JobKind.GENERATE_TOPIC:
+        await generate_topic_background(**payload)
+    else:
+        raise ValueError(f"Unknown job kind: {job['kind']}")
+
+
+async def _heartbeat_loop(job_id: UUID, worker_id: str) -> None:
+    interval = max(settings.JOB_VISIBILITY_TIMEOUT / 3, 1)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                await JobQueue(db).heartbeat(job_id, worker_id)
+        except Exception as e:
+            print(f"⚠️ Job heartbeat failed: {e}")
+
+
+async def worker_loop(worker_id: str, stop_event: asyncio.Event) -> None:
+    """Цикл воркера: claim → выполнить → complete/fail"""
+    print(f"👷 Worker {worker_id} started")
+    
+    while not stop_event.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                job = await JobQueue(db).claim(worker_id)
+        except Exception as e:
+            print(f"⚠️ Worker {worker_id} claim error: {e}")
+            job = None
+        
+        if not job:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=settings.JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        
+        print(f"⚙️ Worker {worker_id} running {job['kind']} (attempt {job['attempts']})")
+        heartbeat = asyncio.create_task(_heartbeat_loop(job["id"], worker_id))
+        try:
+            await _run_job(job)
+            async with AsyncSessionLocal() as db:
+                await JobQueue(db).complete(job["id"])
+        except Exception as e:
+            traceback.print_exc()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await JobQueue(db).fail(job, str(e))
+            except Exception as fail_error:
+                # Задачу подберёт другой воркер после visibility timeout
+                print(f"⚠️ Failed to record job error: {fail_error}")
+        finally:
+            heartbeat.cancel()
+    
+    print(f"👋 Worker {worker_id} stopped")
+
+
+async def sweeper_loop(stop_event: asyncio.Event) -> None:
+    """Периодический поиск материалов, зависших в processing"""
+    while not stop_event.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                await JobQueue(db).recover_orphans(settings.JOB_VISIBILITY_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Orphan sweep failed: {e}")
+        
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.JOB_SWEEP_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def make_worker_id(index: int) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+# ===== Встроенные воркеры (внутри web-процесса) =====
+
+_embedded_stop: Optional[asyncio.Event] = None
+_embedded_tasks: List[asyncio.Task] = []
+
+
+def start_embedded_workers() -> None:
+    """Запуск воркеров очереди в текущем event loop (EMBEDDED_WORKER=true)"""
+    global _embedded_stop
+    if _embedded_tasks:
+        return
+    
+    _embedded_stop = asyncio.Event()
+    for i in range(settings.JOB_WORKER_CONCURRENCY):
+        _embedded_tasks.append(asyncio.create_task(worker_loop(make_worker_id(i), _embedded_stop)))
+    _embedded_tasks.append(asyncio.create_task(sweeper_loop(_embedded_stop)))
+
+
+async def stop_embedded_workers() -> None:
+    if not _embedded_tasks:
+        return
+    
+    _embedded_stop.set()
+    # Незавершённые задачи вернутся в очередь по visibility timeout
+    for task in _embedded_tasks:
+        task.cancel()
+    await asyncio.gather(*_embedded_tasks, return_exceptions=True)
+    _embedded_tasks.clear()
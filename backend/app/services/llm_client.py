@@ -0,0 +1,243 @@
+# backend/app/services/llm_client.py
+import asyncio
+import base64
+import hashlib
+import json
+import random
+from typing import List, Dict, Any, Optional, Union, AsyncIterator
+
+import httpx
+
+from app.core.config import settings
+
+GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+Part = Dict[str, Any]
+
+
+class LLMError(Exception):
+    """Ошибка вызова LLM API"""
+
+
+class LLMClient:
+    """Единый async-клиент Gemini: HTTP/2 пул соединений + глобальный лимит параллелизма.
+    
+    LLM_BACKEND=fake — локальный фейк без сети (нагрузочные тесты офлайн).
+    """
+    
+    def __init__(self):
+        self.backend = settings.LLM_BACKEND
+        self.max_concurrency = settings.LLM_MAX_CONCURRENCY
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._http: Optional[httpx.AsyncClient] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+    
+    def _client(self) -> httpx.AsyncClient:
+        """Общий httpx-клиент — соединения переиспользуются между вызовами"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=GEMINI_API_URL,
+                http2=True,
+                headers={"x-goog-api-key": settings.GEMINI_API_KEY},
+                timeout=httpx.Timeout(settings.LLM_TIMEOUT_SECONDS, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+        return self._http
+    
+    async def _post(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                if self.backend == "fake":
+                    return await _fake_response(path, body)
+                
+                response = await self._client().post(path, json=body)
+                if response.status_code >= 400:
+                    raise LLMError(f"Gemini API {response.status_code}: {response.text[:300]}")
+                return response.json()
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+    
+    @staticmethod
+    def _parts(prompt: Union[str, List[Part]]) -> List[Part]:
+        return [{"text": prompt}] if isinstance(prompt, str) else prompt
+    
+    @staticmethod
+    def _extract_text(data: Dict[str, Any]) -> str:
+        candidates = data.get("candidates") or []
+        if not candidates:
+            reason = (data.get("promptFeedback") or {}).get("blockReason", "no candidates")
+            raise LLMError(f"Empty Gemini response: {reason}")
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        text = "".join(p.get("text", "") for p in parts)
+        if not text:
+            raise LLMError(f"Empty Gemini response: {candidates[0].get('finishReason')}")
+        return text
+    
+    async def generate(self, prompt: Union[str, List[Part]], model: Optional[str] = None) -> str:
+        """generateContent — текст ответа целиком"""
+        model = model or settings.GEMINI_MODEL
+        data = await self._post(
+            f"/models/{model}:generateContent",
+            {"contents": [{"role": "user", "parts": self._parts(prompt)}]}
+        )
+        return self._extract_text(data)
+    
+    async def stream_generate(
+        self,
+        prompt: Union[str, List[Part]],
+        model: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """streamGenerateContent (SSE) — куски текста по мере генерации"""
+        model = model or settings.GEMINI_MODEL
+        body = {"contents": [{"role": "user", "parts": self._parts(prompt)}]}
+        
+        async with self._semaphore:
+            self.in_flight += 1
+            self.requests += 1
+            try:
+                if self.backend == "fake":
+                    async for chunk in _fake_stream(body):
+                        yield chunk
+                    return
+                
+                async with self._client().stream(
+                    "POST",
+                    f"/models/{model}:streamGenerateContent",
+                    params={"alt": "sse"},
+                    json=body,
+                ) as response:
+                    if response.status_code >= 400:
+                        error_body = await response.aread()
+                        raise LLMError(f"Gemini API {response.status_code}: {error_body[:300]!r}")
+                    
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = json.loads(line[5:].strip())
+                        for candidate in data.get("candidates") or []:
+                            for part in (candidate.get("content") or {}).get("parts") or []:
+                                if part.get("text"):
+                                    yield part["text"]
+            except Exception:
+                self.errors += 1
+                raise
+            finally:
+                self.in_flight -= 1
+    
+    async def generate_from_file(
+        self,
+        data: bytes,
+        mime_type: str,
+        prompt: str,
+        model: Optional[str] = None
+    ) -> str:
+        """Мультимодальный запрос (OCR): файл inline + инструкция"""
+        return await self.generate(
+            [
+                {"inline_data": {"mime_type": mime_type, "data": base64.b64encode(data).decode("utf-8")}},
+                {"text": prompt},
+            ],
+            model=model
+        )
+    
+    async def embed(self, texts: List[str], model: str, task_type: str) -> List[List[float]]:
+        """batchEmbedContents — embeddings для пачки текстов одним запросом"""
+        model_path = model if model.startswith("models/") else f"models/{model}"
+        data = await self._post(
+            f"/{model_path}:batchEmbedContents",
+            {
+                "requests": [
+                    {
+                        "model": model_path,
+                        "content": {"parts": [{"text": t}]},
+                        "taskType": task_type.upper(),
+                    }
+                    for t in texts
+                ]
+            }
+        )
+        embeddings = [e["values"] for e in data.get("embeddings", [])]
+        if len(embeddings) != len(texts):
+            raise LLMError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        return embeddings
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+    
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+# ===== Фейковый бэкенд (LLM_BACKEND=fake) =====
+
+_FAKE_JSON = {
+    '"questions"': {"questions": [{
+        "question": "Тестовый вопрос?",
+        "options": ["A", "B", "C", "D"],
+        "correct": 0,
+        "explanation": "Фейковый ответ",
+        "difficulty": "easy"
+    }]},
+    '"terms"': {"terms": [{"term": "Термин", "definition": "Определение"}]},
+    '"cards"': {"cards": [{"front": "Вопрос", "back": "Ответ"}]},
+    '"slides"': {"title": "Презентация", "slides": [
+        {"type": "title", "title": "Презентация"},
+        {"type": "conclusion", "title": "Заключение", "bullets": ["Вывод"]}
+    ]},
+}
+
+
+def _fake_embedding(text_content: str) -> List[float]:
+    """Детерминированный псевдо-embedding по хэшу текста"""
+    rng = random.Random(hashlib.sha256(text_content.encode("utf-8")).digest())
+    return [rng.uniform(-1.0, 1.0) for _ in range(768)]
+
+
+async def _fake_response(path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    latency = settings.LLM_FAKE_LATENCY_MS / 1000
+    await asyncio.sleep(latency * random.uniform(0.5, 1.5))
+    
+    if path.endswith(":batchEmbedContents"):
+        return {"embeddings": [
+            {"values": _fake_embedding(r["content"]["parts"][0]["text"])}
+            for r in body["requests"]
+        ]}
+    
+    prompt = " ".join(
+        p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])
+    )
+    text = next(
+        (json.dumps(payload, ensure_ascii=False) for marker, payload in _FAKE_JSON.items() if marker in prompt),
+        "Фейковый ответ LLM. " * 20
+    )
+    return {"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+
+async def _fake_stream(body: Dict[str, Any]) -> AsyncIterator[str]:
+    data = await _fake_response(":generateContent", body)
+    text = data["candidates"][0]["content"]["parts"][0]["text"]
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        await asyncio.sleep(0.01)
+        yield word if i == len(words) - 1 else word + " "
+
+
+llm_client = LLMClient()
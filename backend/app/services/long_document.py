@@ -0,0 +1,138 @@
+# backend/app/services/long_document.py
+"""
+Map-reduce для длинных материалов.
+
+generate_* видят только первые 20–30k символов, поэтому учебник длиннее
+порога сначала сжимается: текст режется по структуре (заголовки, главы,
+абзацы), каждый раздел параллельно превращается в выжимку (map), выжимки
+склеиваются и при необходимости сжимаются ещё раз (reduce). Все форматы
+генерируются из итоговой выжимки — она покрывает весь текст.
+
+Выжимки кэшируются в ai_output_cache (формат section_digest), поэтому
+перегенерация одного формата не повторяет map-шаг.
+"""
+import asyncio
+import re
+from typing import List, Tuple
+
+from app.core.config import settings
+from app.services.ai_service import gemini_service
+from app.services.chunker import HEADING_RE, heading_of
+
+PARAGRAPH_RE = re.compile(r'\n[ \t]*\n')
+
+MAX_REDUCE_LEVELS = 3
+# Если выжимку раздела получить не удалось — берём начало раздела, чтобы не терять покрытие
+FALLBACK_SECTION_CHARS = 2000
+
+
+def needs_map_reduce(content: str) -> bool:
+    return settings.MAP_REDUCE_ENABLED and len(content) > settings.MAP_REDUCE_THRESHOLD
+
+
+def _split_blocks(text: str) -> List[str]:
+    """Режем перед каждым заголовком; текст до первого заголовка — отдельный блок"""
+    starts = [0] + [m.start() for m in HEADING_RE.finditer(text) if m.start() > 0]
+    bounds = starts + [len(text)]
+    return [text[bounds[i]:bounds[i + 1]] for i in range(len(starts)) if text[bounds[i]:bounds[i + 1]].strip()]
+
+
+def _split_oversized(block: str, max_chars: int) -> List[str]:
+    """Слишком длинный блок — по абзацам, абзац длиннее лимита — жёстко по max_chars"""
+    pieces: List[str] = []
+    for paragraph in PARAGRAPH_RE.split(block):
+        for offset in range(0, len(paragraph), max_chars):
+            pieces.append(paragraph[offset:offset + max_chars])
+    return pieces
+
+
+def split_sections(text: str, max_chars: int) -> List[str]:
+    """
+    Разделы не длиннее max_chars, границы — по структуре документа.
+    Соседние короткие блоки склеиваются, чтобы не плодить вызовы LLM.
+    """
+    sections: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    def flush() -> None:
+        nonlocal current, current_len
+        if current:
+            sections.append("\n\n".join(current).strip())
+        current, current_len = [], 0
+
+    for block in _split_blocks(text):
+        parts = [block] if len(block) <= max_chars else _split_oversized(block, max_chars)
+        for part in parts:
+            part = part.strip()
+            if not part:
+                continue
+            if current_len + len(part) + 2 > max_chars:
+                flush()
+            current.append(part)
+            current_len += len(part) + 2
+    flush()
+
+    return sections
+
+
+async def _digest_all(sections: List[str], title: str, max_words: int) -> List[str]:
+    """Map: выжимки разделов параллельно (глобальный лимит — семафор llm_client)"""
+    semaphore = asyncio.Semaphore(settings.MAP_REDUCE_CONCURRENCY)
+
+    async def digest(section: str) -> str:
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(
+                    gemini_service.generate_section_digest(section, title, max_words),
+                    timeout=settings.OUTPUT_TIMEOUT_SECONDS
+                )
+            except Exception as e:
+                print(f"  ⚠️ Section digest failed, using section start: {e}")
+                result = ""
+        result = result.strip()
+        return result if result else section[:FALLBACK_SECTION_CHARS]
+
+    return await asyncio.gather(*[digest(section) for section in sections])
+
+
+def _join_digests(sections: List[str], digests: List[str]) -> str:
+    parts = []
+    for section, digest in zip(sections, digests):
+        heading = heading_of(section)
+        parts.append(f"## {heading}\n{digest}" if heading else digest)
+    return "\n\n".join(parts)
+
+
+async def condense_long_content(content: str, title: str = "") -> Tuple[str, int]:
+    """
+    Сжать длинный материал до MAP_REDUCE_TARGET_CHARS с покрытием всего текста.
+    Возвращает (выжимка, число вызовов map). Короткий текст возвращается как есть.
+    """
+    if not needs_map_reduce(content):
+        return content, 0
+
+    section_chars = settings.MAP_REDUCE_SECTION_CHARS
+    target = settings.MAP_REDUCE_TARGET_CHARS
+    text = content
+    calls = 0
+
+    for level in range(1, MAX_REDUCE_LEVELS + 1):
+        sections = split_sections(text, section_chars)
+        # Бюджет слов на раздел — чтобы склейка уложилась в target (~7 символов на слово)
+        max_words = max(80, min(600, target // max(len(sections), 1) // 7))
+        print(f"  🗺️ Map-reduce level {level}: {len(sections)} sections, ≤{max_words} words each")
+
+        digests = await _digest_all(sections, title, max_words)
+        calls += len(sections)
+        text = _join_digests(sections, digests)
+
+        if len(text) <= target:
+            break
+
+    if len(text) > target:
+        print(f"  ⚠️ Condensed text still {len(text)} chars, truncating to {target}")
+        text = text[:target]
+
+    print(f"  ✅ Condensed {len(content)} → {len(text)} chars in {calls} map calls")
+    return text, calls
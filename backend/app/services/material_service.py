@@ -1,12 +1,16 @@
 # backend/app/services/material_service.py - ЗАМЕНИ ПОЛНОСТЬЮ
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
-from typing import Optional, List
+from sqlalchemy import select, func, and_, or_, text, tuple_
+from sqlalchemy.orm import selectinload, load_only
+from typing import Optional, List, Dict, Any, Tuple
+from datetime import datetime
 from uuid import UUID
+from fastapi import UploadFile
 import aiofiles
+import hashlib
 import os
 import re
+import zipfile
 from pathlib import Path
 
 from app.models import Material, MaterialType, ProcessingStatus, User
@@ -30,6 +34,83 @@ def clean_text_for_db(text: str) -> str:
     return text
 
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB — столько держим в памяти на одну загрузку
+
+
+class UploadTooLarge(ValueError):
+    """Загрузка превысила MAX_FILE_SIZE_MB — запись прервана, частичный файл удалён"""
+
+
+def _is_docx_zip(path: Optional[str]) -> bool:
+    """Zip-контейнер — DOCX, только если внутри есть word/ или тип wordprocessingml"""
+    if not path:
+        return False
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = archive.namelist()
+            if any(name.startswith('word/') for name in names):
+                return True
+            if '[Content_Types].xml' in names:
+                return b'wordprocessingml' in archive.read('[Content_Types].xml')
+    except (zipfile.BadZipFile, OSError, KeyError):
+        return False
+    return False
+
+
+def sniff_material_type(head: bytes, path: Optional[str] = None) -> Optional[str]:
+    """
+    Тип по magic bytes первого чанка (None — сигнатура не распознана, решает расширение).
+    Zip проверяется по содержимому сохранённого файла path: xlsx/pptx/обычный zip — не DOCX.
+    """
+    if head.startswith(b'%PDF'):
+        return MaterialType.PDF
+    if head.startswith(b'PK\x03\x04'):
+        return MaterialType.DOCX if _is_docx_zip(path) else None
+    # .doc — OLE2 (как и в detect_material_type, .doc идёт в DOCX)
+    if head.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'):
+        return MaterialType.DOCX
+    if (
+        head.startswith(b'\x89PNG\r\n\x1a\n')
+        or head.startswith(b'\xff\xd8\xff')
+        or head.startswith((b'GIF87a', b'GIF89a'))
+        or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+    ):
+        return MaterialType.IMAGE
+    if (
+        head.startswith(b'ID3')
+        or head[:2] in (b'\xff\xfb', b'\xff\xf3', b'\xff\xf2')
+        or (head[:4] == b'RIFF' and head[8:12] == b'WAVE')
+        or (head[4:8] == b'ftyp' and head[8:11] == b'M4A')
+    ):
+        return MaterialType.AUDIO
+    return None
+
+
+# Колонки карточки материала: extracted_text (до мегабайт) в списках не грузим
+MATERIAL_CARD_COLUMNS = (
+    Material.id,
+    Material.user_id,
+    Material.title,
+    Material.material_type,
+    Material.status,
+    Material.folder_id,
+    Material.created_at,
+)
+
+# tsquery по тем же конфигурациям, что и materials.search_vector (миграция 007_materials_fts).
+# Выражение подставляется в SQL напрямую, чтобы планировщик мог использовать GIN-индекс.
+FTS_QUERY_SQL = (
+    "(websearch_to_tsquery('russian', :q) || "
+    "websearch_to_tsquery('english', :q) || "
+    "websearch_to_tsquery('simple', :q))"
+)
+HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=25, MinWords=8, StartSel=<b>, StopSel=</b>"
+
+# Возможности БД для поиска — проверяются один раз на процесс
+_fts_enabled: Optional[bool] = None
+_trgm_enabled: Optional[bool] = None
+
+
 class MaterialService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -42,9 +123,11 @@ class MaterialService:
         file_path: Optional[str] = None,
         original_filename: Optional[str] = None,
         folder_id: Optional[UUID] = None,
-        raw_content: Optional[str] = None
+        raw_content: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        commit: bool = True
     ) -> Material:
-        """Создать новый материал"""
+        """Создать новый материал (commit=False — только flush, коммитит вызывающий)"""
         
         # ОЧИСТКА контента перед сохранением!
         if raw_content:
@@ -58,9 +141,13 @@ class MaterialService:
             original_filename=original_filename,
             folder_id=folder_id,
             raw_content=raw_content,
+            content_hash=content_hash,
             status=ProcessingStatus.PENDING
         )
         self.db.add(material)
+        if not commit:
+            await self.db.flush()
+            return material
         await self.db.commit()
         await self.db.refresh(material)
         return material
@@ -75,25 +162,56 @@ class MaterialService:
         return result.scalar_one_or_none()
     
     async def get_user_materials(
-        self, 
-        user_id: UUID, 
+        self,
+        user_id: UUID,
         folder_id: Optional[UUID] = None,
         limit: int = 50,
-        offset: int = 0
+        cursor: Optional[Tuple[datetime, UUID]] = None
     ) -> List[Material]:
-        """Получить материалы пользователя"""
-        query = select(Material).where(Material.user_id == user_id)
+        """
+        Получить материалы пользователя (только поля карточки).
+        cursor = (created_at, id) последней строки предыдущей страницы — keyset вместо OFFSET.
+        """
+        query = select(Material).options(load_only(*MATERIAL_CARD_COLUMNS)).where(Material.user_id == user_id)
         
         if folder_id:
             query = query.where(Material.folder_id == folder_id)
         else:
             query = query.where(Material.folder_id.is_(None))
         
-        query = query.order_by(Material.created_at.desc()).limit(limit).offset(offset)
+        query = self._keyset_page(query, limit, cursor)
         
         result = await self.db.execute(query)
         return list(result.scalars().all())
     
+    async def get_group_materials(
+        self,
+        group_id: UUID,
+        limit: int = 50,
+        cursor: Optional[Tuple[datetime, UUID]] = None
+    ) -> List[Material]:
+        """Материалы группы (только поля карточки), keyset-пагинация"""
+        query = select(Material).options(load_only(*MATERIAL_CARD_COLUMNS)).where(Material.folder_id == group_id)
+        query = self._keyset_page(query, limit, cursor)
+        
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+    
+    @staticmethod
+    def _keyset_page(query, limit: int, cursor: Optional[Tuple[datetime, UUID]]):
+        """ORDER BY created_at DESC, id DESC + условие курсора"""
+        if cursor:
+            cursor_time, cursor_id = cursor
+            if cursor_time is None:
+                # DESC ставит NULL первыми: дальше — NULL с меньшим id и все остальные
+                query = query.where(or_(
+                    and_(Material.created_at.is_(None), Material.id < cursor_id),
+                    Material.created_at.is_not(None)
+                ))
+            else:
+                query = query.where(tuple_(Material.created_at, Material.id) < tuple_(cursor_time, cursor_id))
+        return query.order_by(Material.created_at.desc(), Material.id.desc()).limit(limit)
+    
     async def update_status(
         self, 
         material: Material, 
@@ -118,28 +236,53 @@ class MaterialService:
         await self.db.commit()
     
     @staticmethod
-    async def save_uploaded_file(
-        file_content: bytes,
-        filename: str,
-        user_id: UUID
-    ) -> str:
-        """Сохранить загруженный файл"""
+    async def save_upload_stream(
+        file: UploadFile,
+        user_id: UUID,
+        max_bytes: int
+    ) -> Tuple[str, str, int, Optional[str]]:
+        """
+        Потоково сохранить загрузку: читаем по UPLOAD_CHUNK_SIZE, считаем SHA-256
+        и прерываемся, как только превышен max_bytes. В памяти — один чанк.
+        Возвращает (file_path, sha256, size, тип по сигнатуре или None).
+        """
         user_dir = Path(settings.UPLOAD_DIR) / str(user_id)
         user_dir.mkdir(parents=True, exist_ok=True)
         
         import uuid
-        ext = Path(filename).suffix.lower()
-        safe_filename = f"{uuid.uuid4()}{ext}"
-        file_path = user_dir / safe_filename
+        ext = Path(file.filename or "").suffix.lower()
+        file_path = user_dir / f"{uuid.uuid4()}{ext}"
+        # Пишем во временный файл: недокачанный/обрезанный файл не окажется на месте итогового
+        tmp_path = file_path.with_name(file_path.name + ".part")
+        
+        hasher = hashlib.sha256()
+        size = 0
+        head = b""
         
-        async with aiofiles.open(file_path, 'wb') as f:
-            await f.write(file_content)
+        try:
+            async with aiofiles.open(tmp_path, 'wb') as out:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    if size == 0:
+                        head = chunk
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                    hasher.update(chunk)
+                    await out.write(chunk)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        return str(file_path)
+        sniffed_type = sniff_material_type(head, str(file_path))
+        return str(file_path), hasher.hexdigest(), size, sniffed_type
     
     @staticmethod
-    def detect_material_type(filename: str) -> MaterialType:
-        """Определить тип материала по расширению"""
+    def detect_material_type(filename: str, sniffed_type: Optional[str] = None) -> MaterialType:
+        """Определить тип материала: сигнатура файла важнее расширения"""
+        if sniffed_type:
+            return sniffed_type
+        
         ext = Path(filename).suffix.lower()
         
         type_map = {
@@ -156,4 +299,130 @@ class MaterialService:
             '.wav': MaterialType.AUDIO,
             '.m4a': MaterialType.AUDIO,
         }
-        return type_map.get(ext, MaterialType.TXT)
\ No newline at end of file
+        return type_map.get(ext, MaterialType.TXT)
+    
+    # ==================== Search ====================
+    
+    async def _search_capabilities(self):
+        """(search_vector есть, pg_trgm установлен)"""
+        global _fts_enabled, _trgm_enabled
+        
+        if _fts_enabled is None:
+            try:
+                result = await self.db.execute(text("""
+                    SELECT
+                        EXISTS (
+                            SELECT 1 FROM information_schema.columns
+                            WHERE table_name = 'materials' AND column_name = 'search_vector'
+                        ),
+                        EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+                """))
+                _fts_enabled, _trgm_enabled = result.one()
+            except Exception as e:
+                print(f"⚠️ Search capabilities check failed: {e}")
+                await self.db.rollback()
+                _fts_enabled, _trgm_enabled = False, False
+            
+            print(f"🔎 Material search: fts={_fts_enabled} trgm={_trgm_enabled}")
+        
+        return _fts_enabled, _trgm_enabled
+    
+    async def search_materials(
+        self,
+        user_id: UUID,
+        group_ids: List[UUID],
+        query: str,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        Поиск по своим и групповым материалам: full-text по названию и тексту
+        + триграммы по названию (опечатки). Результаты ранжированы, со сниппетами.
+        """
+        query = query.strip()
+        fts, trgm = await self._search_capabilities()
+        
+        if not fts:
+            return await self._search_materials_like(user_id, group_ids, query, limit)
+        
+        match = [f"m.search_vector @@ {FTS_QUERY_SQL}"]
+        rank = f"ts_rank_cd(m.search_vector, {FTS_QUERY_SQL})"
+        if trgm:
+            match.append("lower(m.title) % :q_lower")
+            match.append("lower(m.title) LIKE :q_like")
+            rank += " + similarity(lower(m.title), :q_lower)"
+        
+        # ts_headline дорогой — считаем только для уже отобранных строк
+        result = await self.db.execute(
+            text(f"""
+                SELECT
+                    top.id, top.title, top.material_type, top.status,
+                    top.folder_id, top.created_at, top.user_id, top.rank,
+                    ts_headline(
+                        'russian',
+                        left(coalesce(m.extracted_text, ''), 20000),
+                        {FTS_QUERY_SQL},
+                        :headline_options
+                    ) AS snippet
+                FROM (
+                    SELECT
+                        m.id, m.title, m.material_type, m.status,
+                        m.folder_id, m.created_at, m.user_id,
+                        {rank} AS rank
+                    FROM materials m
+                    WHERE (m.user_id = :user_id OR m.folder_id = ANY(CAST(:group_ids AS uuid[])))
+                      AND ({" OR ".join(match)})
+                    ORDER BY rank DESC, m.created_at DESC
+                    LIMIT :limit
+                ) top
+                JOIN materials m ON m.id = top.id
+                ORDER BY top.rank DESC, top.created_at DESC
+            """),
+            {
+                "q": query,
+                "q_lower": query.lower(),
+                "q_like": f"%{query.lower()}%",
+                "user_id": user_id,
+                "group_ids": list(group_ids),
+                "limit": limit,
+                "headline_options": HEADLINE_OPTIONS,
+            }
+        )
+        
+        return [dict(row._mapping) for row in result.all()]
+    
+    async def _search_materials_like(
+        self,
+        user_id: UUID,
+        group_ids: List[UUID],
+        query: str,
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Фолбэк до миграции 007: подстрока в названии"""
+        conditions = [Material.user_id == user_id]
+        if group_ids:
+            conditions.append(Material.folder_id.in_(group_ids))
+        
+        result = await self.db.execute(
+            select(Material)
+            .where(
+                or_(*conditions),
+                func.lower(Material.title).like(f"%{query.lower()}%")
+            )
+            .order_by(Material.created_at.desc())
+            .limit(limit)
+        )
+        
+        return [
+            {
+                "id": m.id,
+                "title": m.title,
+                "material_type": m.material_type,
+                "status": m.status,
+                "folder_id": m.folder_id,
+                "created_at": m.created_at,
+                "user_id": m.user_id,
+                "rank": None,
+                "snippet": None,
+            }
+            for m in result.scalars().all()
+        ]
@@ -0,0 +1,179 @@
+# backend/app/services/material_tasks.py
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
+from uuid import UUID
+import traceback
+
+from app.models import Material, ProcessingStatus, AsyncSessionLocal
+from app.core.config import settings
+
+
+async def process_material_background(
+    material_id: UUID,
+    group_id: Optional[UUID] = None,
+    user_telegram_id: int = None,
+    user_first_name: Optional[str] = None
+):
+    """Фоновая обработка материала (выполняется воркером очереди)"""
+    # Создаём НОВУЮ сессию для background task
+    async with AsyncSessionLocal() as db:
+        try:
+            result = await db.execute(
+                select(Material).where(Material.id == material_id)
+            )
+            material = result.scalar_one_or_none()
+            
+            if not material:
+                print(f"❌ Material {material_id} not found")
+                return
+            
+            from app.services.processing_service import ProcessingService
+            processing_service = ProcessingService(db)
+            await _process_or_raise(processing_service, material)
+            await db.commit()
+            
+            print(f"✅ Background processing complete: {material_id}")
+            
+            # Уведомления группе
+            if group_id and material.status == ProcessingStatus.COMPLETED:
+                await send_group_notification(
+                    db, group_id, material.title, 
+                    user_first_name, user_telegram_id
+                )
+                
+        except Exception as e:
+            print(f"❌ Background processing error: {e}")
+            traceback.print_exc()
+            await _mark_failed(db, material_id)
+            raise  # очередь повторит задачу с backoff
+
+
+async def generate_topic_background(
+    material_id: UUID,
+    topic: str,
+    group_id: Optional[UUID] = None,
+    user_telegram_id: int = None,
+    user_first_name: Optional[str] = None
+):
+    """Фоновая генерация по теме (выполняется воркером очереди)"""
+    async with AsyncSessionLocal() as db:
+        try:
+            print(f"🎯 Background generating: {topic}")
+            
+            from app.services.ai_service import gemini_service
+            from app.services.text_extractor import clean_text_for_db
+            
+            # Генерируем контент
+            generated_content = await gemini_service.generate_content_from_topic(topic)
+            generated_content = clean_text_for_db(generated_content)
+            
+            # Обновляем материал
+            result = await db.execute(
+                select(Material).where(Material.id == material_id)
+            )
+            material = result.scalar_one_or_none()
+            
+            if not material:
+                print(f"❌ Material {material_id} not found")
+                return
+            
+            material.raw_content = generated_content
+            await db.commit()
+            
+            # Обрабатываем
+            from app.services.processing_service import ProcessingService
+            processing_service = ProcessingService(db)
+            await _process_or_raise(processing_service, material)
+            await db.commit()
+            
+            print(f"✅ Background generation complete: {material_id}")
+            
+            # Уведомления
+            if group_id and material.status == ProcessingStatus.COMPLETED:
+                await send_group_notification(
+                    db, group_id, material.title,
+                    user_first_name, user_telegram_id
+                )
+                
+        except Exception as e:
+            print(f"❌ Background generation error: {e}")
+            traceback.print_exc()
+            await _mark_failed(db, material_id)
+            raise
+
+
+async def _process_or_raise(processing_service, material: Material) -> None:
+    """process_material не бросает исключений — временный сбой превращаем в ошибку задачи для retry"""
+    from app.services.processing_service import RetryableProcessingError
+    
+    result = await processing_service.process_material(material)
+    if result.get("status") == "error" and result.get("retryable"):
+        raise RetryableProcessingError(result.get("error") or "processing failed")
+
+
+async def _mark_failed(db: AsyncSession, material_id: UUID) -> None:
+    """Помечаем материал как failed (при retry воркер снова переведёт его в processing)"""
+    try:
+        await db.rollback()
+        result = await db.execute(
+            select(Material).where(Material.id == material_id)
+        )
+        material = result.scalar_one_or_none()
+        if material:
+            material.status = ProcessingStatus.FAILED
+            await db.commit()
+    except Exception:
+        pass
+
+
+async def send_group_notification(
+    db: AsyncSession,
+    group_id: UUID,
+    material_title: str,
+    user_first_name: Optional[str],
+    user_telegram_id: int
+):
+    """Отправка уведомлений группе"""
+    try:
+        from app.main import bot_app
+        
+        if bot_app:
+            await _notify_group(db, group_id, material_title, user_first_name, user_telegram_id, bot_app.bot)
+        elif settings.TELEGRAM_BOT_TOKEN:
+            # Отдельный процесс воркера — webhook-приложения бота здесь нет
+            from telegram import Bot
+            async with Bot(settings.TELEGRAM_BOT_TOKEN) as bot:
+                await _notify_group(db, group_id, material_title, user_first_name, user_telegram_id, bot)
+    except Exception as e:
+        print(f"⚠️ Notification error: {e}")
+
+
+async def _notify_group(
+    db: AsyncSession,
+    group_id: UUID,
+    material_title: str,
+    user_first_name: Optional[str],
+    user_telegram_id: int,
+    bot
+) -> None:
+    from app.services.notification_service import NotificationService
+    from app.services.group_service import GroupService
+    
+    group_service = GroupService(db)
+    members = await group_service.get_group_members(group_id)
+    member_ids = [m.get("telegram_id") for m in members if m.get("telegram_id")]
+    
+    group = await group_service.get_group_by_id(group_id)
+    group_name = group.name if group else "Группа"
+    
+    notification_service = NotificationService(db)
+    sent = await notification_service.send_group_material_notification(
+        group_name=group_name,
+        material_title=material_title,
+        uploader_name=user_first_name or "Участник",
+        member_telegram_ids=member_ids,
+        exclude_user_id=user_telegram_id,
+        bot=bot
+    )
+    print(f"📨 Notified {sent} members")
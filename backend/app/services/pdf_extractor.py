@@ -0,0 +1,267 @@
+# backend/app/services/pdf_extractor.py
+"""
+Параллельное извлечение текста из PDF в пуле процессов.
+
+pypdf — чистый Python, поэтому в потоках страницы всё равно идут по одной (GIL).
+Здесь документ режется на диапазоны страниц, диапазоны парсятся в отдельных
+процессах, а тексты страниц отдаются обратно строго по порядку.
+Страницы без текстового слоя, но с картинками (сканы), помечаются хэшем —
+их распознаёт OCR в TextExtractor (только эти страницы, не весь документ).
+
+Воркеры запускаются через spawn (web-процесс многопоточный — fork небезопасен),
+с лимитом адресного пространства (PDF_WORKER_MEMORY_MB) и перезапуском после
+PDF_WORKER_MAX_TASKS задач. На каждую страницу — SIGALRM-таймаут.
+"""
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, List, Optional, Tuple
+
+from app.core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Каждый spawn-воркер импортирует app.services.* — на маленьком инстансе больше двух не держим
+PDF_AUTO_WORKERS_MAX = 2
+
+# (текст страницы, sha256 страницы если она нуждается в OCR, иначе None)
+PageText = Tuple[str, Optional[str]]
+
+
+class PageTimeout(Exception):
+    """Страница не распарсилась за PDF_PAGE_TIMEOUT секунд"""
+
+
+# ==================== Код воркера (выполняется в дочернем процессе) ====================
+
+def _init_worker(memory_mb: int) -> None:
+    """Лимит памяти на процесс: патологический PDF получит MemoryError, а не OOM всего сервера"""
+    # Ctrl+C обрабатывает родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if memory_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"⚠️ PDF worker memory limit not applied: {e}")
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+def _count_pages(file_path: str) -> int:
+    import pypdf
+    return len(pypdf.PdfReader(file_path).pages)
+
+
+def _scan_hash(page) -> Optional[str]:
+    """
+    sha256 содержимого страницы (content stream + сырые данные XObject'ов),
+    если на ней есть картинки — иначе None (пустая страница в OCR не нужна)
+    """
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+    xobjects = resources.get("/XObject")
+    if xobjects is None:
+        return None
+    xobjects = xobjects.get_object()
+    if not xobjects:
+        return None
+
+    digest = hashlib.sha256()
+    contents = page.get_contents()
+    if contents is not None:
+        digest.update(contents.get_data())
+    for name in sorted(xobjects):
+        xobject = xobjects[name].get_object()
+        digest.update(name.encode())
+        digest.update(getattr(xobject, "_data", b"") or b"")
+    return digest.hexdigest()
+
+
+def _extract_page_range(
+    file_path: str,
+    start: int,
+    end: int,
+    page_timeout: float,
+    ocr_min_chars: int
+) -> List[PageText]:
+    """
+    Тексты страниц [start, end); битая/зависшая/слишком тяжёлая страница → пустая строка.
+    page_timeout <= 0 — без SIGALRM (вызов не из главного потока процесса).
+    """
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    pages: List[PageText] = []
+    use_alarm = page_timeout > 0
+    previous = signal.signal(signal.SIGALRM, _raise_page_timeout) if use_alarm else None
+    try:
+        for index in range(start, end):
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, page_timeout)
+            page_text, scan_hash = "", None
+            try:
+                page = reader.pages[index]
+                page_text = page.extract_text() or ""
+                if len(page_text.strip()) < ocr_min_chars:
+                    scan_hash = _scan_hash(page)
+            except PageTimeout:
+                print(f"⏱️ PDF page {index + 1} timed out after {page_timeout}s, skipped")
+            except MemoryError:
+                print(f"⚠️ PDF page {index + 1} exceeded worker memory limit, skipped")
+            except Exception as e:
+                print(f"⚠️ PDF page {index + 1} failed: {e}")
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            pages.append((page_text, scan_hash))
+    finally:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, previous)
+
+    return pages
+
+
+def extract_pages_sync(file_path: str) -> List[PageText]:
+    """Все страницы последовательно (PDF_PROCESS_POOL=False, вызывается в потоке)"""
+    return _extract_page_range(file_path, 0, _count_pages(file_path), 0, settings.PDF_OCR_MIN_PAGE_CHARS)
+
+
+def page_pdf_bytes(file_path: str, index: int) -> bytes:
+    """Одна страница отдельным PDF — для OCR страницы, а не всего документа"""
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    writer = pypdf.PdfWriter()
+    writer.add_page(reader.pages[index])
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+# ==================== Родительский процесс ====================
+
+def pdf_worker_count() -> int:
+    """PDF_WORKERS или доступные процессу ядра, но не больше PDF_AUTO_WORKERS_MAX"""
+    if settings.PDF_WORKERS > 0:
+        return settings.PDF_WORKERS
+    # os.cpu_count() в контейнере — ядра хоста, а не лимит инстанса
+    try:
+        available = len(os.sched_getaffinity(0))
+    except AttributeError:
+        available = os.cpu_count() or 1
+    return max(1, min(available, PDF_AUTO_WORKERS_MAX))
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        workers = pdf_worker_count()
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.PDF_WORKER_MEMORY_MB,),
+            max_tasks_per_child=settings.PDF_WORKER_MAX_TASKS or None,
+        )
+        print(f"🧮 PDF process pool: {workers} workers, {settings.PDF_WORKER_MEMORY_MB}MB each")
+    return _pool
+
+
+def _reset_pool() -> None:
+    """
+    Воркер убит (OOM killer, segfault) или завис — следующий вызов создаст новый пул.
+    shutdown(wait=False) не останавливает уже идущую задачу, поэтому процессы завершаем сами.
+    """
+    global _pool
+    if _pool is not None:
+        processes = list((_pool._processes or {}).values())
+        _pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        _pool = None
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+def split_page_ranges(page_count: int, workers: int, max_pages_per_task: int) -> List[Tuple[int, int]]:
+    """Диапазоны [start, end): не меньше одного на воркер, не больше max_pages_per_task страниц"""
+    if page_count <= 0:
+        return []
+    size = -(-page_count // max(workers, 1))
+    size = max(1, min(size, max_pages_per_task))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+async def run_in_pdf_pool(func, *args):
+    """Одна задача в пуле (например, page_pdf_bytes) — с той же обработкой упавшего воркера"""
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), func, *args)
+    except BrokenProcessPool:
+        _reset_pool()
+        raise ValueError("PDF слишком сложный для обработки (превышен лимит памяти)")
+
+
+async def iter_pdf_pages(file_path: str) -> AsyncIterator[PageText]:
+    """
+    Страницы по порядку, по мере готовности диапазонов.
+    В полёте не больше 2×workers диапазонов — память родителя не растёт с размером PDF.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    workers = pdf_worker_count()
+
+    try:
+        page_count = await loop.run_in_executor(pool, _count_pages, file_path)
+        ranges = split_page_ranges(page_count, workers, settings.PDF_PAGES_PER_TASK)
+
+        # Таймаут на диапазон — страховка, если воркер завис вне Python-кода
+        # (×2: диапазон мог ждать свободный воркер, пока дорабатывал предыдущий)
+        def range_timeout(start: int, end: int) -> float:
+            return 2 * (end - start) * settings.PDF_PAGE_TIMEOUT + 30
+
+        pending: List[Tuple[asyncio.Future, float]] = []
+        next_range = 0
+        max_in_flight = workers * 2
+
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < max_in_flight:
+                start, end = ranges[next_range]
+                future = loop.run_in_executor(
+                    pool, _extract_page_range, file_path, start, end,
+                    settings.PDF_PAGE_TIMEOUT, settings.PDF_OCR_MIN_PAGE_CHARS
+                )
+                pending.append((future, range_timeout(start, end)))
+                next_range += 1
+
+            future, timeout = pending.pop(0)
+            for page in await asyncio.wait_for(future, timeout=timeout):
+                yield page
+    except BrokenProcessPool:
+        _reset_pool()
+        raise ValueError("PDF слишком сложный для обработки (превышен лимит памяти)")
+    except asyncio.TimeoutError:
+        # Зависший воркер держит слот пула — пересоздаём пул
+        _reset_pool()
+        raise ValueError("PDF обрабатывается слишком долго")
+
+
+async def extract_pdf_parallel(file_path: str) -> str:
+    """Весь текстовый слой PDF, страницы через пустую строку (как в последовательном варианте)"""
+    parts = [page_text async for page_text, _ in iter_pdf_pages(file_path) if page_text]
+    return "\n\n".join(parts)
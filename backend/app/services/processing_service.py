@@ -1,13 +1,18 @@
 # backend/app/services/processing_service.py
 import asyncio
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Callable, Awaitable
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import delete
 import traceback
 
 from app.models import Material, AIOutput, OutputFormat, ProcessingStatus
 from app.services.text_extractor import TextExtractor
+from app.services.dedup_service import DedupService
+from app.services.long_document import needs_map_reduce, condense_long_content
 from app.services.ai_service import gemini_service
+from app.core.config import settings
 
 
 def clean_text_for_db(text: str) -> str:
@@ -27,11 +32,17 @@ def clean_text_for_db(text: str) -> str:
     return text
 
 
+class RetryableProcessingError(Exception):
+    """Временный сбой обработки (LLM, сеть, БД) — очередь повторит задачу"""
+
+
 class ProcessingService:
     """Сервис обработки материалов"""
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        # Одна AsyncSession не переживает параллельные commit'ы — сериализуем запись
+        self._db_lock = asyncio.Lock()
     
     async def process_material(self, material: Material) -> Dict[str, Any]:
         """Полная обработка материала"""
@@ -40,11 +51,24 @@ class ProcessingService:
         error_message = None
         content = None  # Сохраняем для индексации
         
+        # Повтор после ошибки: маркер прошлой попытки — не текст материала
+        if material.raw_content and material.raw_content.startswith("[ОШИБКА]"):
+            material.raw_content = None
+        
         try:
             # 1. Обновляем статус
             material.status = ProcessingStatus.PROCESSING
             await self.db.commit()
             
+            # Тот же файл/текст уже обработан — копируем результат, LLM не вызываем
+            cloned_formats = await DedupService(self.db).clone_from_duplicate(material)
+            if cloned_formats is not None:
+                return {
+                    "status": "success",
+                    "outputs": cloned_formats,
+                    "deduplicated": True
+                }
+            
             # 2. Извлекаем текст если нужно
             if not material.raw_content and material.file_path:
                 print(f"📖 Extracting text from: {material.file_path}")
@@ -85,32 +109,28 @@ class ProcessingService:
             
             print(f"🤖 Generating AI outputs for {len(content)} chars...")
             
-            # 3. Генерация AI-контента
-            results = await self._generate_all_outputs(content, material.title)
+            # 3. Генерация AI-контента — каждый формат сохраняется сразу по готовности
+            results = await self._generate_all_outputs(
+                content,
+                material.title,
+                on_complete=lambda name, output: self.save_output(material.id, name, output)
+            )
             
             # 4. Проверяем что хоть что-то сгенерировалось
             successful_outputs = {k: v for k, v in results.items() if v}
             
             if not successful_outputs:
                 error_message = "AI не смог обработать материал. Попробуйте другой файл."
-                raise ValueError(error_message)
-            
-            # 5. Сохраняем результаты (с очисткой!)
-            for format_type, output_content in successful_outputs.items():
-                ai_output = AIOutput(
-                    material_id=material.id,
-                    format=format_type,
-                    content=clean_text_for_db(output_content)
-                )
-                self.db.add(ai_output)
+                # Все форматы упали — скорее всего сбой LLM, а не плохой файл
+                raise RetryableProcessingError(error_message)
             
-            # 6. Финальный статус
+            # 5. Финальный статус
             material.status = ProcessingStatus.COMPLETED
             await self.db.commit()
             
             print(f"✅ Processing complete! Saved {len(successful_outputs)} outputs")
             
-            # 7. АВТОИНДЕКСАЦИЯ для vector search (RAG)
+            # 6. АВТОИНДЕКСАЦИЯ для vector search (RAG)
             await self._index_for_vector_search(material, content)
             
             return {
@@ -141,7 +161,9 @@ class ProcessingService:
             
             return {
                 "status": "error",
-                "error": final_error
+                "error": final_error,
+                # ValueError — проблема самого материала (пустой/битый файл), повтор не поможет
+                "retryable": not isinstance(e, ValueError)
             }
     
     async def _index_for_vector_search(self, material: Material, content: str) -> None:
@@ -160,15 +182,40 @@ class ProcessingService:
             # Не критичная ошибка — материал всё равно обработан
             print(f"⚠️ Vector indexing failed (non-critical): {e}")
     
+    async def save_output(self, material_id: UUID, format_type: str, output_content: str) -> AIOutput:
+        """
+        Сохранить один формат, заменив предыдущий — виден в /status до конца обработки.
+        Общий путь для обработки и обеих перегенераций: строка не меняется на месте,
+        новая версия — новая строка.
+        """
+        async with self._db_lock:
+            await self.db.execute(
+                delete(AIOutput).where(
+                    AIOutput.material_id == material_id,
+                    AIOutput.format == format_type
+                )
+            )
+            output = AIOutput(
+                material_id=material_id,
+                format=format_type,
+                content=clean_text_for_db(output_content)
+            )
+            self.db.add(output)
+            await self.db.commit()
+        return output
+    
     async def _generate_all_outputs(
         self, 
         content: str, 
-        title: str
+        title: str,
+        on_complete: Optional[Callable[[str, str], Awaitable[None]]] = None
     ) -> Dict[str, str]:
-        """Генерация всех форматов"""
-        results = {}
+        """Генерация всех форматов — параллельно, не больше N форматов одновременно"""
+        # Длинный материал: map-reduce выжимка по всему тексту вместо обрезки начала
+        if needs_map_reduce(content):
+            content, _ = await condense_long_content(content, title)
         
-        # Ограничиваем длину контента для API
+        # Ограничиваем длину контента для API (если map-reduce выключен)
         max_length = 50000
         if len(content) > max_length:
             print(f"⚠️ Content too long ({len(content)}), truncating to {max_length}")
@@ -182,22 +229,46 @@ class ProcessingService:
             ("flashcards", lambda: gemini_service.generate_flashcards(content, 10)),
         ]
         
-        for name, generator in generators:
-            try:
-                print(f"  📝 Generating {name}...")
-                result = await generator()
-                if result and len(result.strip()) > 10:
-                    # ОЧИСТКА результатов AI!
-                    results[name] = clean_text_for_db(result)
-                    print(f"  ✅ {name} done ({len(result)} chars)")
-                else:
-                    print(f"  ⚠️ {name} returned empty")
-                    results[name] = None
-            except Exception as e:
-                print(f"  ❌ {name} failed: {e}")
-                results[name] = None
-        
-        return results
+        # Лимит на материал; глобальный лимит — семафор внутри llm_client
+        semaphore = asyncio.Semaphore(settings.OUTPUT_CONCURRENCY_PER_MATERIAL)
+        
+        async def run(name: str, generator) -> Optional[str]:
+            async with semaphore:
+                try:
+                    print(f"  📝 Generating {name}...")
+                    result = await asyncio.wait_for(
+                        generator(),
+                        timeout=settings.OUTPUT_TIMEOUT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    print(f"  ⏱️ {name} timed out after {settings.OUTPUT_TIMEOUT_SECONDS}s")
+                    return None
+                except Exception as e:
+                    print(f"  ❌ {name} failed: {e}")
+                    return None
+            
+            if not result or len(result.strip()) <= 10:
+                print(f"  ⚠️ {name} returned empty")
+                return None
+            
+            # ОЧИСТКА результатов AI!
+            result = clean_text_for_db(result)
+            print(f"  ✅ {name} done ({len(result)} chars)")
+            
+            if on_complete:
+                try:
+                    await on_complete(name, result)
+                except Exception as e:
+                    print(f"  ❌ {name} save failed: {e}")
+                    async with self._db_lock:
+                        await self.db.rollback()
+                    return None
+            
+            return result
+        
+        outputs = await asyncio.gather(*[run(name, gen) for name, gen in generators])
+        
+        return {name: output for (name, _), output in zip(generators, outputs)}
     
     async def regenerate_output(
         self, 
@@ -214,14 +285,17 @@ class ProcessingService:
         
         # Очистка контента
         content = clean_text_for_db(content)
+        # Выжимки разделов берутся из кэша — пересчитывается только сам формат
+        content, _ = await condense_long_content(content, material.title)
         
         # Используем строки вместо констант OutputFormat
+        # force: пользователь явно просит новый вариант — кэш ответов не читаем (но обновляем)
         generators = {
-            "smart_notes": lambda: gemini_service.generate_smart_notes(content, material.title),
-            "tldr": lambda: gemini_service.generate_tldr(content),
-            "quiz": lambda: gemini_service.generate_quiz(content),
-            "glossary": lambda: gemini_service.generate_glossary(content),
-            "flashcards": lambda: gemini_service.generate_flashcards(content),
+            "smart_notes": lambda: gemini_service.generate_smart_notes(content, material.title, force=True),
+            "tldr": lambda: gemini_service.generate_tldr(content, force=True),
+            "quiz": lambda: gemini_service.generate_quiz(content, force=True),
+            "glossary": lambda: gemini_service.generate_glossary(content, force=True),
+            "flashcards": lambda: gemini_service.generate_flashcards(content, force=True),
         }
         
         generator = generators.get(output_format)
@@ -230,26 +304,7 @@ class ProcessingService:
         
         output_content = await generator()
         
-        # ОЧИСТКА результата!
-        output_content = clean_text_for_db(output_content)
-        
-        # Удаляем старый
-        from sqlalchemy import delete
-        await self.db.execute(
-            delete(AIOutput).where(
-                AIOutput.material_id == material.id,
-                AIOutput.format == output_format
-            )
-        )
-        
-        # Создаём новый
-        ai_output = AIOutput(
-            material_id=material.id,
-            format=output_format,
-            content=output_content
-        )
-        self.db.add(ai_output)
-        await self.db.commit()
+        ai_output = await self.save_output(material.id, output_format, output_content)
         await self.db.refresh(ai_output)
         
-        return ai_output
\ No newline at end of file
+        return ai_output
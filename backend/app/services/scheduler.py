@@ -63,6 +63,40 @@ async def keep_alive_ping():
         logger.warning(f"⚠️ Keep-alive failed: {e}")
 
 
+async def reconcile_group_counters():
+    """Починка дрейфа member_count / materials_count у групп (раз в сутки)"""
+    try:
+        from app.models.base import AsyncSessionLocal
+        from app.services.group_service import GroupService
+        
+        async with AsyncSessionLocal() as db:
+            repaired = await GroupService(db).reconcile_counters()
+        
+        if repaired:
+            logger.warning(f"🔧 Group counters repaired: {repaired}")
+        else:
+            logger.info("✅ Group counters consistent")
+    except Exception as e:
+        logger.error(f"❌ Group counters reconciliation error: {e}")
+
+
+async def prune_ai_output_cache():
+    """Вытеснение из кэша ответов Gemini: старые версии промптов и сверх лимита строк"""
+    try:
+        from app.models.base import AsyncSessionLocal
+        from app.services.ai_output_cache import ai_output_cache
+        
+        if not ai_output_cache.enabled:
+            return
+        
+        async with AsyncSessionLocal() as db:
+            removed = await ai_output_cache.prune(db)
+        
+        logger.info(f"🧹 AI output cache pruned: {removed} rows")
+    except Exception as e:
+        logger.error(f"❌ AI output cache prune error: {e}")
+
+
 def setup_scheduler():
     """Настройка планировщика"""
     
@@ -91,9 +125,27 @@ def setup_scheduler():
         replace_existing=True
     )
     
+    # Сверка счётчиков групп ночью (03:00 UTC+5 = 22:00 UTC)
+    scheduler.add_job(
+        reconcile_group_counters,
+        CronTrigger(hour=22, minute=0),
+        id="reconcile_group_counters",
+        replace_existing=True
+    )
+    
+    # Кэш ответов Gemini — держим в пределах AI_OUTPUT_CACHE_MAX_ROWS
+    scheduler.add_job(
+        prune_ai_output_cache,
+        IntervalTrigger(hours=1),
+        id="prune_ai_output_cache",
+        replace_existing=True
+    )
+    
     logger.info("📅 Scheduler configured:")
     logger.info("   - Streak reminders: 10:00 & 19:00 (UTC+5)")
     logger.info("   - Keep-alive ping: every 10 minutes")
+    logger.info("   - Group counters reconciliation: 03:00 (UTC+5)")
+    logger.info("   - AI output cache pruning: every hour")
 
 
 def start_scheduler():
@@ -4,8 +4,17 @@ import re
 import asyncio
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor
+import aiofiles
 
-# Thread pool для CPU-bound операций (PDF parsing, etc.)
+from app.core.config import settings
+from app.config.prompts import OCR_PROMPT
+from app.services.llm_client import llm_client
+from app.services.ai_output_cache import ai_output_cache, make_key
+from app.services.pdf_extractor import (
+    iter_pdf_pages, extract_pages_sync, page_pdf_bytes, run_in_pdf_pool
+)
+
+# Thread pool только для парсинга файлов (PDF, DOCX); OCR идёт через llm_client
 _executor = ThreadPoolExecutor(max_workers=2)
 
 
@@ -19,21 +28,6 @@ def clean_text_for_db(text: str) -> str:
     return text
 
 
-def _extract_pdf_sync(file_path: str) -> str:
-    """Синхронное извлечение из PDF — в thread pool"""
-    import pypdf
-    
-    text_parts = []
-    with open(file_path, 'rb') as f:
-        reader = pypdf.PdfReader(f)
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text_parts.append(page_text)
-    
-    return "\n\n".join(text_parts)
-
-
 def _extract_docx_sync(file_path: str) -> str:
     """Синхронное извлечение из DOCX — в thread pool"""
     from docx import Document
@@ -54,28 +48,56 @@ def _extract_docx_sync(file_path: str) -> str:
     return "\n\n".join(text_parts)
 
 
-def _ocr_with_gemini_sync(file_path: str, mime_type: str) -> str:
-    """Синхронный OCR через Gemini — в thread pool"""
-    import google.generativeai as genai
-    from app.core.config import settings
-    import base64
-    
-    genai.configure(api_key=settings.GEMINI_API_KEY)
-    
-    with open(file_path, 'rb') as f:
-        data = f.read()
-    
-    model = genai.GenerativeModel(settings.GEMINI_MODEL)
-    
-    response = model.generate_content([
-        {
-            "mime_type": mime_type,
-            "data": base64.b64encode(data).decode('utf-8')
-        },
-        "Извлеки весь текст. Сохрани структуру. Только текст, без комментариев."
-    ])
+async def _ocr_with_gemini(file_path: str, mime_type: str) -> str:
+    """OCR через Gemini — общий async llm_client, без отдельного пула"""
+    async with aiofiles.open(file_path, 'rb') as f:
+        data = await f.read()
     
-    return response.text.strip()
+    text = await llm_client.generate_from_file(data, mime_type, OCR_PROMPT)
+    return text.strip()
+
+
+async def _run_pdf_task(func, *args):
+    """PDF-задача в пуле процессов (PDF_PROCESS_POOL) или в thread pool"""
+    if settings.PDF_PROCESS_POOL:
+        return await run_in_pdf_pool(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def _ocr_pdf_pages(file_path: str, scans: dict) -> dict:
+    """
+    OCR только страниц-сканов: {номер страницы: sha256 страницы} → {номер: текст}.
+    Каждая страница — отдельный маленький PDF; одинаковые страницы (повторная
+    загрузка, тот же учебник у другого студента) берутся из кэша по хэшу.
+    """
+    semaphore = asyncio.Semaphore(settings.PDF_OCR_CONCURRENCY)
+    cached_pages = 0
+    
+    async def ocr_page(index: int, page_hash: str) -> str:
+        nonlocal cached_pages
+        key = make_key(settings.GEMINI_MODEL, "ocr", page_hash)
+        cached = await ai_output_cache.get(key)
+        if cached is not None:
+            cached_pages += 1
+            return cached
+        
+        async with semaphore:
+            try:
+                data = await _run_pdf_task(page_pdf_bytes, file_path, index)
+                text = await llm_client.generate_from_file(data, "application/pdf", OCR_PROMPT)
+            except Exception as e:
+                # Страница остаётся пустой, остальной документ не теряем
+                print(f"⚠️ OCR of page {index + 1} failed: {e}")
+                return ""
+        
+        text = text.strip()
+        await ai_output_cache.put(key, text)
+        return text
+    
+    indexes = list(scans)
+    texts = await asyncio.gather(*[ocr_page(i, scans[i]) for i in indexes])
+    print(f"📷 OCR: {len(indexes)} pages ({cached_pages} from cache)")
+    return dict(zip(indexes, texts))
 
 
 class TextExtractor:
@@ -87,18 +109,27 @@ class TextExtractor:
         loop = asyncio.get_event_loop()
         
         try:
-            # Извлекаем текст в thread pool
-            text = await loop.run_in_executor(_executor, _extract_pdf_sync, file_path)
+            if settings.PDF_PROCESS_POOL:
+                # Страницы параллельно в пуле процессов (GIL не мешает), с лимитом памяти
+                pages = [page async for page in iter_pdf_pages(file_path)]
+            else:
+                pages = await loop.run_in_executor(_executor, extract_pages_sync, file_path)
             
-            # Если текста нет — OCR
-            if not text.strip() or len(text.strip()) < 50:
+            page_texts = [page_text for page_text, _ in pages]
+            
+            # Сканы (картинка без текстового слоя) — в OCR постранично, результат на своё место
+            scans = {i: scan_hash for i, (_, scan_hash) in enumerate(pages) if scan_hash}
+            if scans:
+                for index, ocr_text in (await _ocr_pdf_pages(file_path, scans)).items():
+                    if len(ocr_text.strip()) > len(page_texts[index].strip()):
+                        page_texts[index] = ocr_text
+            
+            text = "\n\n".join(page_text for page_text in page_texts if page_text)
+            
+            # Картинки не нашлись (inline-изображения и т.п.), а текста нет — OCR всего файла
+            if not scans and len(text.strip()) < 50:
                 print("📷 PDF без текста, пробуем OCR...")
-                text = await loop.run_in_executor(
-                    _executor, 
-                    _ocr_with_gemini_sync, 
-                    file_path, 
-                    "application/pdf"
-                )
+                text = await _ocr_with_gemini(file_path, "application/pdf")
             
             return clean_text_for_db(text)
             
@@ -160,15 +191,8 @@ class TextExtractor:
         }
         mime_type = mime_types.get(ext, 'image/jpeg')
         
-        loop = asyncio.get_event_loop()
-        
         try:
-            text = await loop.run_in_executor(
-                _executor, 
-                _ocr_with_gemini_sync, 
-                file_path, 
-                mime_type
-            )
+            text = await _ocr_with_gemini(file_path, mime_type)
             
             if not text or len(text) < 3:
                 raise ValueError("Текст не распознан")
@@ -1,6 +1,7 @@
 # backend/app/services/user_service.py
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from datetime import datetime, date, timedelta
 from typing import Optional, Tuple
 from uuid import UUID
@@ -53,22 +54,37 @@ class UserService:
         username: Optional[str] = None,
         first_name: Optional[str] = None
     ) -> Tuple[User, bool]:
-        user = await self.get_by_telegram_id(telegram_id)
-        if user:
-            if username and user.telegram_username != username:
-                user.telegram_username = username
-                await self.db.commit()
-            return user, False
-        
-        try:
-            user = await self.create_user(telegram_id, username, first_name)
+        """INSERT … ON CONFLICT DO NOTHING; существующий пользователь — SELECT, UPDATE только если username изменился"""
+        values = {
+            "telegram_id": telegram_id,
+            "telegram_username": username,
+            "first_name": first_name,
+            "subscription_tier": SubscriptionTier.FREE,
+            "daily_requests": 0,
+            "current_streak": 0,
+            "longest_streak": 0,
+            "referral_count": 0,
+            "referral_pro_granted": False,
+        }
+        stmt = pg_insert(User).values(**values).on_conflict_do_nothing(
+            index_elements=[User.telegram_id]
+        ).returning(User)
+        
+        result = await self.db.execute(stmt, execution_options={"populate_existing": True})
+        user = result.scalar_one_or_none()
+        if user is not None:
+            await self.db.commit()
+            print(f"✅ Created new user: {telegram_id}")
             return user, True
-        except Exception:
-            await self.db.rollback()
-            user = await self.get_by_telegram_id(telegram_id)
-            if user:
-                return user, False
-            raise
+        
+        user = await self.get_by_telegram_id(telegram_id)
+        # Как и раньше, обновляем только username, если он пришёл — и только когда он другой
+        if username and user.telegram_username != username:
+            user.telegram_username = username
+            await self.db.commit()
+            # updated_at выставляет БД — перечитываем, иначе снапшот auth_cache полезет в expired-атрибут
+            await self.db.refresh(user)
+        return user, False
     
     async def check_rate_limit(self, user: User) -> Tuple[bool, int]:
         """Проверка лимита запросов"""
@@ -1,18 +1,44 @@
 # backend/app/services/vector_service.py
-import google.generativeai as genai
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import re
+import time
 from uuid import UUID
+import numpy as np
 
 from app.core.config import settings
+from app.services.llm_client import llm_client
+from app.services.embedding_cache import embedding_cache, query_embedding_cache, text_hash
+from app.services.chunker import chunk_text
 
-_executor = ThreadPoolExecutor(max_workers=2)
+EMBEDDING_MODEL = "models/text-embedding-004"
+EMBEDDING_TASK_TYPE = "retrieval_document"
+EMBEDDING_DIM = 768
 
-CHUNK_SIZE = 800
-CHUNK_OVERLAP = 100
+# Batch-индексация: до 100 текстов в одном batchEmbedContents
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 4
+EMBED_MAX_RETRIES = 3
+EMBED_RETRY_DELAY = 0.5
+INSERT_BATCH_ROWS = 500
+
+NO_MATERIALS_ANSWER = "У вас пока нет проиндексированных материалов. Загрузите материалы и попробуйте снова."
+
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+# Кандидатов из каждого ранжирования на один результат при слиянии RRF
+HYBRID_CANDIDATES_FACTOR = 4
+
+# Есть ли колонка text_chunks.embedding_vec (pgvector) — проверяется один раз на процесс
+_pgvector_enabled: Optional[bool] = None
+# Есть ли колонка text_chunks.content_tsv (миграция 008_text_chunks_fts)
+_chunk_fts_enabled: Optional[bool] = None
+
+
+def _to_pgvector(embedding: List[float]) -> str:
+    """Текстовый литерал pgvector: '[0.1,0.2,...]'"""
+    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
 
 
 class VectorService:
@@ -20,105 +46,450 @@ class VectorService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
-        if settings.GEMINI_API_KEY:
-            genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.last_index_timings: Dict[str, float] = {}
     
     def _split_into_chunks(self, text_content: str) -> List[Dict[str, Any]]:
-        """Разбивает текст на chunks с перекрытием"""
-        chunks = []
-        start = 0
-        chunk_index = 0
+        """Chunks с char_start/char_end — по заголовкам, абзацам и предложениям (см. chunker)"""
+        return chunk_text(text_content)
+    
+    async def _get_embedding(self, text_content: str) -> List[float]:
+        """Асинхронное получение embedding"""
+        embeddings = await llm_client.embed([text_content], EMBEDDING_MODEL, EMBEDDING_TASK_TYPE)
+        return embeddings[0]
+    
+    async def _get_query_embedding(self, query: str) -> List[float]:
+        """Embedding поискового запроса через LRU/TTL кэш (повторные вопросы — без API)"""
+        embedding = query_embedding_cache.get(query)
+        if embedding is None:
+            embedding = await self._get_embedding(query)
+            query_embedding_cache.put(query, embedding)
+        return embedding
+    
+    async def _embed_batch_with_retry(
+        self,
+        texts: List[str],
+        semaphore: asyncio.Semaphore
+    ) -> Optional[List[List[float]]]:
+        """Batch embeddings с ограничением параллелизма и retry с backoff"""
+        for attempt in range(EMBED_MAX_RETRIES):
+            try:
+                async with semaphore:
+                    return await llm_client.embed(texts, EMBEDDING_MODEL, EMBEDDING_TASK_TYPE)
+            except Exception as e:
+                print(f"⚠️ Embedding batch failed (attempt {attempt + 1}/{EMBED_MAX_RETRIES}): {e}")
+                if attempt < EMBED_MAX_RETRIES - 1:
+                    await asyncio.sleep(EMBED_RETRY_DELAY * (2 ** attempt))
+        
+        return None
+    
+    async def _embed_chunks(self, chunks: List[Dict[str, Any]]) -> List[Optional[List[float]]]:
+        """Embeddings для всех chunks: сначала кэш, остальное пачками по EMBED_BATCH_SIZE"""
+        hashes = [text_hash(c["content"]) for c in chunks]
+        cached = await embedding_cache.get_many(
+            self.db, EMBEDDING_MODEL, EMBEDDING_TASK_TYPE, hashes
+        )
         
-        while start < len(text_content):
-            end = start + CHUNK_SIZE
+        # Уникальные тексты, которых нет в кэше
+        to_embed: Dict[str, str] = {}
+        for chunk, h in zip(chunks, hashes):
+            if h not in cached and h not in to_embed:
+                to_embed[h] = chunk["content"]
+        
+        if to_embed:
+            print(f"🧮 Embedding {len(to_embed)} new texts ({len(chunks) - len(to_embed)} from cache)")
+            semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+            pending = list(to_embed.items())
+            batches = [
+                pending[i:i + EMBED_BATCH_SIZE]
+                for i in range(0, len(pending), EMBED_BATCH_SIZE)
+            ]
             
-            if end < len(text_content):
-                for sep in ['. ', '.\n', '! ', '? ', '\n\n']:
-                    last_sep = text_content[start:end].rfind(sep)
-                    if last_sep > CHUNK_SIZE // 2:
-                        end = start + last_sep + len(sep)
-                        break
+            results = await asyncio.gather(*[
+                self._embed_batch_with_retry([t for _, t in batch], semaphore)
+                for batch in batches
+            ])
             
-            chunk_text = text_content[start:end].strip()
+            fresh: Dict[str, List[float]] = {}
+            for batch, batch_embeddings in zip(batches, results):
+                if batch_embeddings is None:
+                    print(f"⚠️ Skipping batch of {len(batch)} texts")
+                    continue
+                for (h, _), embedding in zip(batch, batch_embeddings):
+                    fresh[h] = embedding
             
-            if chunk_text:
-                chunks.append({
-                    "content": chunk_text,
-                    "chunk_index": chunk_index,
-                })
-                chunk_index += 1
+            try:
+                await embedding_cache.put_many(
+                    self.db, EMBEDDING_MODEL, EMBEDDING_TASK_TYPE, fresh
+                )
+            except Exception as e:
+                print(f"⚠️ Embedding cache write failed: {e}")
+                await self.db.rollback()
             
-            start = end - CHUNK_OVERLAP
-            if start < 0:
-                start = end
-        
-        return chunks
-    
-    def _get_embedding_sync(self, text_content: str) -> List[float]:
-        """Синхронное получение embedding"""
-        result = genai.embed_content(
-            model="models/text-embedding-004",
-            content=text_content,
-            task_type="retrieval_document"
-        )
-        return result['embedding']
+            cached.update(fresh)
+        
+        return [cached.get(h) for h in hashes]
     
-    async def _get_embedding(self, text_content: str) -> List[float]:
-        """Асинхронное получение embedding"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(_executor, self._get_embedding_sync, text_content)
+    async def _insert_chunks(self, material_id: UUID, rows: List[Dict[str, Any]], use_pgvector: bool) -> None:
+        """Вставка chunks multi-row INSERT'ами (по INSERT_BATCH_ROWS строк на запрос)"""
+        for offset in range(0, len(rows), INSERT_BATCH_ROWS):
+            batch = rows[offset:offset + INSERT_BATCH_ROWS]
+            params: Dict[str, Any] = {"material_id": str(material_id)}
+            values = []
+            
+            for i, row in enumerate(batch):
+                params[f"content_{i}"] = row["content"]
+                params[f"chunk_index_{i}"] = row["chunk_index"]
+                params[f"embedding_{i}"] = row["embedding"]  # PostgreSQL ARRAY
+                params[f"char_start_{i}"] = row.get("char_start")
+                params[f"char_end_{i}"] = row.get("char_end")
+                
+                value = (
+                    f"(:material_id, :content_{i}, :chunk_index_{i}, :char_start_{i}, :char_end_{i}, "
+                    f":embedding_{i}"
+                )
+                if use_pgvector:
+                    # ARRAY остаётся источником истины, vector — для ANN-индекса
+                    params[f"embedding_vec_{i}"] = _to_pgvector(row["embedding"])
+                    value += f", CAST(:embedding_vec_{i} AS vector)"
+                values.append(value + ")")
+            
+            columns = "material_id, content, chunk_index, char_start, char_end, embedding"
+            if use_pgvector:
+                columns += ", embedding_vec"
+            
+            await self.db.execute(
+                text(f"INSERT INTO text_chunks ({columns}) VALUES {', '.join(values)}"),
+                params
+            )
     
     async def index_material(self, material_id: UUID, user_id: UUID, content: str) -> int:
         """Индексирует материал — создаёт chunks с embeddings"""
+        self.last_index_timings = {}
         if not content or len(content.strip()) < 50:
             return 0
         
-        # Удаляем старые chunks
+        started = time.perf_counter()
+        
+        chunks = self._split_into_chunks(content)
+        split_done = time.perf_counter()
+        print(f"📊 Indexing {len(chunks)} chunks for material {material_id}")
+        
+        embeddings = await self._embed_chunks(chunks)
+        embed_done = time.perf_counter()
+        
+        rows = [
+            {**chunk, "embedding": embedding}
+            for chunk, embedding in zip(chunks, embeddings)
+            if embedding
+        ]
+        
+        # Удаляем старые chunks и пишем новые в одной транзакции
+        use_pgvector = await self.use_pgvector()
         await self.db.execute(
             text("DELETE FROM text_chunks WHERE material_id = :material_id"),
             {"material_id": str(material_id)}
         )
+        if rows:
+            await self._insert_chunks(material_id, rows, use_pgvector)
+        await self.db.commit()
+        insert_done = time.perf_counter()
         
-        chunks = self._split_into_chunks(content)
-        print(f"📊 Indexing {len(chunks)} chunks for material {material_id}")
+        self.last_index_timings = {
+            "split_ms": round((split_done - started) * 1000, 1),
+            "embed_ms": round((embed_done - split_done) * 1000, 1),
+            "insert_ms": round((insert_done - embed_done) * 1000, 1),
+            "total_ms": round((insert_done - started) * 1000, 1),
+        }
+        print(f"✅ Indexed {len(rows)}/{len(chunks)} chunks ⏱️ {self.last_index_timings}")
         
-        indexed = 0
-        for chunk in chunks:
+        return len(rows)
+    
+    async def use_pgvector(self) -> bool:
+        """Доступен ли pgvector-бэкенд (колонка embedding_vec создана миграцией)"""
+        global _pgvector_enabled
+        
+        if settings.VECTOR_BACKEND == "python":
+            return False
+        
+        if _pgvector_enabled is None:
             try:
-                embedding = await self._get_embedding(chunk["content"])
-                
-                # Сохраняем как ARRAY (без pgvector)
-                await self.db.execute(
+                result = await self.db.execute(
                     text("""
-                        INSERT INTO text_chunks (material_id, content, chunk_index, embedding)
-                        VALUES (:material_id, :content, :chunk_index, :embedding)
-                    """),
-                    {
-                        "material_id": str(material_id),
-                        "content": chunk["content"],
-                        "chunk_index": chunk["chunk_index"],
-                        "embedding": embedding  # PostgreSQL ARRAY
-                    }
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'text_chunks' AND column_name = 'embedding_vec'
+                    """)
                 )
-                indexed += 1
+                _pgvector_enabled = result.scalar() is not None
             except Exception as e:
-                print(f"⚠️ Failed to index chunk {chunk['chunk_index']}: {e}")
+                print(f"⚠️ pgvector check failed: {e}")
+                await self.db.rollback()
+                _pgvector_enabled = False
+            
+            print(f"🧭 Vector backend: {'pgvector' if _pgvector_enabled else 'python'}")
         
-        await self.db.commit()
-        print(f"✅ Indexed {indexed}/{len(chunks)} chunks")
+        return _pgvector_enabled
+    
+    async def _use_lexical(self) -> bool:
+        """Есть ли полнотекстовый индекс по чанкам"""
+        global _chunk_fts_enabled
         
-        return indexed
+        if _chunk_fts_enabled is None:
+            try:
+                result = await self.db.execute(
+                    text("""
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_name = 'text_chunks' AND column_name = 'content_tsv'
+                    """)
+                )
+                _chunk_fts_enabled = result.scalar() is not None
+            except Exception as e:
+                print(f"⚠️ Chunk FTS check failed: {e}")
+                await self.db.rollback()
+                _chunk_fts_enabled = False
+        
+        return _chunk_fts_enabled
     
     async def search(
         self, 
         user_id: UUID, 
         query: str, 
         limit: int = 5,
+        material_id: Optional[UUID] = None,
+        mode: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Поиск chunks в режиме mode (по умолчанию settings.RAG_SEARCH_MODE):
+        - vector: только embeddings
+        - lexical: только полнотекстовый индекс, без вызова embedding API
+        - hybrid: FTS + vector, слияние reciprocal rank fusion; при сильном
+          лексическом совпадении отвечаем сразу, без embedding
+        """
+        mode = mode or settings.RAG_SEARCH_MODE
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        
+        if mode == "vector" or not await self._use_lexical():
+            return await self._search_vector(user_id, query, limit, material_id)
+        
+        candidates = limit if mode == "lexical" else limit * HYBRID_CANDIDATES_FACTOR
+        try:
+            lexical = await self._search_lexical(user_id, query, candidates, material_id)
+        except Exception as e:
+            print(f"⚠️ Lexical search failed: {e}")
+            await self.db.rollback()
+            lexical = []
+        
+        if mode == "lexical":
+            return lexical[:limit]
+        
+        if self._is_strong_lexical(lexical, limit):
+            print(f"⚡ Lexical fast path: {len(lexical)} hits, top={lexical[0]['score']:.2f}")
+            return lexical[:limit]
+        
+        vector = await self._search_vector(user_id, query, candidates, material_id)
+        return self._reciprocal_rank_fusion([vector, lexical], limit)
+    
+    async def _search_vector(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int,
         material_id: Optional[UUID] = None
     ) -> List[Dict[str, Any]]:
-        """Поиск по векторам (cosine similarity без pgvector)"""
-        query_embedding = await self._get_embedding(query)
+        """Поиск по векторам: pgvector в Postgres, иначе cosine similarity в NumPy"""
+        query_embedding = await self._get_query_embedding(query)
+        
+        if await self.use_pgvector():
+            try:
+                return await self._search_pgvector(user_id, query_embedding, limit, material_id)
+            except Exception as e:
+                print(f"⚠️ pgvector search failed, falling back to python: {e}")
+                await self.db.rollback()
+        
+        return await self._search_python(user_id, query_embedding, limit, material_id)
+    
+    @staticmethod
+    def _lexical_query(query: str) -> Tuple[str, str]:
+        """
+        Вопрос → websearch-запросы с OR между словами (ранг растёт с покрытием):
+        все слова для russian-стемминга и только токены с цифрами для точного simple
+        (в simple нет стоп-слов — «что», «это» совпали бы везде)
+        """
+        terms = re.findall(r"\w+", query.lower())
+        terms = list(dict.fromkeys(t for t in terms if (len(t) > 1 or t.isdigit()) and t != "or"))
+        exact = [t for t in terms if any(ch.isdigit() for ch in t)]
+        return " or ".join(terms), " or ".join(exact)
+    
+    async def _search_lexical(
+        self,
+        user_id: UUID,
+        query: str,
+        limit: int,
+        material_id: Optional[UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """Полнотекстовый поиск по text_chunks.content_tsv (GIN)"""
+        words_query, exact_query = self._lexical_query(query)
+        if not words_query:
+            return []
+        
+        if material_id:
+            condition = "tc.material_id = :material_id"
+            params = {"material_id": str(material_id)}
+        else:
+            condition = "m.user_id = :user_id"
+            params = {"user_id": str(user_id)}
+        
+        params["q"] = words_query
+        params["q_exact"] = exact_query
+        params["limit"] = limit
+        
+        tsquery = (
+            "(websearch_to_tsquery('russian', :q) || "
+            "websearch_to_tsquery('simple', :q_exact))"
+        )
+        
+        # Нормализация 32: rank / (rank + 1) — шкала 0..1 для порога fast path
+        result = await self.db.execute(
+            text(f"""
+                SELECT 
+                    tc.id,
+                    tc.material_id,
+                    tc.content,
+                    tc.chunk_index,
+                    tc.char_start,
+                    tc.char_end,
+                    m.title as material_title,
+                    ts_rank_cd(tc.content_tsv, {tsquery}, 32) AS score
+                FROM text_chunks tc
+                JOIN materials m ON m.id = tc.material_id
+                WHERE {condition}
+                  AND tc.content_tsv @@ {tsquery}
+                ORDER BY score DESC
+                LIMIT :limit
+            """),
+            params
+        )
+        
+        return [
+            {
+                "id": str(row.id),
+                "material_id": str(row.material_id),
+                "material_title": row.material_title,
+                "content": row.content,
+                "chunk_index": row.chunk_index,
+                "char_start": row.char_start,
+                "char_end": row.char_end,
+                # ts_rank_cd — не cosine: similarity у лексических совпадений нет
+                "similarity": None,
+                "score": float(row.score),
+                "match_type": "lexical"
+            }
+            for row in result.fetchall()
+        ]
+    
+    @staticmethod
+    def _is_strong_lexical(lexical: List[Dict[str, Any]], limit: int) -> bool:
+        """Достаточно ли лексических совпадений, чтобы не звать embedding API"""
+        if len(lexical) < min(limit, 3):
+            return False
+        return lexical[0]["score"] >= settings.RAG_LEXICAL_STRONG_SCORE
+    
+    @staticmethod
+    def _reciprocal_rank_fusion(
+        rankings: List[List[Dict[str, Any]]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """
+        RRF: score = Σ 1 / (k + rank) по всем ранжированиям.
+        similarity — cosine из vector-ранжирования (None, если chunk нашёлся только лексически),
+        match_type — vector / lexical / hybrid (нашёлся в обоих).
+        """
+        k = settings.RAG_RRF_K
+        scores: Dict[str, float] = {}
+        chunks: Dict[str, Dict[str, Any]] = {}
+        match_types: Dict[str, set] = {}
+        
+        for ranking in rankings:
+            for rank, chunk in enumerate(ranking, start=1):
+                chunk_id = chunk["id"]
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (k + rank)
+                match_types.setdefault(chunk_id, set()).add(chunk["match_type"])
+                if chunks.get(chunk_id, {}).get("similarity") is None:
+                    chunks[chunk_id] = chunk
         
+        ordered = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [
+            {
+                **chunks[chunk_id],
+                "score": scores[chunk_id],
+                "match_type": "hybrid" if len(match_types[chunk_id]) > 1 else next(iter(match_types[chunk_id]))
+            }
+            for chunk_id in ordered
+        ]
+    
+    async def _search_pgvector(
+        self,
+        user_id: UUID,
+        query_embedding: List[float],
+        limit: int,
+        material_id: Optional[UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """ANN-поиск в Postgres: ORDER BY embedding_vec <=> query LIMIT k"""
+        if material_id:
+            condition = "tc.material_id = :material_id"
+            params = {"material_id": str(material_id)}
+        else:
+            condition = "m.user_id = :user_id"
+            params = {"user_id": str(user_id)}
+        
+        params["query"] = _to_pgvector(query_embedding)
+        params["limit"] = limit
+        
+        result = await self.db.execute(
+            text(f"""
+                SELECT 
+                    tc.id,
+                    tc.material_id,
+                    tc.content,
+                    tc.chunk_index,
+                    tc.char_start,
+                    tc.char_end,
+                    m.title as material_title,
+                    1 - (tc.embedding_vec <=> CAST(:query AS vector)) AS similarity
+                FROM text_chunks tc
+                JOIN materials m ON m.id = tc.material_id
+                WHERE {condition}
+                  AND tc.embedding_vec IS NOT NULL
+                ORDER BY tc.embedding_vec <=> CAST(:query AS vector)
+                LIMIT :limit
+            """),
+            params
+        )
+        
+        return [
+            {
+                "id": str(row.id),
+                "material_id": str(row.material_id),
+                "material_title": row.material_title,
+                "content": row.content,
+                "chunk_index": row.chunk_index,
+                "char_start": row.char_start,
+                "char_end": row.char_end,
+                "similarity": float(row.similarity),
+                "score": float(row.similarity),
+                "match_type": "vector"
+            }
+            for row in result.fetchall()
+        ]
+    
+    async def _search_python(
+        self,
+        user_id: UUID,
+        query_embedding: List[float],
+        limit: int,
+        material_id: Optional[UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """Fallback без pgvector: тянем embeddings и ранжируем в NumPy"""
         if material_id:
             # Поиск в конкретном материале
             result = await self.db.execute(
@@ -128,6 +499,8 @@ class VectorService:
                         tc.material_id,
                         tc.content,
                         tc.chunk_index,
+                        tc.char_start,
+                        tc.char_end,
                         tc.embedding,
                         m.title as material_title
                     FROM text_chunks tc
@@ -146,6 +519,8 @@ class VectorService:
                         tc.material_id,
                         tc.content,
                         tc.chunk_index,
+                        tc.char_start,
+                        tc.char_end,
                         tc.embedding,
                         m.title as material_title
                     FROM text_chunks tc
@@ -156,51 +531,68 @@ class VectorService:
                 {"user_id": str(user_id)}
             )
         
-        rows = result.fetchall()
-        
-        # Вычисляем cosine similarity в Python
-        results_with_similarity = []
-        for row in rows:
-            if row.embedding:
-                similarity = self._cosine_similarity(query_embedding, row.embedding)
-                results_with_similarity.append({
-                    "id": str(row.id),
-                    "material_id": str(row.material_id),
-                    "material_title": row.material_title,
-                    "content": row.content,
-                    "chunk_index": row.chunk_index,
-                    "similarity": similarity
-                })
+        rows = [row for row in result.fetchall() if row.embedding]
+        if not rows:
+            return []
         
-        # Сортируем по similarity и берём top N
-        results_with_similarity.sort(key=lambda x: x["similarity"], reverse=True)
+        # Ранжируем одним матрично-векторным произведением
+        top = self._rank_by_similarity(query_embedding, [row.embedding for row in rows], limit)
         
-        return results_with_similarity[:limit]
+        return [
+            {
+                "id": str(rows[i].id),
+                "material_id": str(rows[i].material_id),
+                "material_title": rows[i].material_title,
+                "content": rows[i].content,
+                "chunk_index": rows[i].chunk_index,
+                "char_start": rows[i].char_start,
+                "char_end": rows[i].char_end,
+                "similarity": similarity,
+                "score": similarity,
+                "match_type": "vector"
+            }
+            for i, similarity in top
+        ]
+    
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """L2-нормализация строк (нулевые векторы остаются нулевыми)"""
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Вычисляет cosine similarity между двумя векторами"""
-        if not vec1 or not vec2 or len(vec1) != len(vec2):
-            return 0.0
+    def _rank_by_similarity(
+        self,
+        query_embedding: List[float],
+        embeddings: List[List[float]],
+        limit: int
+    ) -> List[Tuple[int, float]]:
+        """Top-k по cosine similarity: возвращает [(индекс строки, similarity)]"""
+        query = np.asarray(query_embedding, dtype=np.float32)
         
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        norm1 = sum(a * a for a in vec1) ** 0.5
-        norm2 = sum(b * b for b in vec2) ** 0.5
+        # Отбрасываем векторы другой размерности (битые/старые модели)
+        valid = [i for i, emb in enumerate(embeddings) if len(emb) == query.shape[0]]
+        if not valid or limit <= 0:
+            return []
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        # Одна непрерывная float32 матрица, заранее нормализованная
+        matrix = np.asarray([embeddings[i] for i in valid], dtype=np.float32)
+        matrix = self._normalize_rows(matrix)
+        query = self._normalize_rows(query)
         
-        return dot_product / (norm1 * norm2)
-    
-    async def ask_library(self, user_id: UUID, question: str) -> Dict[str, Any]:
-        """Спроси свою библиотеку — RAG"""
-        chunks = await self.search(user_id, question, limit=5)
+        scores = matrix @ query
         
-        if not chunks:
-            return {
-                "answer": "У вас пока нет проиндексированных материалов. Загрузите материалы и попробуйте снова.",
-                "sources": []
-            }
+        k = min(limit, scores.shape[0])
+        if k < scores.shape[0]:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(scores.shape[0])
+        top = top[np.argsort(-scores[top], kind="stable")]
         
+        return [(valid[i], float(scores[i])) for i in top]
+    
+    def build_rag_prompt(self, question: str, chunks: List[Dict[str, Any]]) -> str:
+        """Промпт RAG из найденных chunks"""
         context_parts = []
         for chunk in chunks:
             context_parts.append(
@@ -209,7 +601,7 @@ class VectorService:
         
         context = "\n\n---\n\n".join(context_parts)
         
-        prompt = f"""Ты — умный ассистент для учёбы. Отвечай на вопрос, используя ТОЛЬКО информацию из контекста.
+        return f"""Ты — умный ассистент для учёбы. Отвечай на вопрос, используя ТОЛЬКО информацию из контекста.
 
 Контекст из материалов:
 {context}
@@ -223,6 +615,38 @@ class VectorService:
 4. Будь конкретен
 
 Ответ:"""
+    
+    @staticmethod
+    def format_sources(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "material_id": chunk["material_id"],
+                "material_title": chunk["material_title"],
+                "char_start": chunk.get("char_start"),
+                "char_end": chunk.get("char_end"),
+                "similarity": chunk["similarity"],
+                "score": chunk.get("score"),
+                "match_type": chunk.get("match_type")
+            }
+            for chunk in chunks
+        ]
+    
+    async def ask_library(
+        self,
+        user_id: UUID,
+        question: str,
+        mode: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Спроси свою библиотеку — RAG"""
+        chunks = await self.search(user_id, question, limit=5, mode=mode)
+        
+        if not chunks:
+            return {
+                "answer": NO_MATERIALS_ANSWER,
+                "sources": []
+            }
+        
+        prompt = self.build_rag_prompt(question, chunks)
 
         try:
             from app.services.ai_service import gemini_service
@@ -230,18 +654,11 @@ class VectorService:
             
             return {
                 "answer": answer,
-                "sources": [
-                    {
-                        "material_id": chunk["material_id"],
-                        "material_title": chunk["material_title"],
-                        "similarity": chunk["similarity"]
-                    }
-                    for chunk in chunks
-                ]
+                "sources": self.format_sources(chunks)
             }
         except Exception as e:
             print(f"❌ RAG error: {e}")
             return {
                 "answer": f"Ошибка: {str(e)}",
                 "sources": []
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,64 @@
+# backend/app/worker.py
+"""
+Воркер очереди обработки материалов.
+Запуск: python -m app.worker [--workers N] [--concurrency M]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import signal
+
+from app.core.config import settings
+
+
+async def _run(concurrency: int, sweep: bool) -> None:
+    from app.services.job_queue import worker_loop, sweeper_loop, make_worker_id
+    
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    tasks = [worker_loop(make_worker_id(i), stop_event) for i in range(concurrency)]
+    if sweep:
+        tasks.append(sweeper_loop(stop_event))
+    
+    await asyncio.gather(*tasks)
+
+
+def _process_main(concurrency: int, sweep: bool) -> None:
+    asyncio.run(_run(concurrency, sweep))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lecto processing worker")
+    parser.add_argument("--workers", type=int, default=settings.JOB_WORKERS)
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    
+    print(f"👷 Starting {args.workers} worker process(es) × {args.concurrency} jobs")
+    
+    if args.workers <= 1:
+        _process_main(args.concurrency, True)
+        return
+    
+    # Sweeper только в первом процессе
+    processes = [
+        multiprocessing.Process(target=_process_main, args=(args.concurrency, i == 0))
+        for i in range(args.workers)
+    ]
+    for p in processes:
+        p.start()
+    
+    def _terminate(signum, frame):
+        for p in processes:
+            p.terminate()
+    
+    signal.signal(signal.SIGTERM, _terminate)
+    
+    for p in processes:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
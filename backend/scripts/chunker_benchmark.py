@@ -0,0 +1,121 @@
+"""
+Бенчмарк chunker'а: пропускная способность на многомегабайтных текстах.
+Проверяет линейность (время / МБ не растёт с размером) и инварианты:
+content == text[char_start:char_end], весь непробельный текст покрыт chunks,
+нумерованный список не дробится на chunk-на-пункт.
+
+Запуск: python -m scripts.chunker_benchmark [--sizes 1 4 16] [--file book.txt]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.chunker import chunk_text, estimate_tokens, CHUNK_MAX_TOKENS
+
+WORDS = (
+    "энтропия теплота двигатель цикл Карно работа система давление объём температура "
+    "energy heat engine reversible process equilibrium 1,5 2024 кДж/моль"
+).split()
+
+
+def make_text(size_mb: float, seed: int = 42) -> str:
+    """Учебник: главы, подглавы, абзацы разной длины, изредка строки без пунктуации"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    parts = []
+    length = 0
+    chapter = 0
+
+    def add(piece: str) -> None:
+        nonlocal length
+        parts.append(piece)
+        length += len(piece)
+
+    while length < target:
+        chapter += 1
+        add(f"Глава {chapter}. Термодинамика, часть {chapter}\n\n")
+        for section in range(1, rng.randint(2, 6)):
+            add(f"{chapter}.{section} Законы и следствия\n\n")
+            for _ in range(rng.randint(2, 8)):
+                sentences = []
+                for _ in range(rng.randint(1, 10)):
+                    words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 30)))
+                    sentences.append(words.capitalize() + rng.choice([". ", "! ", "? ", ".\n"]))
+                if rng.random() < 0.02:
+                    sentences.append(" ".join(rng.choice(WORDS) for _ in range(400)))
+                add("".join(sentences) + "\n\n")
+
+    return "".join(parts)[:target]
+
+
+def check(text: str, chunks: list) -> None:
+    covered = bytearray(len(text))
+    for chunk in chunks:
+        start, end = chunk["char_start"], chunk["char_end"]
+        assert chunk["content"] == text[start:end], f"offset mismatch in chunk {chunk['chunk_index']}"
+        covered[start:end] = b"\x01" * (end - start)
+    uncovered = sum(1 for i, ch in enumerate(text) if not covered[i] and not ch.isspace())
+    assert uncovered == 0, f"{uncovered} non-space chars not covered"
+
+
+def check_numbered_list() -> None:
+    """Пункты «1. …» после абзаца — список, а не заголовки: chunk на пункт не режем"""
+    intro = "Основные понятия термодинамики перечислены ниже. Каждое из них встретится в курсе.\n"
+    items = [f"{i}. Пункт {i}: определение и пример\n" for i in range(1, 9)]
+
+    text = intro + "".join(items)
+    chunks = chunk_text(text)
+    check(text, chunks)
+    assert len(chunks) == 1, f"list after a line: {len(chunks)} chunks"
+
+    # Пункты через пустую строку похожи на заголовки — короткие разделы склеиваются
+    text = intro + "\n" + "\n".join(items)
+    chunks = chunk_text(text)
+    check(text, chunks)
+    assert len(chunks) <= len(items) // 2, f"list after a blank line: {len(chunks)} chunks"
+    print("numbered list  ✅")
+
+
+def bench(label: str, text: str, repeat: int, verify: bool) -> None:
+    size_mb = len(text) / (1024 * 1024)
+    best = float("inf")
+    chunks = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = chunk_text(text)
+        best = min(best, time.perf_counter() - started)
+
+    if verify:
+        check(text, chunks)
+
+    tokens = [estimate_tokens(len(c["content"])) for c in chunks]
+    overlaps = sum(1 for a, b in zip(chunks, chunks[1:]) if b["char_start"] < a["char_end"])
+    print(
+        f"{label:<14} {size_mb:7.2f}MB  {best * 1000:8.1f}ms  {size_mb / best:6.1f} MB/s  "
+        f"{len(chunks):7d} chunks  avg {sum(tokens) / max(len(tokens), 1):5.1f} tok "
+        f"(max {max(tokens, default=0)}/{CHUNK_MAX_TOKENS})  overlap {overlaps / max(len(chunks) - 1, 1):.0%}"
+        + ("  ✅" if verify else "")
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--file", help="реальный текст вместо сгенерированного")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-verify", action="store_true", help="не проверять offsets/покрытие (медленно на 16MB+)")
+    args = parser.parse_args()
+
+    check_numbered_list()
+    if args.file:
+        with open(args.file, encoding="utf-8") as f:
+            bench(os.path.basename(args.file), f.read(), args.repeat, not args.no_verify)
+    else:
+        for size in args.sizes:
+            bench(f"synthetic {size:g}MB", make_text(size), args.repeat, not args.no_verify)
@@ -0,0 +1,197 @@
+"""
+Проверка планов горячих запросов: EXPLAIN на засеянной локальной БД.
+Падает (exit 1), если какой-то запрос скатился в Seq Scan по большой таблице.
+
+Данные сеются внутри транзакции и откатываются в конце — схема должна быть
+накатана (alembic upgrade head). Не запускайте против production.
+
+Запуск: DATABASE_URL=postgresql://... python -m scripts.explain_hot_queries --materials 50000
+В CI та же проверка — tests/test_hot_query_plans.py (нужен EXPLAIN_DATABASE_URL).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.models.base import engine
+
+
+# (name, SQL, таблицы, по которым Seq Scan недопустим)
+HOT_QUERIES = [
+    ("get_user_materials", """
+        SELECT * FROM materials
+        WHERE user_id = :user_id AND folder_id IS NULL
+        ORDER BY created_at DESC LIMIT 50
+    """, {"materials"}),
+    ("get_group_materials", """
+        SELECT * FROM materials
+        WHERE folder_id = :group_id
+        ORDER BY created_at DESC
+    """, {"materials"}),
+    ("material_chunks", """
+        SELECT id, content FROM text_chunks
+        WHERE material_id = :material_id
+        ORDER BY chunk_index
+    """, {"text_chunks"}),
+    ("reindex_delete_chunks", """
+        DELETE FROM text_chunks WHERE material_id = :material_id
+    """, {"text_chunks"}),
+    ("rag_user_chunks", """
+        SELECT tc.id, tc.content, m.title
+        FROM text_chunks tc
+        JOIN materials m ON m.id = tc.material_id
+        WHERE m.user_id = :user_id
+    """, {"text_chunks", "materials"}),
+    ("user_group_ids", """
+        SELECT group_id, role FROM group_members WHERE user_id = :user_id
+    """, {"group_members"}),
+    ("is_member", """
+        SELECT EXISTS (
+            SELECT 1 FROM group_members
+            WHERE group_id = :group_id AND user_id = :user_id
+        )
+    """, {"group_members"}),
+    ("group_members_list", """
+        SELECT gm.role, u.first_name
+        FROM group_members gm JOIN users u ON u.id = gm.user_id
+        WHERE gm.group_id = :group_id
+    """, {"group_members", "users"}),
+    ("group_leaderboard", """
+        SELECT qr.user_id, count(qr.id), avg(qr.percentage)
+        FROM quiz_results qr
+        WHERE qr.group_id = :group_id
+        GROUP BY qr.user_id
+    """, {"quiz_results"}),
+    ("material_outputs", """
+        SELECT * FROM ai_outputs
+        WHERE material_id = :material_id AND format = 'quiz'
+    """, {"ai_outputs"}),
+    ("group_materials_count", """
+        SELECT count(*) FROM materials WHERE folder_id = :group_id
+    """, {"materials"}),
+]
+
+
+SEED_SQL = [
+    """CREATE TEMP TABLE seed_users ON COMMIT DROP AS
+       SELECT gen_random_uuid() AS id, g AS n FROM generate_series(1, :users) g""",
+    """INSERT INTO users (id, telegram_id, subscription_tier, first_name)
+       SELECT id, 8000000000 + n, 'free', 'seed' FROM seed_users""",
+    """CREATE TEMP TABLE seed_groups ON COMMIT DROP AS
+       SELECT gen_random_uuid() AS id, g AS n FROM generate_series(1, :groups) g""",
+    """INSERT INTO folders (id, user_id, name, is_group, max_members)
+       SELECT sg.id, su.id, 'seed group ' || sg.n, true, 50
+       FROM seed_groups sg JOIN seed_users su ON su.n = sg.n""",
+    """INSERT INTO group_members (id, group_id, user_id, role)
+       SELECT gen_random_uuid(), sg.id, su.id, CASE WHEN k = 0 THEN 'owner' ELSE 'member' END
+       FROM seed_groups sg
+       CROSS JOIN generate_series(0, 9) k
+       JOIN seed_users su ON su.n = (sg.n + k * 97) % :users + 1""",
+    """CREATE TEMP TABLE seed_materials ON COMMIT DROP AS
+       SELECT gen_random_uuid() AS id, g AS n FROM generate_series(1, :materials) g""",
+    """INSERT INTO materials (id, user_id, folder_id, title, material_type, status, created_at)
+       SELECT sm.id, su.id,
+              CASE WHEN sm.n % 10 = 0 THEN sg.id END,
+              'seed material ' || sm.n, 'txt', 'completed',
+              now() - sm.n * interval '1 minute'
+       FROM seed_materials sm
+       JOIN seed_users su ON su.n = sm.n % :users + 1
+       JOIN seed_groups sg ON sg.n = sm.n % :groups + 1""",
+    """INSERT INTO text_chunks (id, material_id, content, chunk_index)
+       SELECT gen_random_uuid(), sm.id, 'seed chunk ' || k, k
+       FROM seed_materials sm CROSS JOIN generate_series(0, 4) k""",
+    """INSERT INTO ai_outputs (id, material_id, format, content)
+       SELECT gen_random_uuid(), sm.id, f, '{}'
+       FROM seed_materials sm CROSS JOIN unnest(ARRAY['quiz', 'tldr']) f""",
+    """INSERT INTO quiz_results (id, user_id, material_id, group_id, score, max_score, percentage)
+       SELECT gen_random_uuid(), su.id, sm.id, sg.id, 5, 10, 50
+       FROM seed_materials sm
+       JOIN seed_users su ON su.n = sm.n % :users + 1
+       JOIN seed_groups sg ON sg.n = sm.n % :groups + 1""",
+    "ANALYZE users, folders, group_members, materials, text_chunks, ai_outputs, quiz_results",
+]
+
+
+def find_seq_scans(plan: dict, tables: set) -> list:
+    """Все узлы Seq Scan по указанным таблицам"""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in tables:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child, tables))
+    return found
+
+
+async def explain_hot_queries(conn, materials: int, users: int, groups: int) -> list:
+    """
+    Засеять данные в открытой транзакции conn и снять планы HOT_QUERIES.
+    [(name, sql, params, корень плана, Seq Scan по запрещённым таблицам)]; откатывает вызывающий.
+    """
+    seed_params = {"materials": materials, "users": users, "groups": groups}
+    for statement in SEED_SQL:
+        used = {k: v for k, v in seed_params.items() if f":{k}" in statement}
+        await conn.execute(text(statement), used)
+
+    sample = (await conn.execute(text("""
+        SELECT sm.id AS material_id, m.user_id, sg.id AS group_id
+        FROM seed_materials sm
+        JOIN materials m ON m.id = sm.id
+        JOIN seed_groups sg ON sg.n = 1
+        WHERE sm.n = 10
+    """))).one()
+    params = dict(sample._mapping)
+
+    plans = []
+    for name, sql, tables in HOT_QUERIES:
+        used = {k: v for k, v in params.items() if f":{k}" in sql}
+        result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), used)
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+        plans.append((name, sql, used, root, find_seq_scans(root, tables)))
+    return plans
+
+
+async def run(materials: int, users: int, groups: int, show_plans: bool = False) -> int:
+    failures = 0
+
+    async with engine.connect() as conn:
+        trans = await conn.begin()
+        try:
+            print(f"🌱 Seeding {materials} materials / {users} users / {groups} groups...")
+            plans = await explain_hot_queries(conn, materials, users, groups)
+
+            for name, sql, used, root, seq_scans in plans:
+                if seq_scans:
+                    failures += 1
+                    print(f"❌ {name}: Seq Scan on {', '.join(sorted(set(seq_scans)))} (cost {root['Total Cost']})")
+                else:
+                    print(f"✅ {name}: {root['Node Type']} (cost {root['Total Cost']})")
+
+                if show_plans:
+                    lines = (await conn.execute(text(f"EXPLAIN {sql}"), used)).scalars().all()
+                    print("\n".join(f"    {line}" for line in lines))
+        finally:
+            await trans.rollback()
+
+    await engine.dispose()
+
+    print(f"\n{len(HOT_QUERIES) - failures}/{len(HOT_QUERIES)} queries use indexes")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--materials", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=20000)  # на 2000 users планировщик законно выбирает Seq Scan
+    parser.add_argument("--groups", type=int, default=300)
+    parser.add_argument("--plans", action="store_true", help="печатать полные планы")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.materials, args.users, args.groups, args.plans)))
@@ -0,0 +1,46 @@
+"""
+Нагрузочный тест LLM-слоя (по умолчанию на фейковом бэкенде, без сети).
+Запуск: LLM_BACKEND=fake python -m scripts.llm_load_test --requests 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.llm_client import llm_client
+
+
+async def run(total: int, embed_batch: int) -> None:
+    latencies = []
+    
+    async def one(i: int) -> None:
+        started = time.perf_counter()
+        if embed_batch and i % 2:
+            await llm_client.embed([f"chunk {i}-{j}" for j in range(embed_batch)], "text-embedding-004", "retrieval_document")
+        else:
+            await llm_client.generate(f"Запрос #{i}")
+        latencies.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(total)])
+    elapsed = time.perf_counter() - started
+    await llm_client.aclose()
+    
+    latencies.sort()
+    print(f"backend={llm_client.backend} concurrency={llm_client.max_concurrency}")
+    print(f"{total} requests in {elapsed:.2f}s → {total / elapsed:.1f} req/s")
+    print(f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms p95={latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms")
+    print(f"stats={llm_client.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--embed-batch", type=int, default=0, help="каждый второй запрос — batch embeddings такого размера")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.embed_batch))
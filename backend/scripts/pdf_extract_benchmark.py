@@ -0,0 +1,127 @@
+"""
+Бенчмарк извлечения PDF: последовательно в потоке vs пул процессов.
+Без аргументов генерирует small / medium / huge PDF с текстом во временной папке.
+
+Запуск: python -m scripts.pdf_extract_benchmark [--pages 5 80 400] [--pdf book.pdf ...]
+"""
+
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+
+# Добавляем корень проекта в путь
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.pdf_extractor import extract_pdf_parallel, pdf_worker_count, shutdown_pdf_pool
+
+LINES_PER_PAGE = 60
+SIZE_NAMES = ("small", "medium", "huge")
+
+
+def make_pdf(path: str, pages: int) -> None:
+    """PDF с pages страницами текста (Helvetica, LINES_PER_PAGE строк на страницу)"""
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+
+    for page_no in range(pages):
+        page = writer.add_blank_page(612, 792)
+        lines = [
+            f"({page_no + 1}.{line}: lecture notes on thermodynamics entropy and heat engines) '"
+            for line in range(LINES_PER_PAGE)
+        ]
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 9 Tf 36 770 Td 12 TL {' '.join(lines)} ET".encode("latin-1"))
+        page[NameObject("/Contents")] = writer._add_object(stream)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+        })
+
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def extract_pdf_serial(file_path: str) -> str:
+    """Базовая линия: все страницы подряд в одном потоке (как было до пула процессов)"""
+    import pypdf
+
+    text_parts = []
+    with open(file_path, 'rb') as f:
+        reader = pypdf.PdfReader(f)
+        for page in reader.pages:
+            page_text = page.extract_text()
+            if page_text:
+                text_parts.append(page_text)
+
+    return "\n\n".join(text_parts)
+
+
+def peak_rss_mb(who: int) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+async def bench(path: str, label: str) -> None:
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+
+    started = time.perf_counter()
+    serial = await asyncio.get_running_loop().run_in_executor(None, extract_pdf_serial, path)
+    serial_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    parallel = await extract_pdf_parallel(path)
+    parallel_s = time.perf_counter() - started
+
+    same = "✅" if serial == parallel else "❌ text differs"
+    print(
+        f"{label:<28} {size_mb:6.1f}MB  serial {serial_s:7.2f}s  pool {parallel_s:7.2f}s  "
+        f"×{serial_s / parallel_s:4.1f}  {same}"
+    )
+
+
+async def run(pdfs: list) -> None:
+    workers = pdf_worker_count()
+    print(f"workers={workers} pages_per_task={settings.PDF_PAGES_PER_TASK} "
+          f"page_timeout={settings.PDF_PAGE_TIMEOUT}s memory={settings.PDF_WORKER_MEMORY_MB}MB\n")
+
+    # Прогрев: запуск spawn-воркеров не должен попасть в первый замер
+    await extract_pdf_parallel(pdfs[0][0])
+
+    for path, label in pdfs:
+        await bench(path, label)
+
+    shutdown_pdf_pool()
+    print(f"\npeak RSS: parent {peak_rss_mb(resource.RUSAGE_SELF):.0f}MB, "
+          f"largest worker {peak_rss_mb(resource.RUSAGE_CHILDREN):.0f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 80, 400])
+    parser.add_argument("--pdf", nargs="*", default=[], help="реальные PDF вместо сгенерированных")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.pdf:
+            pdfs = [(path, os.path.basename(path)) for path in args.pdf]
+        else:
+            pdfs = []
+            for i, pages in enumerate(args.pages):
+                name = SIZE_NAMES[i] if i < len(SIZE_NAMES) else f"pdf{i}"
+                path = os.path.join(tmp, f"{name}.pdf")
+                print(f"📄 Generating {name}: {pages} pages...")
+                make_pdf(path, pages)
+                pdfs.append((path, f"{name} ({pages} pages)"))
+            print()
+
+        asyncio.run(run(pdfs))
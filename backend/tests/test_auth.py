@@ -0,0 +1,47 @@
+import hashlib
+import hmac
+import json
+import time
+from urllib.parse import urlencode
+
+from app.core.config import settings
+from app.services.auth_cache import verify_init_data
+
+BOT_TOKEN = "123456:TEST"
+USER = {"id": 42, "first_name": "Иван"}
+
+
+def sign(fields: dict, bot_token: str = BOT_TOKEN) -> str:
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(fields.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    signed = dict(fields, hash=hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest())
+    return urlencode(signed)
+
+
+def fields(auth_date: int) -> dict:
+    return {"auth_date": str(auth_date), "query_id": "AAE", "user": json.dumps(USER, ensure_ascii=False)}
+
+
+def test_valid_init_data():
+    now = int(time.time())
+    user = verify_init_data(sign(fields(now)), BOT_TOKEN)
+    assert user["id"] == 42
+    assert user["auth_date"] == now
+
+
+def test_bad_hash():
+    init_data = sign(fields(int(time.time())), bot_token="654321:OTHER")
+    assert verify_init_data(init_data, BOT_TOKEN) is None
+    assert verify_init_data(urlencode(fields(int(time.time()))), BOT_TOKEN) is None
+
+
+def test_tampered_user():
+    init_data = sign(fields(int(time.time()))).replace("42", "43")
+    assert verify_init_data(init_data, BOT_TOKEN) is None
+
+
+def test_expired(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_INIT_DATA_MAX_AGE", 3600)
+    assert verify_init_data(sign(fields(int(time.time()) - 7200)), BOT_TOKEN) is None
+    monkeypatch.setattr(settings, "AUTH_INIT_DATA_MAX_AGE", 0)
+    assert verify_init_data(sign(fields(int(time.time()) - 7200)), BOT_TOKEN)["id"] == 42
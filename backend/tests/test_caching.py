@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from starlette.requests import Request
+
+from app.api.caching import is_not_modified, make_etag, not_modified_response, parse_formats
+
+
+def request_with(if_none_match=None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_make_etag_is_stable_and_quoted():
+    updated_at = datetime(2025, 5, 1, 10, 0)
+    etag = make_etag("m1", updated_at, "quiz")
+    assert etag == make_etag("m1", updated_at, "quiz")
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag != make_etag("m1", datetime(2025, 5, 1, 10, 1), "quiz")
+    assert etag != make_etag("m1", updated_at, "flashcards")
+
+
+def test_is_not_modified():
+    etag = make_etag("m1", 1)
+    assert not is_not_modified(request_with(), etag)
+    assert is_not_modified(request_with(etag), etag)
+    assert is_not_modified(request_with(f'"other", W/{etag}'), etag)
+    assert is_not_modified(request_with("*"), etag)
+    assert not is_not_modified(request_with(make_etag("m1", 2)), etag)
+
+
+def test_not_modified_response():
+    etag = make_etag("m1")
+    response = not_modified_response(etag)
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+
+
+def test_parse_formats():
+    assert parse_formats(None) is None
+    assert parse_formats(" , ") is None
+    assert parse_formats("quiz, flashcards,quiz") == ["flashcards", "quiz"]
@@ -0,0 +1,60 @@
+from app.services.chunker import chunk_text, heading_of, CHUNK_MAX_TOKENS, estimate_tokens
+
+INTRO = "Основные понятия термодинамики перечислены ниже. Каждое из них встретится в курсе.\n"
+ITEMS = [f"{i}. Пункт {i}: определение и пример\n" for i in range(1, 9)]
+
+
+def assert_offsets(text, chunks):
+    for i, chunk in enumerate(chunks):
+        assert chunk["chunk_index"] == i
+        assert chunk["content"] == text[chunk["char_start"]:chunk["char_end"]]
+
+
+def test_empty_text():
+    assert chunk_text("") == []
+    assert chunk_text("  \n\n ") == []
+
+
+def test_offsets_and_budget():
+    text = "\n\n".join(
+        f"Глава {n}\n\n" + " ".join(f"Предложение номер {i} о теплоте и работе." for i in range(60))
+        for n in range(1, 4)
+    )
+    chunks = chunk_text(text)
+    assert_offsets(text, chunks)
+    assert all(estimate_tokens(len(c["content"])) <= CHUNK_MAX_TOKENS for c in chunks)
+
+
+def test_heading_starts_new_chunk():
+    body = " ".join(f"Закон {i} термодинамики формулируется так." for i in range(20))
+    text = f"1.1 Первый раздел\n\n{body}\n\n1.2 Второй раздел\n\n{body}"
+    chunks = chunk_text(text)
+    assert_offsets(text, chunks)
+    assert any(c["content"].startswith("1.2 Второй раздел") for c in chunks)
+
+
+def test_numbered_list_after_line_is_one_chunk():
+    text = INTRO + "".join(ITEMS)
+    chunks = chunk_text(text)
+    assert_offsets(text, chunks)
+    assert len(chunks) == 1
+
+
+def test_numbered_list_after_blank_lines_is_merged():
+    text = INTRO + "\n" + "\n".join(ITEMS)
+    chunks = chunk_text(text)
+    assert_offsets(text, chunks)
+    assert len(chunks) <= len(ITEMS) // 2
+
+
+def test_long_line_without_punctuation_is_split():
+    text = " ".join(["слово"] * 2000)
+    chunks = chunk_text(text)
+    assert_offsets(text, chunks)
+    assert len(chunks) > 1
+
+
+def test_heading_of():
+    assert heading_of("## Энтропия\nтекст") == "Энтропия"
+    assert heading_of("Глава 3. Циклы\n") == "Глава 3. Циклы"
+    assert heading_of("обычный текст") is None
@@ -0,0 +1,37 @@
+"""
+Планы горячих запросов на засеянной Postgres (см. scripts/explain_hot_queries.py).
+Опционально: без EXPLAIN_DATABASE_URL пропускается. Схема должна быть накатана,
+данные сеются в транзакции и откатываются.
+
+EXPLAIN_DATABASE_URL=postgresql+asyncpg://postgres@localhost:5432/lecto_test python -m pytest tests/test_hot_query_plans.py
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from scripts.explain_hot_queries import explain_hot_queries
+
+DSN = os.environ.get("EXPLAIN_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not DSN, reason="EXPLAIN_DATABASE_URL не задан")
+
+
+def test_hot_queries_use_indexes():
+    async def collect():
+        engine = create_async_engine(DSN, poolclass=NullPool)
+        try:
+            async with engine.connect() as conn:
+                trans = await conn.begin()
+                try:
+                    return await explain_hot_queries(conn, materials=50000, users=20000, groups=300)
+                finally:
+                    await trans.rollback()
+        finally:
+            await engine.dispose()
+
+    plans = asyncio.run(collect())
+    regressed = {name: sorted(set(seq_scans)) for name, _, _, _, seq_scans in plans if seq_scans}
+    assert not regressed, f"Seq Scan в горячих запросах: {regressed}"
@@ -0,0 +1,69 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import Column, DateTime, MetaData, Table
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+
+from app.api.pagination import (
+    NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_before, set_next_cursor
+)
+
+rows_table = Table(
+    "rows", MetaData(),
+    Column("id", PGUUID(as_uuid=True)),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+
+def compile_pg(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_roundtrip():
+    created_at = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    row_id = uuid4()
+    assert decode_cursor(encode_cursor(created_at, row_id)) == (created_at, row_id)
+
+
+def test_cursor_with_null_time():
+    row_id = uuid4()
+    assert decode_cursor(encode_cursor(None, row_id)) == (None, row_id)
+
+
+def test_empty_cursor():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("не-курсор")
+    assert exc.value.status_code == 400
+
+
+def test_keyset_before_compares_tuples():
+    sql = compile_pg(keyset_before(rows_table.c.created_at, rows_table.c.id, (datetime.now(timezone.utc), uuid4())))
+    assert "(rows.created_at, rows.id) < (" in sql
+
+
+def test_keyset_before_null_cursor_keeps_dated_rows():
+    sql = compile_pg(keyset_before(rows_table.c.created_at, rows_table.c.id, (None, uuid4())))
+    assert "rows.created_at IS NULL AND rows.id <" in sql
+    assert "rows.created_at IS NOT NULL" in sql
+
+
+def test_set_next_cursor():
+    rows = [SimpleNamespace(id=uuid4(), created_at=datetime(2025, 1, d, tzinfo=timezone.utc)) for d in range(3, 0, -1)]
+
+    response = Response()
+    assert set_next_cursor(response, rows, limit=3) == rows
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+    response = Response()
+    page = set_next_cursor(response, rows, limit=2)
+    assert page == rows[:2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == (rows[1].created_at, rows[1].id)
@@ -0,0 +1,29 @@
+from app.core.config import settings
+from app.services.pdf_extractor import split_page_ranges, pdf_worker_count, PDF_AUTO_WORKERS_MAX
+
+
+def test_split_page_ranges_empty():
+    assert split_page_ranges(0, 4, 16) == []
+
+
+def test_split_page_ranges_covers_all_pages_in_order():
+    ranges = split_page_ranges(103, 4, 16)
+    assert ranges[0][0] == 0 and ranges[-1][1] == 103
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    assert all(end - start <= 16 for start, end in ranges)
+
+
+def test_split_page_ranges_one_range_per_worker_for_small_pdf():
+    assert split_page_ranges(8, 4, 16) == [(0, 2), (2, 4), (4, 6), (6, 8)]
+    assert split_page_ranges(3, 8, 16) == [(0, 1), (1, 2), (2, 3)]
+
+
+def test_split_page_ranges_zero_workers():
+    assert split_page_ranges(5, 0, 16) == [(0, 5)]
+
+
+def test_pdf_worker_count(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_WORKERS", 3)
+    assert pdf_worker_count() == 3
+    monkeypatch.setattr(settings, "PDF_WORKERS", 0)
+    assert 1 <= pdf_worker_count() <= PDF_AUTO_WORKERS_MAX
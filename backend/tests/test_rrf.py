@@ -0,0 +1,36 @@
+import pytest
+
+from app.core.config import settings
+from app.services.vector_service import VectorService
+
+rrf = VectorService._reciprocal_rank_fusion
+
+
+def chunk(chunk_id, match_type, similarity=None):
+    return {"id": chunk_id, "content": chunk_id, "match_type": match_type, "similarity": similarity}
+
+
+def test_chunk_in_both_rankings_wins():
+    vector = [chunk("a", "vector", 0.9), chunk("b", "vector", 0.8)]
+    lexical = [chunk("c", "lexical"), chunk("b", "lexical")]
+    fused = rrf([vector, lexical], limit=10)
+
+    assert [c["id"] for c in fused] == ["b", "a", "c"]
+    assert [c["match_type"] for c in fused] == ["hybrid", "vector", "lexical"]
+
+
+def test_scores_and_similarity():
+    k = settings.RAG_RRF_K
+    fused = rrf([[chunk("a", "vector", 0.7)], [chunk("a", "lexical")]], limit=10)
+
+    assert fused[0]["score"] == pytest.approx(2 / (k + 1))
+    # similarity берётся из vector-ранжирования, даже если lexical пришёл позже
+    assert fused[0]["similarity"] == 0.7
+    fused = rrf([[chunk("a", "lexical")], [chunk("a", "vector", 0.7)]], limit=10)
+    assert fused[0]["similarity"] == 0.7
+
+
+def test_limit_and_empty():
+    ranking = [chunk(str(i), "vector", 1 - i / 10) for i in range(5)]
+    assert [c["id"] for c in rrf([ranking, []], limit=2)] == ["0", "1"]
+    assert rrf([[], []], limit=5) == []
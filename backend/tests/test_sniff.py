@@ -0,0 +1,56 @@
+import zipfile
+
+from app.models import MaterialType
+from app.services.material_service import sniff_material_type
+
+
+def make_zip(path, entries: dict) -> str:
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def sniff_file(path: str):
+    with open(path, "rb") as f:
+        return sniff_material_type(f.read(64), path)
+
+
+def test_docx(tmp_path):
+    path = make_zip(tmp_path / "a.docx", {
+        "[Content_Types].xml": "<Types/>",
+        "word/document.xml": "<w:document/>",
+    })
+    assert sniff_file(path) == MaterialType.DOCX
+
+
+def test_docx_by_content_types(tmp_path):
+    path = make_zip(tmp_path / "a.docx", {
+        "[Content_Types].xml": "application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml",
+    })
+    assert sniff_file(path) == MaterialType.DOCX
+
+
+def test_other_zips_are_not_docx(tmp_path):
+    xlsx = make_zip(tmp_path / "a.xlsx", {"[Content_Types].xml": "spreadsheetml", "xl/workbook.xml": ""})
+    pptx = make_zip(tmp_path / "a.pptx", {"[Content_Types].xml": "presentationml", "ppt/presentation.xml": ""})
+    plain = make_zip(tmp_path / "a.zip", {"notes.txt": "word/ упомянуто в тексте"})
+    assert sniff_file(xlsx) is None
+    assert sniff_file(pptx) is None
+    assert sniff_file(plain) is None
+
+
+def test_zip_without_path_or_broken():
+    assert sniff_material_type(b"PK\x03\x04") is None
+    assert sniff_material_type(b"PK\x03\x04", "/nonexistent.docx") is None
+
+
+def test_signatures():
+    assert sniff_material_type(b"%PDF-1.7\n") == MaterialType.PDF
+    assert sniff_material_type(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1\x00") == MaterialType.DOCX
+    assert sniff_material_type(b"\x89PNG\r\n\x1a\n") == MaterialType.IMAGE
+    assert sniff_material_type(b"\xff\xd8\xff\xe0") == MaterialType.IMAGE
+    assert sniff_material_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == MaterialType.IMAGE
+    assert sniff_material_type(b"ID3\x04") == MaterialType.AUDIO
+    assert sniff_material_type(b"RIFF\x00\x00\x00\x00WAVEfmt ") == MaterialType.AUDIO
+    assert sniff_material_type(b"plain text") is None
@@ -9,7 +9,9 @@ import { useStore } from '../store/useStore';
 interface Source {
     material_id: string;
     material_title: string;
-    similarity: number;
+    similarity: number | null;  // null — найдено только полнотекстовым поиском
+    score?: number;
+    match_type?: 'vector' | 'lexical' | 'hybrid';
 }
 
 interface AskLibraryProps {
@@ -120,9 +122,11 @@ export function AskLibrary({ materialId }: AskLibraryProps) {
                                             >
                                                 <BookOpen className="w-4 h-4" />
                                                 <span className="truncate">{source.material_title}</span>
-                                                <span className="text-xs">
-                                                    ({Math.round(source.similarity * 100)}%)
-                                                </span>
+                                                {source.similarity != null && (
+                                                    <span className="text-xs">
+                                                        ({Math.round(source.similarity * 100)}%)
+                                                    </span>
+                                                )}
                                             </div>
                                         ))}
                                     </div>
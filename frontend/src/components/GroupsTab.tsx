@@ -45,6 +45,8 @@ export function GroupsTab({ groups = [], onRefresh, onUploadToGroup }: GroupsTab
     const [groupMaterials, setGroupMaterials] = useState<Material[]>([]);
     const [isLoadingMaterials, setIsLoadingMaterials] = useState(false);
     const [isRefreshingMaterials, setIsRefreshingMaterials] = useState(false);
+    const [materialsCursor, setMaterialsCursor] = useState<string | undefined>(undefined);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
     const [groupView, setGroupView] = useState<GroupView>('materials');
 
@@ -102,11 +104,29 @@ export function GroupsTab({ groups = [], onRefresh, onUploadToGroup }: GroupsTab
 
     const loadGroupMaterials = async (groupId: string) => {
         try {
-            const materials = await api.getGroupMaterials(groupId);
-            setGroupMaterials(Array.isArray(materials) ? materials : []);
+            const page = await api.getGroupMaterials(groupId);
+            setGroupMaterials(Array.isArray(page.items) ? page.items : []);
+            setMaterialsCursor(page.nextCursor);
         } catch (error) {
             console.error('Failed to load group materials:', error);
             setGroupMaterials([]);
+            setMaterialsCursor(undefined);
+        }
+    };
+
+    const loadMoreGroupMaterials = async () => {
+        if (!selectedGroup || !materialsCursor || isLoadingMore) return;
+
+        setIsLoadingMore(true);
+        try {
+            const page = await api.getGroupMaterials(selectedGroup.id, materialsCursor);
+            const loadedIds = new Set(groupMaterials.map(m => m.id));
+            setGroupMaterials([...groupMaterials, ...page.items.filter((m: Material) => !loadedIds.has(m.id))]);
+            setMaterialsCursor(page.nextCursor);
+        } catch (error) {
+            console.error('Failed to load more group materials:', error);
+        } finally {
+            setIsLoadingMore(false);
         }
     };
 
@@ -127,6 +147,7 @@ export function GroupsTab({ groups = [], onRefresh, onUploadToGroup }: GroupsTab
     const closeGroup = () => {
         setSelectedGroup(null);
         setGroupMaterials([]);
+        setMaterialsCursor(undefined);
         setSearchQuery('');
         setGroupView('materials');
     };
@@ -343,6 +364,16 @@ export function GroupsTab({ groups = [], onRefresh, onUploadToGroup }: GroupsTab
                                         showActions={false}
                                     />
                                 ))}
+                                {materialsCursor && (
+                                    <Button
+                                        variant="secondary"
+                                        className="w-full"
+                                        isLoading={isLoadingMore}
+                                        onClick={loadMoreGroupMaterials}
+                                    >
+                                        Показать ещё
+                                    </Button>
+                                )}
                             </div>
                         ) : (
                             <Card className="text-center py-8">
@@ -5,6 +5,11 @@ import { telegram } from './telegram';
 
 const API_URL = import.meta.env.VITE_API_URL || '/api/v1';
 
+export interface Page<T> {
+    items: T[];
+    nextCursor?: string;
+}
+
 class ApiClient {
     private client: AxiosInstance;
 
@@ -35,6 +40,12 @@ class ApiClient {
         );
     }
 
+    // Списки с keyset-пагинацией: курсор следующей страницы — в заголовке X-Next-Cursor
+    private async getPage<T = any>(url: string, params: Record<string, unknown> = {}, cursor?: string): Promise<Page<T>> {
+        const response = await this.client.get<T[]>(url, { params: { ...params, cursor } });
+        return { items: response.data, nextCursor: response.headers['x-next-cursor'] || undefined };
+    }
+
     // ==================== Users ====================
     async getMe() {
         const { data } = await this.client.get('/users/me');
@@ -69,10 +80,9 @@ class ApiClient {
     }
 
     // ==================== Materials ====================
-    async getMaterials(folderId?: string) {
+    async getMaterials(folderId?: string, cursor?: string) {
         const params = folderId ? { folder_id: folderId } : {};
-        const { data } = await this.client.get('/materials/', { params });
-        return data;
+        return this.getPage('/materials/', params, cursor);
     }
 
     async getMaterial(materialId: string) {
@@ -149,9 +159,8 @@ class ApiClient {
         return data;
     }
 
-    async getGroupMaterials(groupId: string) {
-        const { data } = await this.client.get(`/materials/group/${groupId}`);
-        return data;
+    async getGroupMaterials(groupId: string, cursor?: string) {
+        return this.getPage(`/materials/group/${groupId}`, {}, cursor);
     }
 
     // ==================== Processing ====================
@@ -226,9 +235,8 @@ class ApiClient {
         return data;
     }
 
-    async getGroupQuizResults(groupId: string) {
-        const { data } = await this.client.get(`/groups/${groupId}/quiz-results`);
-        return data;
+    async getGroupQuizResults(groupId: string, cursor?: string) {
+        return this.getPage(`/groups/${groupId}/quiz-results`, {}, cursor);
     }
 
     async getGroupLeaderboard(groupId: string) {
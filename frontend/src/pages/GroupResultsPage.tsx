@@ -1,7 +1,7 @@
 // frontend/src/pages/GroupResultsPage.tsx - СОЗДАЙ НОВЫЙ ФАЙЛ
 import { useEffect, useState } from 'react';
 import { ArrowLeft, Trophy, User, FileText, Calendar } from 'lucide-react';
-import { Card, Spinner } from '../components/ui';
+import { Button, Card, Spinner } from '../components/ui';
 import { api } from '../lib/api';
 import { telegram } from '../lib/telegram';
 
@@ -25,6 +25,8 @@ interface QuizResult {
 export function GroupResultsPage({ groupId }: { groupId: string }) {
     const [results, setResults] = useState<QuizResult[]>([]);
     const [isLoading, setIsLoading] = useState(true);
+    const [nextCursor, setNextCursor] = useState<string | undefined>(undefined);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
 
     useEffect(() => {
         loadResults();
@@ -32,8 +34,9 @@ export function GroupResultsPage({ groupId }: { groupId: string }) {
 
     const loadResults = async () => {
         try {
-            const data = await api.getGroupQuizResults(groupId);
-            setResults(data);
+            const page = await api.getGroupQuizResults(groupId);
+            setResults(page.items);
+            setNextCursor(page.nextCursor);
         } catch (error: any) {
             telegram.alert(error.response?.data?.detail || 'Ошибка загрузки');
         } finally {
@@ -41,6 +44,20 @@ export function GroupResultsPage({ groupId }: { groupId: string }) {
         }
     };
 
+    const loadMoreResults = async () => {
+        if (!nextCursor || isLoadingMore) return;
+        setIsLoadingMore(true);
+        try {
+            const page = await api.getGroupQuizResults(groupId, nextCursor);
+            setResults([...results, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (error: any) {
+            telegram.alert(error.response?.data?.detail || 'Ошибка загрузки');
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     const formatDate = (dateString: string) => {
         const date = new Date(dateString);
         return date.toLocaleDateString('ru-RU', {
@@ -76,7 +93,7 @@ export function GroupResultsPage({ groupId }: { groupId: string }) {
                 </button>
                 <div>
                     <h1 className="text-xl font-bold">Результаты тестов</h1>
-                    <p className="text-sm text-lecto-hint">{results.length} результатов</p>
+                    <p className="text-sm text-lecto-hint">{results.length}{nextCursor ? '+' : ''} результатов</p>
                 </div>
             </div>
 
@@ -114,6 +131,16 @@ export function GroupResultsPage({ groupId }: { groupId: string }) {
                             </div>
                         </Card>
                     ))}
+                    {nextCursor && (
+                        <Button
+                            variant="secondary"
+                            className="w-full"
+                            isLoading={isLoadingMore}
+                            onClick={loadMoreResults}
+                        >
+                            Показать ещё
+                        </Button>
+                    )}
                 </div>
             ) : (
                 <Card className="text-center py-12">
@@ -21,6 +21,10 @@ export function HomePage() {
     const [uploadGroupId, setUploadGroupId] = useState<string | undefined>(undefined);
     const [showPresentationModal, setShowPresentationModal] = useState(false);
 
+    // Курсор следующей страницы материалов (undefined — всё загружено)
+    const [materialsCursor, setMaterialsCursor] = useState<string | undefined>(undefined);
+    const [isLoadingMore, setIsLoadingMore] = useState(false);
+
     // Поиск
     const [searchQuery, setSearchQuery] = useState('');
     const [_searchResults, setSearchResults] = useState<any[]>([]);
@@ -44,11 +48,12 @@ export function HomePage() {
             setIsRefreshing(true);
 
             if (activeTab === 'personal') {
-                const [materialsData, foldersData] = await Promise.all([
+                const [materialsPage, foldersData] = await Promise.all([
                     api.getMaterials(currentFolderId || undefined),
                     api.getFolders(currentFolderId || undefined),
                 ]);
-                setMaterials(materialsData);
+                setMaterials(materialsPage.items);
+                setMaterialsCursor(materialsPage.nextCursor);
                 setFolders(foldersData);
             } else {
                 const groupsData = await api.getMyGroups();
@@ -74,8 +79,13 @@ export function HomePage() {
 
         const pollInterval = setInterval(async () => {
             try {
-                const updatedMaterials = await api.getMaterials(currentFolderId || undefined);
+                // Перечитываем только первую страницу, догруженный хвост сохраняем
+                const firstPage = await api.getMaterials(currentFolderId || undefined);
+                const firstIds = new Set(firstPage.items.map((m: any) => m.id));
+                const tail = materials.filter(m => !firstIds.has(m.id));
+                const updatedMaterials = [...firstPage.items, ...tail];
                 setMaterials(updatedMaterials);
+                if (tail.length === 0) setMaterialsCursor(firstPage.nextCursor);
 
                 // Если все обработаны — останавливаем
                 const stillProcessing = updatedMaterials.filter((m: any) => m.status === 'processing');
@@ -145,11 +155,12 @@ export function HomePage() {
             setLimits(limitsData);
 
             if (activeTab === 'personal') {
-                const [materialsData, foldersData] = await Promise.all([
+                const [materialsPage, foldersData] = await Promise.all([
                     api.getMaterials(currentFolderId || undefined),
                     api.getFolders(currentFolderId || undefined),
                 ]);
-                setMaterials(materialsData);
+                setMaterials(materialsPage.items);
+                setMaterialsCursor(materialsPage.nextCursor);
                 setFolders(foldersData);
             } else {
                 const groupsData = await api.getMyGroups();
@@ -163,6 +174,21 @@ export function HomePage() {
         }
     };
 
+    const loadMoreMaterials = async () => {
+        if (!materialsCursor || isLoadingMore) return;
+        try {
+            setIsLoadingMore(true);
+            const page = await api.getMaterials(currentFolderId || undefined, materialsCursor);
+            const loadedIds = new Set(materials.map(m => m.id));
+            setMaterials([...materials, ...page.items.filter((m: any) => !loadedIds.has(m.id))]);
+            setMaterialsCursor(page.nextCursor);
+        } catch (error) {
+            console.error('Load more error:', error);
+        } finally {
+            setIsLoadingMore(false);
+        }
+    };
+
     const handleMaterialClick = async (material: any) => {
         try {
             const fullMaterial = await api.getMaterial(material.id);
@@ -452,6 +478,16 @@ export function HomePage() {
                                                 showActions={true}
                                             />
                                         ))}
+                                        {materialsCursor && (
+                                            <Button
+                                                variant="secondary"
+                                                className="w-full"
+                                                isLoading={isLoadingMore}
+                                                onClick={loadMoreMaterials}
+                                            >
+                                                Показать ещё
+                                            </Button>
+                                        )}
                                     </div>
                                 ) : (
                                     <Card className="text-center py-8 bg-lecto-bg-secondary border-lecto-border">